@@ -17,11 +17,28 @@ target_metadata = Base.metadata
 
 DATABASE_URL = os.getenv("DATABASE_URL") or config.get_main_option("sqlalchemy.url")
 
+# objects managed by raw DDL in migrations (see app/models/fulltext.py and
+# app/models/ingredient_sets.py), not by the ORM models
+UNMANAGED_COLUMNS = {("recipes", "search_vector"), ("recipes", "ingredient_ids")}
+UNMANAGED_INDEXES = {"ix_recipes_search_vector", "ix_recipes_ingredient_ids"}
+UNMANAGED_TABLES = {"recipes_fts"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "table" and (name in UNMANAGED_TABLES or name.startswith("recipes_fts_")):
+        return False
+    if type_ == "column" and (obj.table.name, name) in UNMANAGED_COLUMNS:
+        return False
+    if type_ == "index" and name in UNMANAGED_INDEXES:
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     context.configure(
         url=DATABASE_URL,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -30,7 +47,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
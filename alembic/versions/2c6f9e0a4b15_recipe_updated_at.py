@@ -0,0 +1,41 @@
+"""recipes.updated_at for incremental exports
+
+Revision ID: 2c6f9e0a4b15
+Revises: 8a3d5f1e6b27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '2c6f9e0a4b15'
+down_revision = '8a3d5f1e6b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    columns = {c['name'] for c in insp.get_columns('recipes')}
+    indexes = {i['name'] for i in insp.get_indexes('recipes')}
+
+    if 'updated_at' not in columns:
+        # SQLite cannot ADD COLUMN with a non-constant default: add, backfill, then tighten
+        op.add_column('recipes', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute("UPDATE recipes SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+        if bind.dialect.name != 'sqlite':
+            # on SQLite this would be a table rebuild that drops the recipes_fts triggers;
+            # the ORM default fills the column there
+            op.alter_column('recipes', 'updated_at', existing_type=sa.DateTime(), nullable=False)
+    if 'ix_recipes_updated_at' not in indexes:
+        op.create_index('ix_recipes_updated_at', 'recipes', ['updated_at'])
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index('ix_recipes_updated_at', table_name='recipes')
+    except Exception:
+        pass
+    try:
+        op.drop_column('recipes', 'updated_at')
+    except Exception:
+        pass
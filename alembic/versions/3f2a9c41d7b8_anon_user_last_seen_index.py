@@ -0,0 +1,27 @@
+"""anon_user last_seen index for retention purges
+
+Revision ID: 3f2a9c41d7b8
+Revises: 09133480214d
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3f2a9c41d7b8'
+down_revision = '09133480214d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing = {ix['name'] for ix in insp.get_indexes('anon_user')}
+    if 'ix_anon_user_last_seen' not in existing:
+        op.create_index('ix_anon_user_last_seen', 'anon_user', ['last_seen'])
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index('ix_anon_user_last_seen', table_name='anon_user')
+    except Exception:
+        pass
@@ -0,0 +1,39 @@
+"""recipe_recommendation: precomputed co-occurrence recommendations
+
+Revision ID: 5e0b7a3c2f18
+Revises: d4a7f3c81e92
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '5e0b7a3c2f18'
+down_revision = 'd4a7f3c81e92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'recipe_recommendation' not in set(insp.get_table_names()):
+        op.create_table(
+            'recipe_recommendation',
+            sa.Column('recipe_id', sa.Integer(), nullable=False),
+            sa.Column('rank', sa.SmallInteger(), nullable=False),
+            sa.Column('other_id', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.Column('support', sa.Integer(), nullable=False),
+            sa.Column('computed_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['other_id'], ['recipes.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('recipe_id', 'rank'),
+        )
+        op.create_index('ix_recipe_recommendation_other_id', 'recipe_recommendation', ['other_id'])
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index('ix_recipe_recommendation_other_id', table_name='recipe_recommendation')
+        op.drop_table('recipe_recommendation')
+    except Exception:
+        pass
@@ -0,0 +1,22 @@
+"""recipe full-text search: tsvector + GIN (PostgreSQL), FTS5 (SQLite)
+
+Revision ID: 7c5e1b2d9a40
+Revises: 3f2a9c41d7b8
+"""
+from alembic import op
+
+from app.models.fulltext import create_fulltext, drop_fulltext
+
+revision = '7c5e1b2d9a40'
+down_revision = '3f2a9c41d7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # on SQLite this also indexes the existing recipes ('rebuild')
+    create_fulltext(op.get_bind())
+
+
+def downgrade() -> None:
+    drop_fulltext(op.get_bind())
@@ -0,0 +1,72 @@
+"""ingredients.name_norm: stored canonical key for lookups
+
+Revision ID: 8a3d5f1e6b27
+Revises: 5e0b7a3c2f18
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+from app.utils.normalize import normalize_name
+
+revision = '8a3d5f1e6b27'
+down_revision = '5e0b7a3c2f18'
+branch_labels = None
+depends_on = None
+
+_BATCH = 1000
+
+# alembic.ini shows the "alembic" loggers at INFO
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _backfill(bind) -> None:
+    ingredients = sa.table('ingredients', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                           sa.column('name_norm', sa.String))
+    rows = bind.execute(sa.select(ingredients.c.id, ingredients.c.name).order_by(ingredients.c.id)).all()
+    taken = {}
+    updates = []
+    for iid, name in rows:
+        key = normalize_name(name) or f"#{iid}"
+        if key in taken:
+            # names that only differed in case/accents/punctuation: keep both rows
+            # (recipes point at them) and flag the later one for a manual merge
+            logger.warning("name_norm collision: ingredient %s %r vs %s; stored as '%s #%s'", iid, name, taken[key], key, iid)
+            key = f"{key} #{iid}"
+        taken[key] = iid
+        updates.append({"b_id": iid, "b_norm": key})
+    stmt = (
+        ingredients.update()
+        .where(ingredients.c.id == sa.bindparam('b_id'))
+        .values(name_norm=sa.bindparam('b_norm'))
+    )
+    for i in range(0, len(updates), _BATCH):
+        bind.execute(stmt, updates[i:i + _BATCH])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    columns = {c['name'] for c in insp.get_columns('ingredients')}
+    indexes = {i['name'] for i in insp.get_indexes('ingredients')}
+    uniques = {u['name'] for u in insp.get_unique_constraints('ingredients')}
+
+    if 'name_norm' not in columns:
+        op.add_column('ingredients', sa.Column('name_norm', sa.String(length=255), nullable=True))
+    _backfill(bind)
+    with op.batch_alter_table('ingredients') as batch:
+        batch.alter_column('name_norm', existing_type=sa.String(length=255), nullable=False)
+        if 'uq_ingredients_name_norm' not in uniques:
+            batch.create_unique_constraint('uq_ingredients_name_norm', ['name_norm'])
+
+    if bind.dialect.name == 'postgresql' and 'ix_ingredients_name_norm_prefix' not in indexes:
+        op.execute("CREATE INDEX ix_ingredients_name_norm_prefix ON ingredients (name_norm text_pattern_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ingredients_name_norm_prefix")
+    try:
+        with op.batch_alter_table('ingredients') as batch:
+            batch.drop_constraint('uq_ingredients_name_norm', type_='unique')
+            batch.drop_column('name_norm')
+    except Exception:
+        pass
@@ -0,0 +1,39 @@
+"""composite index for prep time / servings facet filters
+
+Revision ID: a9d3e5c7b210
+Revises: f2b7c9d04e61
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a9d3e5c7b210'
+down_revision = 'f2b7c9d04e61'
+branch_labels = None
+depends_on = None
+
+_NAME = 'ix_recipes_prep_servings'
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _NAME in {i['name'] for i in sa.inspect(bind).get_indexes('recipes')}:
+        return
+    if bind.dialect.name == 'postgresql':
+        # see e6c1a8f4d372: CONCURRENTLY keeps recipes writable, and cannot run in a transaction
+        with op.get_context().autocommit_block():
+            op.create_index(_NAME, 'recipes', ['prep_minutes', 'servings'], postgresql_concurrently=True, if_not_exists=True)
+            op.execute("ANALYZE recipes")
+    else:
+        op.create_index(_NAME, 'recipes', ['prep_minutes', 'servings'])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(_NAME, table_name='recipes', postgresql_concurrently=True, if_exists=True)
+        return
+    try:
+        op.drop_index(_NAME, table_name='recipes')
+    except Exception:
+        pass
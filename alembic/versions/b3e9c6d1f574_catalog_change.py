@@ -0,0 +1,41 @@
+"""catalog_change: versioned outbox of recipe/ingredient/link changes, filled by triggers
+
+Revision ID: b3e9c6d1f574
+Revises: d7a2f9b4e318
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.catalog_change import create_catalog_change_triggers, drop_catalog_change_triggers
+
+revision = 'b3e9c6d1f574'
+down_revision = 'd7a2f9b4e318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'catalog_change' not in set(insp.get_table_names()):
+        op.create_table(
+            'catalog_change',
+            sa.Column('version', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+            sa.Column('entity', sa.String(length=24), nullable=False),
+            sa.Column('op', sa.String(length=8), nullable=False),
+            sa.Column('recipe_id', sa.Integer(), nullable=True),
+            sa.Column('ingredient_id', sa.Integer(), nullable=True),
+            sa.Column('changed_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('version'),
+            sqlite_autoincrement=True,
+        )
+    # existing rows are not backfilled: consumers start with a full build
+    create_catalog_change_triggers(bind)
+
+
+def downgrade() -> None:
+    drop_catalog_change_triggers(op.get_bind())
+    try:
+        op.drop_table('catalog_change')
+    except Exception:
+        pass
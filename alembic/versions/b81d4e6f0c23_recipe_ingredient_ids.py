@@ -0,0 +1,22 @@
+"""recipes.ingredient_ids int[] + GIN index, synced from recipe_ingredient (PostgreSQL)
+
+Revision ID: b81d4e6f0c23
+Revises: 7c5e1b2d9a40
+"""
+from alembic import op
+
+from app.models.ingredient_sets import create_ingredient_sets, drop_ingredient_sets
+
+revision = 'b81d4e6f0c23'
+down_revision = '7c5e1b2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # no-op on other dialects: they answer set queries from recipe_ingredient directly
+    create_ingredient_sets(op.get_bind(), backfill=True)
+
+
+def downgrade() -> None:
+    drop_ingredient_sets(op.get_bind())
@@ -0,0 +1,36 @@
+"""search_query_stat: aggregated ingredient-set search counts
+
+Revision ID: c4e8a1f6d953
+Revises: a9d3e5c7b210
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c4e8a1f6d953'
+down_revision = 'a9d3e5c7b210'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'search_query_stat' not in set(insp.get_table_names()):
+        op.create_table(
+            'search_query_stat',
+            sa.Column('query_key', sa.String(length=512), nullable=False),
+            sa.Column('hits', sa.BigInteger(), nullable=False),
+            sa.Column('last_seen', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('query_key'),
+        )
+        op.create_index('ix_search_query_stat_hits', 'search_query_stat', ['hits'])
+        op.create_index('ix_search_query_stat_last_seen', 'search_query_stat', ['last_seen'])
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index('ix_search_query_stat_last_seen', table_name='search_query_stat')
+        op.drop_index('ix_search_query_stat_hits', table_name='search_query_stat')
+        op.drop_table('search_query_stat')
+    except Exception:
+        pass
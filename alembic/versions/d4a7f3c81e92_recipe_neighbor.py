@@ -0,0 +1,35 @@
+"""recipe_neighbor: precomputed similar recipes
+
+Revision ID: d4a7f3c81e92
+Revises: b81d4e6f0c23
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd4a7f3c81e92'
+down_revision = 'b81d4e6f0c23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'recipe_neighbor' not in set(insp.get_table_names()):
+        op.create_table(
+            'recipe_neighbor',
+            sa.Column('recipe_id', sa.Integer(), nullable=False),
+            sa.Column('rank', sa.SmallInteger(), nullable=False),
+            sa.Column('neighbor_id', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['neighbor_id'], ['recipes.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('recipe_id', 'rank'),
+        )
+
+
+def downgrade() -> None:
+    try:
+        op.drop_table('recipe_neighbor')
+    except Exception:
+        pass
@@ -0,0 +1,36 @@
+"""recipe_trending: checkpointed time-decayed trending scores
+
+Revision ID: d7a2f9b4e318
+Revises: c4e8a1f6d953
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd7a2f9b4e318'
+down_revision = 'c4e8a1f6d953'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'recipe_trending' not in set(insp.get_table_names()):
+        op.create_table(
+            'recipe_trending',
+            sa.Column('recipe_id', sa.Integer(), nullable=False),
+            sa.Column('epoch', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('recipe_id'),
+        )
+        op.create_index('ix_recipe_trending_epoch', 'recipe_trending', ['epoch'])
+
+
+def downgrade() -> None:
+    try:
+        op.drop_index('ix_recipe_trending_epoch', table_name='recipe_trending')
+        op.drop_table('recipe_trending')
+    except Exception:
+        pass
@@ -0,0 +1,54 @@
+"""covering indexes for per-recipe action counts and ingredient probes
+
+Revision ID: e6c1a8f4d372
+Revises: 2c6f9e0a4b15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e6c1a8f4d372'
+down_revision = '2c6f9e0a4b15'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+_INDEXES = (
+    ('ix_recipe_action_recipe_type_user', 'recipe_action', ['recipe_id', 'action_type', 'anon_user_id']),
+    ('ix_recipe_ingredient_ingredient_recipe', 'recipe_ingredient', ['ingredient_id', 'recipe_id']),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    missing = [
+        (name, table, cols) for name, table, cols in _INDEXES
+        if name not in {i['name'] for i in insp.get_indexes(table)}
+    ]
+    if not missing:
+        return
+    if bind.dialect.name == 'postgresql':
+        # CONCURRENTLY keeps the tables writable while the index builds; it cannot run in a transaction.
+        # A failed concurrent build leaves an INVALID index behind: drop it and re-run the migration.
+        with op.get_context().autocommit_block():
+            for name, table, cols in missing:
+                op.create_index(name, table, cols, postgresql_concurrently=True, if_not_exists=True)
+            for _, table, _ in missing:
+                op.execute(f"ANALYZE {table}")
+    else:
+        for name, table, cols in missing:
+            op.create_index(name, table, cols)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in _INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        return
+    for name, table, _ in _INDEXES:
+        try:
+            op.drop_index(name, table_name=table)
+        except Exception:
+            pass
@@ -0,0 +1,51 @@
+"""recipe_action history: daily rollup + monthly-partitioned event log (PostgreSQL)
+
+Revision ID: f2b7c9d04e61
+Revises: e6c1a8f4d372
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.action_log import create_action_log
+
+revision = 'f2b7c9d04e61'
+down_revision = 'e6c1a8f4d372'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if 'recipe_action_daily' not in set(insp.get_table_names()):
+        op.create_table(
+            'recipe_action_daily',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('recipe_id', sa.Integer(), nullable=False),
+            sa.Column('action_type', sa.String(length=32), nullable=False),
+            sa.Column('added', sa.Integer(), nullable=False),
+            sa.Column('removed', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'recipe_id', 'action_type'),
+        )
+        op.create_index('ix_recipe_action_daily_recipe_day', 'recipe_action_daily', ['recipe_id', 'day'])
+    # backfills the rollup from recipe_action, then event log, partitions and triggers
+    create_action_log(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS recipe_action_log_ins ON recipe_action")
+        op.execute("DROP TRIGGER IF EXISTS recipe_action_log_del ON recipe_action")
+        op.execute("DROP FUNCTION IF EXISTS recipe_action_log_changes()")
+        op.execute("DROP FUNCTION IF EXISTS recipe_action_event_ensure_partitions(integer)")
+        op.execute("DROP FUNCTION IF EXISTS recipe_action_event_drop_partitions(integer)")
+        op.execute("DROP TABLE IF EXISTS recipe_action_event")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS recipe_action_daily_ai")
+        op.execute("DROP TRIGGER IF EXISTS recipe_action_daily_ad")
+    try:
+        op.drop_index('ix_recipe_action_daily_recipe_day', table_name='recipe_action_daily')
+        op.drop_table('recipe_action_daily')
+    except Exception:
+        pass
@@ -6,54 +6,67 @@ from app.db import get_session
 from app.deps import get_or_create_anon_user
 from app.models.anon import RecipeAction
 from app.models import Recipe
+from app.schemas.action import ActionBatchIn, ActionBatchOut
+from app.services.action_buffer import ACTION_WRITE_BEHIND, action_buffer
+from app.services.actions import apply_action_ops
+from app.services.bookmarks import invalidate_bookmark_count
+from app.services.trending import trending
 
 router = APIRouter(prefix="/api/recipes", tags=["recipes.actions"])
 
 
-@router.post("/{recipe_id}/like", response_model=dict)
-async def toggle_like(recipe_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
-    q = await session.execute(select(Recipe).where(Recipe.id == recipe_id))
-    if not q.scalars().first():
+async def _toggle(recipe_id: int, action_type: str, request: Request, response: Response, session: AsyncSession) -> bool:
+    """Toggle the current anon user's action on a recipe; returns the new state."""
+    q = await session.execute(select(Recipe.id).where(Recipe.id == recipe_id))
+    if not q.first():
         raise HTTPException(status_code=404, detail="Recipe not found")
 
     anon = await get_or_create_anon_user(request, response, session)
+    # the rollback below expires `anon`; reading its id afterwards would need a lazy load
+    anon_id = anon.id
+    if ACTION_WRITE_BEHIND:
+        active = await action_buffer.toggle(session, anon_id, recipe_id, action_type)
+        trending.record(recipe_id, action_type, 1 if active else -1)
+        return active
+
     try:
         await session.execute(insert(RecipeAction).values(
-            anon_user_id=anon.id, recipe_id=recipe_id, action_type="like"
+            anon_user_id=anon_id, recipe_id=recipe_id, action_type=action_type
         ))
         await session.commit()
-        return {"status": "liked"}
+        active = True
     except IntegrityError:
         await session.rollback()
         await session.execute(delete(RecipeAction).where(
-            RecipeAction.anon_user_id == anon.id,
+            RecipeAction.anon_user_id == anon_id,
             RecipeAction.recipe_id == recipe_id,
-            RecipeAction.action_type == "like"
+            RecipeAction.action_type == action_type
         ))
         await session.commit()
-        return {"status": "unliked"}
+        active = False
+    if action_type == "bookmark":
+        invalidate_bookmark_count(anon_id)
+    trending.record(recipe_id, action_type, 1 if active else -1)
+    return active
+
+
+@router.post("/{recipe_id}/like", response_model=dict)
+async def toggle_like(recipe_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    liked = await _toggle(recipe_id, "like", request, response, session)
+    return {"status": "liked" if liked else "unliked"}
 
 
 @router.post("/{recipe_id}/bookmark", response_model=dict)
 async def toggle_bookmark(recipe_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
-    q = await session.execute(select(Recipe).where(Recipe.id == recipe_id))
-    if not q.scalars().first():
-        raise HTTPException(status_code=404, detail="Recipe not found")
+    bookmarked = await _toggle(recipe_id, "bookmark", request, response, session)
+    return {"status": "bookmarked" if bookmarked else "unbookmarked"}
 
-    anon = await get_or_create_anon_user(request, response, session)
-    try:
-        await session.execute(insert(RecipeAction).values(
-            anon_user_id=anon.id, recipe_id=recipe_id, action_type="bookmark"
-        ))
-        await session.commit()
-        return {"status": "bookmarked"}
-    except IntegrityError:
-        await session.rollback()
 
-        await session.execute(delete(RecipeAction).where(
-            RecipeAction.anon_user_id == anon.id,
-            RecipeAction.recipe_id == recipe_id,
-            RecipeAction.action_type == "bookmark"
-        ))
-        await session.commit()
-        return {"status": "unbookmarked"}
+@router.post("/actions/batch", response_model=ActionBatchOut)
+async def batch_actions(payload: ActionBatchIn, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    """
+    Set many like/bookmark states in one request (idempotent, unlike the toggle
+    endpoints). Unknown recipe ids are reported per item with error="not_found".
+    """
+    anon = await get_or_create_anon_user(request, response, session)
+    return {"results": await apply_action_ops(session, anon.id, payload.ops)}
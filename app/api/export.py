@@ -0,0 +1,73 @@
+import datetime
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal, get_session
+from app.deps import get_anon_user
+from app.services.action_buffer import action_buffer
+from app.services.export import (
+    EXPORT_CHUNK,
+    RecipeExportPlan,
+    iter_bookmark_chunks,
+    iter_recipe_chunks,
+    ndjson_chunks,
+    plan_recipe_export,
+)
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+NDJSON = "application/x-ndjson"
+
+
+async def _stream_recipes(
+    updated_since: Optional[datetime.datetime], chunk: int, plan: RecipeExportPlan
+) -> AsyncIterator[bytes]:
+    # own session: the request-scoped one may be closed before the body is fully sent
+    async with AsyncSessionLocal() as session:
+        async for part in ndjson_chunks(iter_recipe_chunks(session, updated_since, chunk, plan)):
+            yield part
+
+
+async def _stream_bookmarks(anon_id, chunk: int) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as session:
+        async for part in ndjson_chunks(iter_bookmark_chunks(session, anon_id, chunk)):
+            yield part
+
+
+@router.get("/recipes.ndjson")
+async def export_recipes(
+    since_version: Optional[int] = Query(None, ge=0, description="X-Catalog-Version of the previous export"),
+    updated_since: Optional[datetime.datetime] = Query(
+        None, description="Best-effort: only recipes updated at/after this time (ISO 8601, UTC); may miss changes"
+    ),
+    chunk: int = Query(EXPORT_CHUNK, ge=10, le=5000),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Whole catalog as NDJSON, one recipe per line, ordered by (updated_at, id).
+
+    The `X-Catalog-Version` response header is the version the export is
+    complete up to. Pass it back as `since_version` to get only the recipes
+    changed since, ordered by id, with `{"id": ..., "deleted": true}` lines for
+    deleted ones. `X-Catalog-Full: 1` means the whole catalog was sent
+    instead (the changes were no longer available) and replaces the copy.
+    """
+    if since_version is not None and updated_since is not None:
+        raise HTTPException(status_code=400, detail="pass either since_version or updated_since, not both")
+    if updated_since is not None and updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    plan = await plan_recipe_export(session, since_version)
+    headers = {"X-Catalog-Version": str(plan.version), "X-Catalog-Full": "1" if plan.full and updated_since is None else "0"}
+    return StreamingResponse(_stream_recipes(updated_since, chunk, plan), media_type=NDJSON, headers=headers)
+
+
+@router.get("/bookmarks.ndjson")
+async def export_bookmarks(request: Request, session: AsyncSession = Depends(get_session)):
+    """Current anon user's bookmarks as NDJSON, oldest first."""
+    anon = await get_anon_user(request, session)
+    if anon is None:
+        return StreamingResponse(iter(()), media_type=NDJSON)
+    if action_buffer.has_pending(anon.id):
+        await action_buffer.flush()
+    return StreamingResponse(_stream_bookmarks(anon.id, EXPORT_CHUNK), media_type=NDJSON)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.utils.images import image_store
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# rendition files never change under their name (content-addressed)
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/{digest}/{name}", include_in_schema=False, name="image_rendition")
+async def image_rendition(digest: str, name: str):
+    """A resized recipe image from IMAGE_CACHE_DIR (see app/utils/images.py)."""
+    found = image_store.file_for(digest, name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": IMMUTABLE})
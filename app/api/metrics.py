@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from app.db import _engine
+from app.services.catalog_changes import catalog_feed
+from app.services.query_log import query_log
+from app.services.search_cache import search_cache
+from app.services.trending import trending
+from app.utils.admission import admission_stats
+from app.utils.fragment_cache import fragment_cache
+from app.utils.startup import startup_timer
+
+router = APIRouter(prefix="/api", tags=["metrics"])
+
+
+def _pool_stats() -> dict:
+    pool = _engine.pool
+    out = {"class": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            out[name] = fn()
+    return out
+
+
+@router.get("/metrics", response_model=dict)
+async def api_metrics():
+    """Per-worker counters: admission queues and rejections, DB pool usage, fragment and search caches, catalog change feed, query log, trending board, startup phases."""
+    return {
+        "admission": admission_stats(),
+        "db_pool": _pool_stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "catalog_feed": catalog_feed.stats(),
+        "query_log": query_log.stats(),
+        "trending": trending.stats(),
+        "startup": startup_timer.stats(),
+    }
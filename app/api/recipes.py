@@ -1,14 +1,19 @@
 import logging
-from typing import List
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, func
-from sqlalchemy.orm import selectinload
 from app.db import get_session
 from app.models import Recipe
 from app.models.anon import AnonUser, RecipeAction
 from app.services.recipes import list_recipes, get_recipe
-from app.deps import get_or_create_anon_user
+from app.services.bookmarks import BOOKMARKS_PER_PAGE, list_bookmarks, invalidate_bookmark_count
+from app.deps import anon_id_from_cookie, get_anon_user
+from app.services.action_buffer import ACTION_WRITE_BEHIND, action_buffer
+from app.services.similar import get_similar_recipes
+from app.services.recommendations import get_recommendations
+from app.services.action_stats import ACTION_TYPES, popular_recipes, recipe_daily_stats
+from app.services.trending import trending_recipes
 
 logger = logging.getLogger(__name__)
 
@@ -19,44 +24,39 @@ async def api_list(page: int = Query(1, ge=1), session: AsyncSession = Depends(g
     return await list_recipes(session, page=page)
 
 
-@router.get("/bookmarks", response_model=List[dict])
+@router.get("/bookmarks", response_model=dict)
 async def api_get_bookmarks(
     request: Request,
     response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    limit: int = Query(BOOKMARKS_PER_PAGE, ge=1, le=100),
     session: AsyncSession = Depends(get_session),
 ):
-    anon = await get_or_create_anon_user(request, response, session)
-
-    stmt = (
-        select(Recipe)
-        .join(RecipeAction, RecipeAction.recipe_id == Recipe.id)
-        .where(
-            RecipeAction.anon_user_id == anon.id,
-            RecipeAction.action_type == "bookmark",
-        )
-        .options(selectinload(Recipe.ingredients))
-        .order_by(RecipeAction.created_at.desc())
-    )
+    anon = await get_anon_user(request, session)
+    if not anon:
+        return {"recipes": [], "next_cursor": None, "total": 0}
+    if action_buffer.has_pending(anon.id):
+        await action_buffer.flush()
+    return await list_bookmarks(session, anon.id, limit=limit, cursor=cursor)
 
-    res = await session.execute(stmt)
-    recipes = res.scalars().unique().all()
 
-    def to_out(rec):
-        return {
-            "id": rec.id,
-            "title": rec.title,
-            "instructions": rec.instructions,
-            "prep_minutes": rec.prep_minutes,
-            "servings": rec.servings,
-            "source": rec.source,
-            "image_url": rec.image_url,
-            "thumbnail_url": rec.thumbnail_url,
-            "image_meta": rec.image_meta,
-            "ingredients": [ing.name for ing in getattr(rec, "ingredients", [])] if getattr(rec, "ingredients", None) else [],
-            "likes_count": getattr(rec, "likes_count", 0),
-        }
+@router.get("/popular", response_model=dict)
+async def api_popular(
+    action_type: str = Query("like", description="like | bookmark"),
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(12, ge=1, le=50),
+    session: AsyncSession = Depends(get_session),
+):
+    """Most liked/bookmarked recipes over the last `days` days, read from the daily rollup."""
+    if action_type not in ACTION_TYPES:
+        raise HTTPException(status_code=400, detail=f"action_type must be one of {', '.join(ACTION_TYPES)}")
+    return {"days": days, "action_type": action_type, "recipes": await popular_recipes(session, action_type, days, limit)}
+
 
-    return [to_out(r) for r in recipes]
+@router.get("/trending", response_model=dict)
+async def api_trending(limit: int = Query(12, ge=1, le=50), session: AsyncSession = Depends(get_session)):
+    """Recipes with the highest time-decayed like/bookmark/view scores, from the in-memory leaderboard."""
+    return {"recipes": await trending_recipes(session, limit)}
 
 
 @router.post("/clear", response_model=dict)
@@ -64,83 +64,41 @@ async def clear_anon_data(request: Request, response: Response, session: AsyncSe
     if request.headers.get("X-Requested-With") != "XMLHttpRequest":
         raise HTTPException(status_code=400, detail="Bad request")
 
-    anon_cookie = request.cookies.get("anon_id")
-    if not anon_cookie:
-        response.status_code = 204
-        return {"status": "no_anon"}
-
-    try:
-        cols = {c.name for c in AnonUser.__table__.columns}
-    except Exception:
-        logger.exception("Failed to introspect AnonUser.__table__")
-        cols = set()
-
-    logger.debug("AnonUser columns: %s", sorted(cols))
-
-    anon = None
-
-    if "id" in cols:
-        try:
-            maybe_id = int(anon_cookie)
-            q = await session.execute(select(AnonUser).where(AnonUser.id == maybe_id))
-            anon = q.scalars().first()
-            if anon:
-                logger.info("Found AnonUser by numeric id column")
-        except Exception:
-            pass
-
-    if not anon:
-        candidates = [
-            "anon_id", "anon_token", "token", "token_value", "token_hash",
-            "cookie", "cookie_value", "uuid", "uid", "key", "value", "secret"
-        ]
-        for name in candidates:
-            if name in cols and hasattr(AnonUser, name):
-                try:
-                    col = getattr(AnonUser, name)
-                    q = await session.execute(select(AnonUser).where(col == anon_cookie))
-                    anon = q.scalars().first()
-                    if anon:
-                        logger.info("Found AnonUser by column '%s'", name)
-                        break
-                except Exception:
-                    logger.debug("Failed query by candidate column %s", name, exc_info=True)
-
-    if not anon:
-        for colname in cols:
-            if colname == "id":
-                continue
-            if not hasattr(AnonUser, colname):
-                continue
-            try:
-                col = getattr(AnonUser, colname)
-                q = await session.execute(select(AnonUser).where(col == anon_cookie))
-                anon = q.scalars().first()
-                if anon:
-                    logger.info("Found AnonUser by fallback column '%s'", colname)
-                    break
-            except Exception:
-                continue
-
-    if not anon:
-        logger.info("AnonUser not found for cookie value; available columns: %s", sorted(cols))
+    anon_id = anon_id_from_cookie(request)
+    if not anon_id:
         response.delete_cookie("anon_id", path="/", samesite="Lax")
         response.status_code = 204
-        return {"status": "no_anon", "available_columns": sorted(cols)}
+        return {"status": "no_anon"}
 
     try:
-        await session.execute(delete(RecipeAction).where(RecipeAction.anon_user_id == anon.id))
-        await session.execute(delete(AnonUser).where(AnonUser.id == anon.id))
+        # recipe_action rows go with it via ON DELETE CASCADE
+        res = await session.execute(delete(AnonUser).where(AnonUser.id == anon_id))
         await session.commit()
     except Exception:
         await session.rollback()
-        logger.exception("Failed to delete AnonUser and RecipeAction for anon id %s", getattr(anon, "id", "<unknown>"))
+        logger.exception("Failed to delete AnonUser %s", anon_id)
         raise HTTPException(status_code=500, detail="Unable to delete anon data")
 
+    action_buffer.discard_user(anon_id)
+    invalidate_bookmark_count(anon_id)
     response.delete_cookie("anon_id", path="/", samesite="Lax")
+    if not res.rowcount:
+        response.status_code = 204
+        return {"status": "no_anon"}
     return {"status": "deleted"}
 
 
+async def _user_action_state(session: AsyncSession, anon_id, recipe_id: int):
+    q = await session.execute(
+        select(RecipeAction.action_type).where(
+            RecipeAction.anon_user_id == anon_id,
+            RecipeAction.recipe_id == recipe_id,
+        )
+    )
+    types = {row[0] for row in q.all()}
+    return "like" in types, "bookmark" in types
+
+
 @router.get("/{recipe_id}/actions", response_model=dict)
 async def recipe_actions(
     recipe_id: int,
@@ -152,25 +110,11 @@ async def recipe_actions(
     if not q.scalars().first():
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    anon = await get_or_create_anon_user(request, response, session)
-
-    q = await session.execute(
-        select(RecipeAction).where(
-            RecipeAction.anon_user_id == anon.id,
-            RecipeAction.recipe_id == recipe_id,
-            RecipeAction.action_type == "like",
-        )
-    )
-    liked = q.scalars().first() is not None
-
-    q2 = await session.execute(
-        select(RecipeAction).where(
-            RecipeAction.anon_user_id == anon.id,
-            RecipeAction.recipe_id == recipe_id,
-            RecipeAction.action_type == "bookmark",
-        )
-    )
-    bookmarked = q2.scalars().first() is not None
+    anon = await get_anon_user(request, session)
+    if not anon:
+        liked = bookmarked = False
+    else:
+        liked, bookmarked = await _user_action_state(session, anon.id, recipe_id)
 
     cnt_q = await session.execute(
         select(func.count()).select_from(RecipeAction).where(
@@ -179,9 +123,35 @@ async def recipe_actions(
     )
     likes_count = int(cnt_q.scalar_one() or 0)
 
+    if ACTION_WRITE_BEHIND:
+        # unflushed toggles: the user's own state wins, the counter includes everyone's
+        if anon:
+            pending = action_buffer.pending_for_user(anon.id)
+            liked = pending.get((recipe_id, "like"), liked)
+            bookmarked = pending.get((recipe_id, "bookmark"), bookmarked)
+        likes_count = max(0, likes_count + action_buffer.likes_delta(recipe_id))
+
     return {"liked": liked, "bookmarked": bookmarked, "likes_count": likes_count}
 
 
+@router.get("/{recipe_id}/similar", response_model=dict)
+async def api_get_similar(recipe_id: int, limit: int = Query(6, ge=1, le=20), session: AsyncSession = Depends(get_session)):
+    """Precomputed neighbors (scripts/build_similar.py); empty until the table is built."""
+    return {"recipe_id": recipe_id, "similar": await get_similar_recipes(session, recipe_id, limit=limit)}
+
+
+@router.get("/{recipe_id}/also_saved", response_model=dict)
+async def api_get_also_saved(recipe_id: int, limit: int = Query(6, ge=1, le=20), session: AsyncSession = Depends(get_session)):
+    """Precomputed "people who saved this also saved" (app/services/recommendations.py)."""
+    return {"recipe_id": recipe_id, "recipes": await get_recommendations(session, recipe_id, limit=limit)}
+
+
+@router.get("/{recipe_id}/stats", response_model=dict)
+async def api_get_stats(recipe_id: int, days: int = Query(30, ge=1, le=365), session: AsyncSession = Depends(get_session)):
+    """Daily like/bookmark changes for the last `days` days (days without activity are omitted)."""
+    return {"recipe_id": recipe_id, "days": await recipe_daily_stats(session, recipe_id, days=days)}
+
+
 @router.get("/{recipe_id}", response_model=dict)
 async def api_get(recipe_id: int, session: AsyncSession = Depends(get_session)):
     recipe = await get_recipe(session, recipe_id)
@@ -3,10 +3,16 @@ import logging
 from typing import List, Optional, Set
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
 from app.db import get_session
-from app.models import Recipe, Ingredient
+from app.models import Ingredient
+from app.services.query_log import query_key, query_log
+from app.services.recipes import search_recipes, simple_search
+from app.services.search_cache import search_cache
+from app.services.ingredient_sets import MODE_ANY, MODES
+from app.utils.facets import FacetCounts, FacetFilter
+from app.utils.mapping import map_input_to_ingredient_names
+from app.utils.normalize import normalize_name, prefix_match
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +20,21 @@ router = APIRouter(prefix="/api/recipes", tags=["recipes.search"])
 
 _SPLIT_RE = re.compile(r'[,\n]+')
 
+
+def facet_filter(
+    max_prep_minutes: Optional[int] = Query(None, ge=0, description="Only recipes ready in at most this many minutes"),
+    min_servings: Optional[int] = Query(None, ge=0),
+    max_servings: Optional[int] = Query(None, ge=0),
+) -> FacetFilter:
+    return FacetFilter(max_prep_minutes=max_prep_minutes, min_servings=min_servings, max_servings=max_servings)
+
+
+def _with_facets(results: list, counts: Optional[FacetCounts]):
+    # plain list unless facets were asked for, so existing clients are unaffected
+    if counts is None:
+        return results
+    return {"results": results, "facets": counts.to_dict()}
+
 @router.get("/ingredients")
 async def api_ingredients(
     q: Optional[str] = Query(None, description="Prefix filter (case-insensitive)"),
@@ -21,13 +42,13 @@ async def api_ingredients(
     session: AsyncSession = Depends(get_session),
 ):
     """
-    Return list of ingredient names (strings). Uses GROUP BY to be Postgres-friendly
-    when ordering by lower(name).
+    Return list of ingredient names (strings), ordered by their normalized key.
+    `q` is normalized the same way and matched as a prefix of the stored key.
     """
-    stmt = select(Ingredient.name).group_by(Ingredient.name)
+    stmt = select(Ingredient.name)
     if q:
-        stmt = stmt.where(func.lower(Ingredient.name).like(f"{q.lower()}%"))
-    stmt = stmt.order_by(func.lower(Ingredient.name)).limit(limit)
+        stmt = stmt.where(prefix_match(Ingredient.name_norm, normalize_name(q), session.get_bind().dialect.name))
+    stmt = stmt.order_by(Ingredient.name_norm).limit(limit)
 
     res = await session.execute(stmt)
     names = [row[0] for row in res.fetchall() if row and row[0] is not None]
@@ -38,6 +59,8 @@ async def api_ingredients(
 async def api_search_simple(
     ingredient: Optional[List[str]] = Query(None, description="Repeatable: ?ingredient=egg&ingredient=onion"),
     limit: int = Query(50, ge=1, le=500),
+    filters: FacetFilter = Depends(facet_filter),
+    facets: bool = Query(False, description="Return {results, facets} with prep time / servings counts"),
     session: AsyncSession = Depends(get_session),
 ):
     """
@@ -51,37 +74,67 @@ async def api_search_simple(
     if not names:
         raise HTTPException(status_code=400, detail="no valid ingredient tokens found")
 
-    lower_names: Set[str] = {n.lower() for n in names}
+    wanted: Set[str] = {normalize_name(n) for n in names} - {""}
+    counts = FacetCounts() if facets else None
+    if not wanted:
+        return _with_facets([], counts)
 
-    any_conditions = [Recipe.ingredients.any(func.lower(Ingredient.name) == ln) for ln in lower_names]
-    if not any_conditions:
-        return []
+    query_log.record(wanted)
+    if filters or counts is not None:
+        return _with_facets(await simple_search(session, wanted, limit, filters, counts), counts)
+    # only unfiltered results are cached: that is what the warm-up precomputes
+    key = ("simple", query_key(wanted), limit)
+    results = search_cache.get(key)
+    if results is None:
+        results = await simple_search(session, wanted, limit)
+        search_cache.put(key, results, wanted)
+    return results
 
-    stmt = select(Recipe).options(selectinload(Recipe.ingredients)).where(or_(*any_conditions)).limit(2000)
-    res = await session.execute(stmt)
-    recipes = res.scalars().unique().all()
-
-    out = []
-    for rec in recipes:
-        rec_ing_names = [getattr(i, "name", "").lower() for i in getattr(rec, "ingredients", []) or []]
-        match_count = len(set(rec_ing_names) & lower_names)
-        total_ing = len(rec_ing_names) or 1
-        score = match_count / total_ing
-        out.append({
-            "id": rec.id,
-            "title": rec.title,
-            "instructions": rec.instructions,
-            "prep_minutes": rec.prep_minutes,
-            "servings": rec.servings,
-            "source": rec.source,
-            "image_url": rec.image_url,
-            "thumbnail_url": rec.thumbnail_url,
-            "image_meta": rec.image_meta,
-            "ingredients": [ing.name for ing in getattr(rec, "ingredients", [])] if getattr(rec, "ingredients", None) else [],
-            "likes_count": getattr(rec, "likes_count", 0),
-            "match_count": match_count,
-            "score": score,
-        })
-
-    out.sort(key=lambda x: (-x["match_count"], -x["score"], x["title"]))
-    return out[:limit]
+
+@router.get("/search_text")
+async def api_search_text(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in title/instructions, e.g. 'bake pasta'"),
+    ingredient: Optional[List[str]] = Query(None, description="Optional repeatable ingredient filter, ranked like /search"),
+    limit: int = Query(20, ge=1, le=100),
+    filters: FacetFilter = Depends(facet_filter),
+    facets: bool = Query(False, description="Return {results, facets} with prep time / servings counts"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Full-text search over recipe titles and instructions, best match first.
+    With `ingredient` params, results are ranked by ingredient matches and the
+    text rank breaks ties.
+    """
+    counts = FacetCounts() if facets else None
+    names = [s.strip() for s in ingredient or [] if s and s.strip()]
+    mapped = await map_input_to_ingredient_names(session, names) if names else []
+    if names and not mapped:
+        return _with_facets([], counts)
+    results = await search_recipes(session, mapped, limit=limit, text_query=q, filters=filters, facets=counts)
+    return _with_facets(results, counts)
+
+
+@router.get("/search_by_set")
+async def api_search_by_set(
+    ingredient: List[str] = Query(..., description="Repeatable: ?ingredient=egg&ingredient=onion"),
+    mode: str = Query(MODE_ANY, description="any | subset (only uses what I have) | missing (lacks at most max_missing)"),
+    max_missing: int = Query(0, ge=0, le=20),
+    limit: int = Query(20, ge=1, le=100),
+    filters: FacetFilter = Depends(facet_filter),
+    facets: bool = Query(False, description="Return {results, facets} with prep time / servings counts"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Set-containment search: "uses any of", "can cook with what I have" and
+    "missing at most k ingredients", optionally narrowed by prep time and servings.
+    """
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(MODES)}")
+    counts = FacetCounts() if facets else None
+    names = [s.strip() for s in ingredient if s and s.strip()]
+    mapped = await map_input_to_ingredient_names(session, names)
+    if not mapped:
+        return _with_facets([], counts)
+    results = await search_recipes(session, mapped, limit=limit, mode=mode, max_missing=max_missing,
+                                   filters=filters, facets=counts)
+    return _with_facets(results, counts)
@@ -1,28 +1,126 @@
 """
 Async SQLAlchemy engine and session factory for What2Cook.
+
+On SQLite, SQLITE_PROFILE=production turns the dev fallback into a setup fit
+for single-node deployments: every connection gets WAL journaling and the
+other PRAGMAs below, reads use a pool of connections, and all writes go
+through one serialized writer connection. A session switches to the writer at
+its first INSERT/UPDATE/DELETE (or flush) and stays there until the
+transaction ends, so it reads its own writes; concurrent writers queue on the
+writer pool instead of failing with "database is locked".
 """
 import os
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import declarative_base
+import re
+from typing import AsyncGenerator, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.sql.elements import TextClause
 
 DATABASE_URL = os.getenv("DATABASE_URL") or os.getenv(
     "DEV_DATABASE_URL", "sqlite+aiosqlite:///./dev.db"
 )
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+
+# "basic": foreign keys only (dev); "production": PRAGMAs + single writer
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "basic").lower()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+_READ_SQL = re.compile(r"^\s*(SELECT|WITH|EXPLAIN)\b", re.IGNORECASE)
+
+
+def _sqlite_pragmas(profile: str):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled per connection
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if profile == "production":
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
+
+
+def _on_connect(engine: AsyncEngine, pragmas) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas_on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cur.execute(pragma)
+        cur.close()
+
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if getattr(clause, "is_dml", False):
+        return True
+    if isinstance(clause, TextClause):
+        return not _READ_SQL.match(clause.text)
+    return False
 
-_engine = create_async_engine(
-    DATABASE_URL,
-    future=True,
-    echo=(os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")),
-)
 
-AsyncSessionLocal = async_sessionmaker(bind=_engine, expire_on_commit=False)
+def make_engines(url: str = DATABASE_URL, sqlite_profile: str = SQLITE_PROFILE) -> Tuple[AsyncEngine, AsyncEngine]:
+    """(read engine, write engine); the same engine twice unless SQLite runs the production profile."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        engine = create_async_engine(url, future=True, echo=SQL_ECHO)
+        return engine, engine
+    in_memory = parsed.database in (None, "", ":memory:")
+    if sqlite_profile != "production" or in_memory:
+        engine = create_async_engine(url, future=True, echo=SQL_ECHO)
+        _on_connect(engine, _sqlite_pragmas("basic" if in_memory else sqlite_profile))
+        return engine, engine
+    pragmas = _sqlite_pragmas(sqlite_profile)
+    reader = create_async_engine(url, future=True, echo=SQL_ECHO, pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0)
+    writer = create_async_engine(url, future=True, echo=SQL_ECHO, pool_size=1, max_overflow=0, pool_timeout=60)
+    _on_connect(reader, pragmas)
+    _on_connect(writer, pragmas)
+    return reader, writer
+
+
+def make_sessionmaker(read_engine: AsyncEngine, write_engine: AsyncEngine) -> async_sessionmaker:
+    if write_engine is read_engine:
+        return async_sessionmaker(bind=read_engine, expire_on_commit=False)
+
+    class RoutingSession(Session):
+        def get_bind(self, mapper=None, clause=None, **kw):
+            if self.info.get("writer") or self._flushing or _is_write(clause):
+                self.info["writer"] = True
+                return write_engine.sync_engine
+            return read_engine.sync_engine
+
+    @event.listens_for(RoutingSession, "after_transaction_end")
+    def _back_to_readers(session, transaction):
+        if transaction.parent is None:
+            session.info.pop("writer", None)
+
+    return async_sessionmaker(bind=read_engine, sync_session_class=RoutingSession, expire_on_commit=False)
+
+
+_engine, _write_engine = make_engines()
+
+AsyncSessionLocal = make_sessionmaker(_engine, _write_engine)
 Base = declarative_base()
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
 
+async def warm_engines() -> None:
+    """Open one connection per engine, so a bad DATABASE_URL fails at startup and the first request finds a pooled connection."""
+    engines = [_engine] if _write_engine is _engine else [_engine, _write_engine]
+    for engine in engines:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
 async def init_db() -> None:
-    async with _engine.begin() as conn:
+    async with _write_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
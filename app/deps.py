@@ -1,24 +1,62 @@
+import datetime
+import os
 import uuid
+from typing import Optional
 from fastapi import Request, Response
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.anon import AnonUser
 from app.db import get_session
 from app.utils.anon_cookie import load_anon_cookie_val, make_anon_cookie_val
 
-async def get_or_create_anon_user(request: Request, response: Response, session: AsyncSession):
+# last_seen is only rewritten when older than this, so active users cost one
+# UPDATE per interval instead of one per request
+ANON_TOUCH_INTERVAL = datetime.timedelta(seconds=int(os.getenv("ANON_TOUCH_INTERVAL_SECONDS", str(60 * 60 * 12))))
+
+
+def anon_id_from_cookie(request: Request) -> Optional[uuid.UUID]:
     cookie = request.cookies.get("anon_id")
-    anon_id = None
-    if cookie:
-        anon_id = load_anon_cookie_val(cookie)
-    if anon_id:
-        try:
-            q = await session.execute(select(AnonUser).where(AnonUser.id == anon_id))
-            user = q.scalars().first()
-            if user:
-                return user
-        except Exception:
-            pass
+    if not cookie:
+        return None
+    raw = load_anon_cookie_val(cookie)
+    if not raw:
+        return None
+    try:
+        return uuid.UUID(str(raw))
+    except ValueError:
+        return None
+
+
+async def get_anon_user(request: Request, session: AsyncSession) -> Optional[AnonUser]:
+    """
+    Return the anon user for the request cookie without creating one. Read-only
+    endpoints use this so crawlers and first-time visitors don't insert rows.
+    """
+    anon_id = anon_id_from_cookie(request)
+    if not anon_id:
+        return None
+    try:
+        q = await session.execute(select(AnonUser).where(AnonUser.id == anon_id))
+        user = q.scalars().first()
+    except Exception:
+        return None
+    if user:
+        await _touch(session, user)
+    return user
+
+
+async def _touch(session: AsyncSession, user: AnonUser) -> None:
+    now = datetime.datetime.utcnow()
+    if user.last_seen and now - user.last_seen < ANON_TOUCH_INTERVAL:
+        return
+    await session.execute(update(AnonUser).where(AnonUser.id == user.id).values(last_seen=now))
+    await session.commit()
+
+
+async def get_or_create_anon_user(request: Request, response: Response, session: AsyncSession):
+    user = await get_anon_user(request, session)
+    if user:
+        return user
 
     new_id = uuid.uuid4()
     user = AnonUser(id=new_id)
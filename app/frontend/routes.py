@@ -1,91 +1,124 @@
 import re
 from fastapi import APIRouter, Depends, Query
-from fastapi.templating import Jinja2Templates
 from app.db import get_session
-from app.models import Recipe, Ingredient
+from app.models import Ingredient
 from app.services.recipes import list_recipes, get_recipe, search_recipes
+from app.services.bookmarks import list_bookmarks
+from app.services.action_buffer import action_buffer
+from app.services.query_log import query_log
+from app.services.search_cache import search_cache
+from app.services.trending import trending, trending_recipes
+from app.services.similar import get_similar_recipes
+from app.services.recommendations import get_recommendations, get_recommendations_for_set
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.utils.mapping import map_input_to_ingredient_names
 from fastapi import Request, Response
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from app.models.anon import RecipeAction
-from app.deps import get_or_create_anon_user
+from sqlalchemy import select
+from app.deps import get_anon_user
+from app.utils.concurrency import gather_reads
+from app.utils.snapshots import serve_snapshot
+from app.templates import get_templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+CAROUSEL_SIZE = 12
 @router.get("/", include_in_schema=False, name="index")
 async def index(request: Request, page: int = Query(1, ge=1), session: AsyncSession = Depends(get_session)):
-    ctx = await list_recipes(session, page=page)
-    ctx.update({"request": request})
-    return templates.TemplateResponse("index.html", ctx)
+    # the carousel shows trending recipes once there are any, the first catalog page before that
+    ctx, popular = await gather_reads(
+        session,
+        lambda s: list_recipes(s, page=page),
+        lambda s: trending_recipes(s, limit=CAROUSEL_SIZE, with_scores=False),
+    )
+    ctx.update({"request": request, "trending": popular})
+    return get_templates().TemplateResponse("index.html", ctx)
 
 @router.get("/catalog", include_in_schema=False, name="catalog_page")
 async def catalog_page(request: Request, page: int = Query(1, ge=1), session: AsyncSession = Depends(get_session)):
+    snapshot = serve_snapshot(request, "catalog", page)
+    if snapshot is not None:
+        return snapshot
     ctx = await list_recipes(session, page=page)
     ctx.update({"request": request})
-    return templates.TemplateResponse("catalog.html", ctx)
+    return get_templates().TemplateResponse("catalog.html", ctx)
+
+async def recipe_page_context(session: AsyncSession, recipe_id: int):
+    """Template context of the detail page, or None when the recipe does not exist."""
+    recipe, similar, also_saved = await gather_reads(
+        session,
+        lambda s: get_recipe(s, recipe_id),
+        lambda s: get_similar_recipes(s, recipe_id),
+        lambda s: get_recommendations(s, recipe_id),
+    )
+    if not recipe:
+        return None
+    return {"recipe": recipe, "similar": similar, "also_saved": also_saved}
 
 @router.get("/recipes/{recipe_id}", include_in_schema=False, name="recipe_page")
 async def recipe_page(request: Request, recipe_id: int, session: AsyncSession = Depends(get_session)):
-    recipe = await get_recipe(session, recipe_id)
-    if not recipe:
+    snapshot = serve_snapshot(request, "recipes", recipe_id)
+    if snapshot is not None:
+        trending.record(recipe_id, "view")
+        return snapshot
+    ctx = await recipe_page_context(session, recipe_id)
+    if ctx is None:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return templates.TemplateResponse("recipe_detail_page.html", {"request": request, "recipe": recipe})
+    trending.record(recipe_id, "view")
+    ctx.update({"request": request})
+    return get_templates().TemplateResponse("recipe_detail_page.html", ctx)
+
+async def ingredients_for_search_page(session: AsyncSession):
+    res = await session.execute(select(Ingredient.name).order_by(Ingredient.name_norm).limit(2000))
+    return [row[0] for row in res.all() if row and row[0] is not None]
 
 @router.get("/search", include_in_schema=False, name="search")
-async def search(request: Request, ingredients: str | None = Query(None), limit: int | None = Query(20), session: AsyncSession = Depends(get_session)):
+async def search(request: Request, ingredients: str | None = Query(None), q: str | None = Query(None), limit: int | None = Query(20), session: AsyncSession = Depends(get_session)):
     """
     Render search page. If no `ingredients` query param — load and show all available ingredients.
     If `ingredients` provided (comma- or newline-separated) perform search and show recipes.
+    `q` adds a full-text filter over titles and instructions (and works on its own).
     """
-    stmt = select(Ingredient.name).order_by(func.lower(Ingredient.name)).limit(2000)
-    res = await session.execute(stmt)
-    available_ings = [row[0] for row in res.all() if row and row[0] is not None]
-
     raw = ingredients or ""
-    user_inputs = [s.strip() for s in re.split(r'[,\\n]+', raw) if s.strip()]
-    if not user_inputs:
-        return templates.TemplateResponse("search.html", {"request": request, "ingredients": available_ings})
+    user_inputs = [s.strip() for s in re.split(r'[,\n]+', raw) if s.strip()]
+    if not user_inputs and not q:
+        available_ings = await ingredients_for_search_page(session)
+        return get_templates().TemplateResponse("search.html", {"request": request, "ingredients": available_ings})
+
+    limit = int(limit or 20)
+    key = query_log.record(user_inputs)
+    # ingredient-only searches are cached (and warmed from the query log); text queries are not
+    cache_key = ("page", key, limit) if key and not q else None
+
+    async def run_search(s: AsyncSession):
+        cached = search_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+        mapped_names = await map_input_to_ingredient_names(s, user_inputs) if user_inputs else []
+        if user_inputs and not mapped_names:
+            # none of the ingredients exist: nothing matches (as /api/recipes/search_text)
+            return []
+        results = await search_recipes(s, mapped_names, limit=limit, text_query=q)
+        if cache_key and mapped_names:
+            search_cache.put(cache_key, results, mapped_names)
+        return results
 
-    mapped_names = await map_input_to_ingredient_names(session, user_inputs)
-    recipes = await search_recipes(session, mapped_names, limit=int(limit or 20))
-    return templates.TemplateResponse("search.html", {"request": request, "recipes": recipes, "ingredients": available_ings})
+    # the ingredient list does not depend on the search: load it alongside
+    recipes, available_ings = await gather_reads(session, run_search, ingredients_for_search_page)
+    return get_templates().TemplateResponse("search.html", {"request": request, "recipes": recipes, "ingredients": available_ings})
 
 @router.get("/bookmarks", include_in_schema=False, name="bookmarks")
-async def bookmarks_page(request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+async def bookmarks_page(request: Request, response: Response, cursor: str | None = Query(None), session: AsyncSession = Depends(get_session)):
     """
     Render page with recipes that the current anon user bookmarked.
     """
-    anon = await get_or_create_anon_user(request, response, session)
-
-    stmt = (
-        select(Recipe)
-        .join(RecipeAction, RecipeAction.recipe_id == Recipe.id)
-        .where(
-            RecipeAction.anon_user_id == anon.id,
-            RecipeAction.action_type == "bookmark",
-        )
-        .options(selectinload(Recipe.ingredients))
-        .order_by(RecipeAction.created_at.desc())
-    )
-    res = await session.execute(stmt)
-    recs = res.scalars().unique().all()
-
-    def to_out(rec):
-        return {
-            "id": rec.id,
-            "title": rec.title,
-            "instructions": rec.instructions,
-            "prep_minutes": rec.prep_minutes,
-            "servings": rec.servings,
-            "image_url": rec.image_url,
-            "thumbnail_url": rec.thumbnail_url,
-            "image_meta": rec.image_meta,
-            "ingredients": [ing.name for ing in getattr(rec, "ingredients", [])] if getattr(rec, "ingredients", None) else [],
-            "likes_count": getattr(rec, "likes_count", 0),
-        }
-
-    ctx = {"request": request, "recipes": [to_out(r) for r in recs]}
-    return templates.TemplateResponse("bookmarks.html", ctx)
\ No newline at end of file
+    anon = await get_anon_user(request, session)
+    if anon:
+        if action_buffer.has_pending(anon.id):
+            await action_buffer.flush()
+        ctx = await list_bookmarks(session, anon.id, cursor=cursor)
+        ctx["also_saved"] = await get_recommendations_for_set(session, [r["id"] for r in ctx["recipes"]])
+    else:
+        ctx = {"recipes": [], "next_cursor": None, "total": 0}
+    ctx.update({"request": request, "cursor": cursor})
+    return get_templates().TemplateResponse("bookmarks.html", ctx)
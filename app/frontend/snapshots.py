@@ -0,0 +1,185 @@
+"""
+Snapshot builder: pre-renders recipe detail and catalog pages into SNAPSHOT_DIR.
+
+Every page gets a digest of what it is rendered from: for a recipe, its own
+`updated_at` plus the ids, scores and `updated_at` of the recipes in its
+"similar" and "also saved" strips; for a catalog page, the ids and
+`updated_at` of its recipes and the page count. A digest of the template
+files goes into all of them. Those inputs come from three bulk queries; only
+pages whose digest differs from the manifest of the previous build are
+rendered again, and pages of recipes that no longer exist are removed.
+
+Digests miss writes that leave `updated_at` alone (a renamed ingredient, links
+inserted with Core). The manifest therefore also records the catalog change
+feed version of the build (app/services/catalog_changes.py); recipes changed
+since then, recipes using a changed ingredient, pages whose strips show one
+of those, and catalog pages listing them are rendered again whatever their
+digest. Without a usable version (first build, or the feed was pruned past
+it) every page is rendered.
+"""
+import hashlib
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from fastapi import FastAPI, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, RecipeNeighbor, RecipeRecommendation
+from app.services.catalog_changes import affected_recipe_ids, changes_since, current_version
+from app.services.recipes import PER_PAGE, list_recipes
+from app.utils.snapshots import SNAPSHOT_BASE_URL, SnapshotStore, snapshot_store
+from app.templates import TEMPLATES_DIR, get_templates
+from .routes import recipe_page_context
+
+logger = logging.getLogger(__name__)
+
+# strip lengths used by the detail page (get_similar_recipes / get_recommendations defaults)
+STRIP_LIMIT = 6
+
+
+@dataclass
+class SnapshotReport:
+    rendered: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _templates_digest(directory: str = str(TEMPLATES_DIR)) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            # relative: the digest must not change with the checkout location
+            h.update(os.path.relpath(path, directory).encode("utf-8"))
+            with open(path, "rb") as fh:
+                h.update(fh.read())
+    return h.hexdigest()
+
+
+def snapshot_request(app: FastAPI, path: str, query: str = "", base_url: str = SNAPSHOT_BASE_URL) -> Request:
+    """A GET request for `path` as if it came in on `base_url`, for url_for() in templates."""
+    url = urlsplit(base_url)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return Request({
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": url.scheme,
+        "server": (url.hostname, port),
+        "root_path": url.path.rstrip("/"),
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "query_string": query.encode("latin-1"),
+        "headers": [(b"host", url.netloc.encode("latin-1"))],
+        "app": app,
+        "router": app.router,
+    })
+
+
+async def _strips(session: AsyncSession, model, other_column) -> Dict[int, List]:
+    """recipe_id -> [(other_id, score)] in display order, as the detail page strips show them."""
+    rows = await session.execute(
+        select(model.recipe_id, other_column, model.score).order_by(model.recipe_id, model.rank)
+    )
+    out: Dict[int, List] = defaultdict(list)
+    for rid, other, score in rows.all():
+        if len(out[rid]) < STRIP_LIMIT:
+            out[rid].append((other, score))
+    return out
+
+
+async def build_snapshots(
+    session: AsyncSession,
+    app: FastAPI,
+    store: Optional[SnapshotStore] = None,
+    base_url: str = SNAPSHOT_BASE_URL,
+    full: bool = False,
+) -> Dict[str, SnapshotReport]:
+    """Render changed recipe and catalog pages; returns a report per kind ("recipes", "catalog")."""
+    store = store or snapshot_store
+    if store is None:
+        raise RuntimeError("SNAPSHOT_DIR is not set")
+    previous = store.load_manifest()
+    # keys of the previous build are still used to remove pages of deleted recipes
+    rerender = full or previous.get("base_url") != base_url
+    tmpl = _templates_digest()
+
+    # read first: a change committed during the build is picked up again by the next one
+    version = await current_version(session)
+    changes = await changes_since(session, previous.get("catalog_version"), limit=None)
+    rerender = rerender or changes.full
+    forced = set() if rerender else await affected_recipe_ids(session, changes)
+
+    rows = (await session.execute(select(Recipe.id, Recipe.updated_at).order_by(Recipe.title, Recipe.id))).all()
+    updated = {rid: str(ts) for rid, ts in rows}
+    similar = await _strips(session, RecipeNeighbor, RecipeNeighbor.neighbor_id)
+    also_saved = await _strips(session, RecipeRecommendation, RecipeRecommendation.other_id)
+    if forced:
+        forced |= {
+            rid for rid in updated
+            if any(other in forced for strip in (similar.get(rid, ()), also_saved.get(rid, ())) for other, _ in strip)
+        }
+
+    def strip_state(strip):
+        # a strip shows the other recipe's title and image: its updated_at covers them
+        return [(other, score, updated.get(other)) for other, score in strip]
+
+    wanted = {
+        "recipes": {
+            str(rid): _digest(tmpl, ts, strip_state(similar.get(rid, ())), strip_state(also_saved.get(rid, ())))
+            for rid, ts in updated.items()
+        },
+        "catalog": {},
+    }
+    stale = {"recipes": {str(rid) for rid in forced}, "catalog": set()}
+    total_pages = max(1, (len(rows) + PER_PAGE - 1) // PER_PAGE)
+    for page in range(1, total_pages + 1):
+        chunk = rows[(page - 1) * PER_PAGE:page * PER_PAGE]
+        wanted["catalog"][str(page)] = _digest(tmpl, total_pages, [(rid, str(ts)) for rid, ts in chunk])
+        if any(rid in forced for rid, _ in chunk):
+            stale["catalog"].add(str(page))
+
+    reports: Dict[str, SnapshotReport] = {}
+    manifest = {"base_url": base_url, "catalog_version": version}
+    for kind in ("recipes", "catalog"):
+        started = time.perf_counter()
+        report = SnapshotReport()
+        done = dict(previous.get(kind, {}))
+        for key, digest in wanted[kind].items():
+            if not rerender and key not in stale[kind] and done.get(key) == digest and store.exists(kind, key):
+                report.unchanged += 1
+                continue
+            if kind == "recipes":
+                ctx = await recipe_page_context(session, int(key))
+                if ctx is None:  # deleted since the id query
+                    continue
+                template, path = "recipe_detail_page.html", f"/recipes/{key}"
+                request = snapshot_request(app, path, base_url=base_url)
+            else:
+                ctx = await list_recipes(session, page=int(key))
+                template = "catalog.html"
+                request = snapshot_request(app, "/catalog", f"page={key}", base_url=base_url)
+            ctx["request"] = request
+            store.write(kind, key, get_templates().get_template(template).render(ctx))
+            done[key] = digest
+            report.rendered += 1
+        for key in set(done) - set(wanted[kind]):
+            store.remove(kind, key)
+            del done[key]
+            report.removed += 1
+        manifest[kind] = done
+        report.seconds = time.perf_counter() - started
+        reports[kind] = report
+        logger.info("Snapshots %s: %d rendered, %d unchanged, %d removed (%.2fs)",
+                    kind, report.rendered, report.unchanged, report.removed, report.seconds)
+    store.save_manifest(manifest)
+    return reports
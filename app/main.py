@@ -1,17 +1,118 @@
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import contextlib
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.frontend import routes as frontend_routes
 from app.api import recipes as recipes_api_mod
 from app.api import actions as actions_api_mod
 from app.api import search as search_api_mod
+from app.api import export as export_api_mod
+from app.api import images as images_api_mod
+from app.api import metrics as metrics_api_mod
+from app.services.action_buffer import ACTION_WRITE_BEHIND, action_buffer
+from app.services.retention import ANON_GC_INTERVAL_SECONDS, run_retention_schedule
+from app.services.action_stats import ACTION_LOG_INTERVAL_SECONDS, maintain_action_log, run_action_log_schedule
+from app.services.recommendations import RECS_INTERVAL_SECONDS, run_recommendations_schedule
+from app.services.query_log import QUERY_LOG_ENABLED, query_log
+from app.services.search_cache import SEARCH_CACHE_ENABLED, apply_catalog_changes, run_search_cache_warmup
+from app.services.catalog_changes import CATALOG_FEED_ENABLED, catalog_feed
+from app.services.trending import TRENDING_ENABLED, trending
+from app.services.search_index import SEARCH_INDEX_BUILD_ON_START, SEARCH_INDEX_PATH, build_search_index, get_search_index
+from app.db import AsyncSessionLocal, warm_engines
+from app.utils.admission import ADMISSION_ENABLED, AdmissionMiddleware
+from app.utils.profiler import PROFILER_ENABLED, SlowRequestProfilerMiddleware
+from app.utils.startup import startup_timer
 
-app = FastAPI(title="What2Cook", version="0.3.0")
+# false: JSON API only; Jinja, the page routes and /static are never loaded
+FRONTEND_ENABLED = os.getenv("FRONTEND_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    # order matters: the database first (fail fast on a bad URL), then what is built from it
+    with startup_timer.phase("database"):
+        await warm_engines()
+    if FRONTEND_ENABLED:
+        with startup_timer.phase("templates"):
+            from app.templates import init_templates
+            init_templates()
+    with startup_timer.phase("search_index"):
+        if SEARCH_INDEX_PATH and SEARCH_INDEX_BUILD_ON_START and get_search_index() is None:
+            async with AsyncSessionLocal() as session:
+                await build_search_index(session)
+    if TRENDING_ENABLED:
+        with startup_timer.phase("trending"):
+            try:
+                await trending.load()
+            except Exception:
+                logging.getLogger(__name__).exception("Loading trending scores failed")
+    with startup_timer.phase("action_log"):
+        try:
+            # cheap and idempotent; keeps future action log partitions around without a cron job
+            await maintain_action_log(retention_months=0)
+        except Exception:
+            logging.getLogger(__name__).exception("Action log partition check failed")
+    with startup_timer.phase("background_tasks"):
+        if ACTION_WRITE_BEHIND:
+            action_buffer.start()
+        if QUERY_LOG_ENABLED:
+            query_log.start()
+        if TRENDING_ENABLED:
+            trending.start()
+        if ANON_GC_INTERVAL_SECONDS > 0:
+            tasks.append(asyncio.create_task(run_retention_schedule(), name="anon-retention"))
+        if RECS_INTERVAL_SECONDS > 0:
+            tasks.append(asyncio.create_task(run_recommendations_schedule(), name="recommendations"))
+        if ACTION_LOG_INTERVAL_SECONDS > 0:
+            tasks.append(asyncio.create_task(run_action_log_schedule(), name="action-log"))
+        # warm-up runs in the background: the worker serves (cold) requests meanwhile
+        if CATALOG_FEED_ENABLED:
+            if SEARCH_CACHE_ENABLED:
+                # the first poll hands over a full change set, which warms the cache
+                catalog_feed.subscribe("search_cache", apply_catalog_changes)
+            catalog_feed.start()
+        elif SEARCH_CACHE_ENABLED:
+            tasks.append(asyncio.create_task(run_search_cache_warmup(), name="search-cache"))
+    startup_timer.done()
+    try:
+        yield
+    finally:
+        if CATALOG_FEED_ENABLED:
+            await catalog_feed.close()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if ACTION_WRITE_BEHIND:
+            # pending toggles must reach the DB before the worker exits
+            await action_buffer.close()
+        if QUERY_LOG_ENABLED:
+            await query_log.close()
+        if TRENDING_ENABLED:
+            await trending.close()
+
+
+app = FastAPI(title="What2Cook", version="0.3.0", lifespan=lifespan)
+
+if PROFILER_ENABLED:
+    app.add_middleware(SlowRequestProfilerMiddleware)
+if ADMISSION_ENABLED:
+    # added last = outermost: shed requests are answered before anything else runs
+    app.add_middleware(AdmissionMiddleware)
 
 app.include_router(search_api_mod.router)
 app.include_router(actions_api_mod.router)
 app.include_router(recipes_api_mod.router)
+app.include_router(export_api_mod.router)
+app.include_router(metrics_api_mod.router)
+app.include_router(images_api_mod.router)
 
-# frontend
-app.include_router(frontend_routes.router)
+if FRONTEND_ENABLED:
+    from fastapi.staticfiles import StaticFiles
+    from app.frontend import routes as frontend_routes
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    app.include_router(frontend_routes.router)
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -2,5 +2,12 @@ from .anon import AnonUser, RecipeAction
 from .base import Base
 from .recipe import Recipe, recipe_ingredient
 from .ingredient import Ingredient
+from .similar import RecipeNeighbor
+from .recommendations import RecipeRecommendation
+from .action_log import RecipeActionDaily
+from .search_log import SearchQueryStat
+from .trending import RecipeTrending
+from .catalog_change import CatalogChange
+from . import fulltext, ingredient_sets  # noqa: F401  (register raw DDL on metadata create)
 
-__all__ = ["Base", "Recipe", "Ingredient", "recipe_ingredient", "AnonUser", "RecipeAction"]
+__all__ = ["Base", "Recipe", "Ingredient", "recipe_ingredient", "AnonUser", "RecipeAction", "RecipeNeighbor", "RecipeRecommendation", "RecipeActionDaily", "SearchQueryStat", "RecipeTrending", "CatalogChange"]
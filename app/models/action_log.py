@@ -0,0 +1,195 @@
+"""
+Like/bookmark history: `recipe_action_event` log and `recipe_action_daily` rollup.
+
+recipe_action holds current state (one row per user, recipe and action type,
+deleted again on unlike), so it cannot be range-partitioned without losing the
+unique key the toggles rely on. What grows with every click is the history,
+which triggers on recipe_action record here:
+
+- PostgreSQL: statement-level triggers append one row per change (+1 insert,
+  -1 delete) to `recipe_action_event`, range-partitioned by month on
+  `created_at` (`recipe_action_event_pYYYYMM`), and add the same changes,
+  grouped, to `recipe_action_daily`. `recipe_action_event_ensure_partitions(n)`
+  creates the current and next n months; `recipe_action_event_drop_partitions(k)`
+  detaches and drops months older than k (see app/services/action_stats.py).
+- SQLite: row triggers maintain `recipe_action_daily` only; no event log.
+
+Popularity and analytics queries read `recipe_action_daily`. Days are UTC.
+"""
+from sqlalchemy import Column, Date, Integer, String, Index, event, text
+from .base import Base
+
+
+class RecipeActionDaily(Base):
+    """Per-day like/bookmark changes per recipe, maintained by triggers on recipe_action."""
+    __tablename__ = "recipe_action_daily"
+
+    day = Column(Date, primary_key=True)
+    recipe_id = Column(Integer, primary_key=True)
+    action_type = Column(String(32), primary_key=True)
+    added = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # per-recipe history; the PK (day first) serves "top recipes over the last N days"
+        Index("ix_recipe_action_daily_recipe_day", "recipe_id", "day"),
+    )
+
+
+PG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS recipe_action_event (
+        id bigserial,
+        anon_user_id uuid NOT NULL,
+        recipe_id integer NOT NULL,
+        action_type varchar(32) NOT NULL,
+        delta smallint NOT NULL,
+        created_at timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipe_action_event_recipe_created ON recipe_action_event (recipe_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_recipe_action_event_user_created ON recipe_action_event (anon_user_id, created_at)",
+    # catches rows when maintenance has lapsed; months with rows here are not split out later
+    "CREATE TABLE IF NOT EXISTS recipe_action_event_default PARTITION OF recipe_action_event DEFAULT",
+    """
+    CREATE OR REPLACE FUNCTION recipe_action_event_ensure_partitions(months_ahead integer) RETURNS integer
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        first_month date := date_trunc('month', now() AT TIME ZONE 'utc')::date;
+        m date;
+        part text;
+        created integer := 0;
+    BEGIN
+        -- every worker runs this at startup
+        PERFORM pg_advisory_xact_lock(hashtext('recipe_action_event_partitions'));
+        FOR i IN 0..months_ahead LOOP
+            m := (first_month + make_interval(months => i))::date;
+            part := 'recipe_action_event_p' || to_char(m, 'YYYYMM');
+            CONTINUE WHEN to_regclass(part) IS NOT NULL;
+            IF EXISTS (SELECT 1 FROM recipe_action_event_default
+                       WHERE created_at >= m AND created_at < m + interval '1 month') THEN
+                RAISE NOTICE 'recipe_action_event: % has rows in the default partition, not created', part;
+                CONTINUE;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF recipe_action_event FOR VALUES FROM (%L) TO (%L)',
+                part, m, (m + interval '1 month')::date
+            );
+            created := created + 1;
+        END LOOP;
+        RETURN created;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipe_action_event_drop_partitions(keep_months integer) RETURNS integer
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        cutoff date := (date_trunc('month', now() AT TIME ZONE 'utc') - make_interval(months => keep_months))::date;
+        part text;
+        dropped integer := 0;
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('recipe_action_event_partitions'));
+        FOR part IN
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'recipe_action_event'::regclass
+              AND CASE WHEN c.relname ~ '^recipe_action_event_p[0-9]{6}$'
+                       THEN to_date(right(c.relname, 6), 'YYYYMM') < cutoff ELSE false END
+            ORDER BY c.relname
+        LOOP
+            EXECUTE format('ALTER TABLE recipe_action_event DETACH PARTITION %I', part);
+            EXECUTE format('DROP TABLE %I', part);
+            dropped := dropped + 1;
+        END LOOP;
+        DELETE FROM recipe_action_event_default WHERE created_at < cutoff;
+        RETURN dropped;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipe_action_log_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        d smallint := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+    BEGIN
+        INSERT INTO recipe_action_event (anon_user_id, recipe_id, action_type, delta)
+        SELECT anon_user_id, recipe_id, action_type, d FROM changed_rows;
+        -- fixed lock order, so concurrent multi-row statements cannot deadlock on the rollup
+        INSERT INTO recipe_action_daily AS t (day, recipe_id, action_type, added, removed)
+        SELECT (now() AT TIME ZONE 'utc')::date, recipe_id, action_type,
+               CASE WHEN d > 0 THEN count(*) ELSE 0 END, CASE WHEN d < 0 THEN count(*) ELSE 0 END
+        FROM changed_rows
+        GROUP BY recipe_id, action_type
+        ORDER BY recipe_id, action_type
+        ON CONFLICT (day, recipe_id, action_type)
+        DO UPDATE SET added = t.added + EXCLUDED.added, removed = t.removed + EXCLUDED.removed;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS recipe_action_log_ins ON recipe_action",
+    "DROP TRIGGER IF EXISTS recipe_action_log_del ON recipe_action",
+    """
+    CREATE TRIGGER recipe_action_log_ins AFTER INSERT ON recipe_action
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipe_action_log_changes()
+    """,
+    """
+    CREATE TRIGGER recipe_action_log_del AFTER DELETE ON recipe_action
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipe_action_log_changes()
+    """,
+]
+
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_action_daily_ai AFTER INSERT ON recipe_action BEGIN
+        INSERT INTO recipe_action_daily (day, recipe_id, action_type, added, removed)
+        VALUES (date('now'), new.recipe_id, new.action_type, 1, 0)
+        ON CONFLICT (day, recipe_id, action_type) DO UPDATE SET added = added + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_action_daily_ad AFTER DELETE ON recipe_action BEGIN
+        INSERT INTO recipe_action_daily (day, recipe_id, action_type, added, removed)
+        VALUES (date('now'), old.recipe_id, old.action_type, 0, 1)
+        ON CONFLICT (day, recipe_id, action_type) DO UPDATE SET removed = removed + 1;
+    END
+    """,
+]
+
+# existing actions count as added on the day they were created
+BACKFILL_DAILY = """
+    INSERT INTO recipe_action_daily (day, recipe_id, action_type, added, removed)
+    SELECT {day}, recipe_id, action_type, count(*), 0
+    FROM recipe_action
+    GROUP BY {day}, recipe_id, action_type
+"""
+BACKFILL_DAY = {
+    "postgresql": "CAST(COALESCE(created_at, now() AT TIME ZONE 'utc') AS date)",
+    "sqlite": "date(COALESCE(created_at, 'now'))",
+}
+
+PARTITIONS_AHEAD = 3
+
+
+def create_action_log(connection) -> None:
+    dialect = connection.dialect.name
+    if dialect not in BACKFILL_DAY:
+        return
+    if connection.execute(text("SELECT 1 FROM recipe_action_daily LIMIT 1")).first() is None:
+        # before the triggers exist, so nothing is counted twice
+        connection.execute(text(BACKFILL_DAILY.format(day=BACKFILL_DAY[dialect])))
+    if dialect == "postgresql":
+        for stmt in PG_DDL:
+            connection.execute(text(stmt))
+        connection.execute(text("SELECT recipe_action_event_ensure_partitions(:n)"), {"n": PARTITIONS_AHEAD})
+    else:
+        for stmt in SQLITE_DDL:
+            connection.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_action_log(connection)
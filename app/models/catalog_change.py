@@ -0,0 +1,124 @@
+"""
+Catalog change feed: `catalog_change` outbox filled by triggers on recipes,
+ingredients and recipe_ingredient.
+
+Every inserted, updated or deleted row appends one change in the same
+transaction, whoever wrote it (ORM, Core inserts in fixtures and scripts,
+psql). `version` is the change's position in the feed; consumers remember the
+last version they applied and read what came after it
+(app/services/catalog_changes.py).
+
+- entity "recipe": recipe_id set; "ingredient": ingredient_id set;
+  "recipe_ingredient": both (a link added or removed).
+- op: "insert", "update" or "delete". TRUNCATE is not recorded.
+
+On PostgreSQL the statement-level triggers take a transaction-level advisory
+lock before taking versions from the sequence, so catalog writers commit in
+version order and a reader never sees version n+1 while n is still in flight
+(catalog writes are imports and admin edits; they serialize, readers do not
+wait). SQLite has a single writer and AUTOINCREMENT keeps versions from being
+reused after old rows are pruned.
+"""
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, event, text
+from .base import Base
+
+
+class CatalogChange(Base):
+    """One changed catalog row; written by triggers only."""
+    __tablename__ = "catalog_change"
+
+    version = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(24), nullable=False)
+    op = Column(String(8), nullable=False)
+    recipe_id = Column(Integer, nullable=True)
+    ingredient_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = ({"sqlite_autoincrement": True},)
+
+
+# (table, entity); per operation: (event, trigger suffix, row the change is read from)
+TRACKED = (
+    ("recipes", "recipe"),
+    ("ingredients", "ingredient"),
+    ("recipe_ingredient", "recipe_ingredient"),
+)
+OPS = (("INSERT", "ins", "NEW"), ("UPDATE", "upd", "NEW"), ("DELETE", "del", "OLD"))
+
+PG_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION catalog_change_log() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        o varchar(8) := lower(TG_OP);
+        ts timestamp := now() AT TIME ZONE 'utc';
+    BEGIN
+        -- held until commit: versions are handed out in commit order
+        PERFORM pg_advisory_xact_lock(hashtext('catalog_change'));
+        IF TG_TABLE_NAME = 'recipes' THEN
+            INSERT INTO catalog_change (entity, op, recipe_id, changed_at)
+            SELECT 'recipe', o, id, ts FROM changed_rows ORDER BY id;
+        ELSIF TG_TABLE_NAME = 'ingredients' THEN
+            INSERT INTO catalog_change (entity, op, ingredient_id, changed_at)
+            SELECT 'ingredient', o, id, ts FROM changed_rows ORDER BY id;
+        ELSE
+            INSERT INTO catalog_change (entity, op, recipe_id, ingredient_id, changed_at)
+            SELECT 'recipe_ingredient', o, recipe_id, ingredient_id, ts FROM changed_rows
+            ORDER BY recipe_id, ingredient_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+]
+for _table, _ in TRACKED:
+    for _op, _suffix, _transition in OPS:
+        PG_DDL += [
+            f"DROP TRIGGER IF EXISTS catalog_change_{_suffix} ON {_table}",
+            f"""
+            CREATE TRIGGER catalog_change_{_suffix} AFTER {_op} ON {_table}
+            REFERENCING {_transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION catalog_change_log()
+            """,
+        ]
+
+_SQLITE_COLUMNS = {
+    "recipe": ("recipe_id", "{row}.id"),
+    "ingredient": ("ingredient_id", "{row}.id"),
+    "recipe_ingredient": ("recipe_id, ingredient_id", "{row}.recipe_id, {row}.ingredient_id"),
+}
+SQLITE_DDL = []
+for _table, _entity in TRACKED:
+    _columns, _values = _SQLITE_COLUMNS[_entity]
+    for _op, _suffix, _transition in OPS:
+        SQLITE_DDL.append(f"""
+            CREATE TRIGGER IF NOT EXISTS catalog_change_{_table}_{_suffix} AFTER {_op} ON {_table} BEGIN
+                INSERT INTO catalog_change (entity, op, {_columns}, changed_at)
+                VALUES ('{_entity}', '{_op.lower()}', {_values.format(row=_transition.lower())}, CURRENT_TIMESTAMP);
+            END
+        """)
+
+PG_DROP = [f"DROP TRIGGER IF EXISTS catalog_change_{s} ON {t}" for t, _ in TRACKED for _, s, _ in OPS] + [
+    "DROP FUNCTION IF EXISTS catalog_change_log()",
+]
+SQLITE_DROP = [f"DROP TRIGGER IF EXISTS catalog_change_{t}_{s}" for t, _ in TRACKED for _, s, _ in OPS]
+
+
+def create_catalog_change_triggers(connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for stmt in PG_DDL:
+            connection.execute(text(stmt))
+    elif dialect == "sqlite":
+        for stmt in SQLITE_DDL:
+            connection.execute(text(stmt))
+
+
+def drop_catalog_change_triggers(connection) -> None:
+    dialect = connection.dialect.name
+    for stmt in PG_DROP if dialect == "postgresql" else SQLITE_DROP if dialect == "sqlite" else ():
+        connection.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_catalog_change_triggers(connection)
@@ -0,0 +1,84 @@
+"""
+Full-text search DDL for recipes (title + instructions).
+
+PostgreSQL: generated `recipes.search_vector` tsvector column (title weighted
+above instructions) with a GIN index. SQLite: external-content FTS5 table
+`recipes_fts` kept in sync by triggers. Both are created by the migration
+(7c5e1b2d9a40, which calls create_fulltext/drop_fulltext) and, for dev
+databases built with `init_db()`, by the metadata listener below. The
+column/table is not mapped on Recipe; app.services.fulltext queries it.
+"""
+from sqlalchemy import event, text
+from .base import Base
+
+FTS_LANGUAGE = "english"
+
+PG_DDL = [
+    f"""
+    ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{FTS_LANGUAGE}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{FTS_LANGUAGE}', coalesce(instructions, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, instructions, content='recipes', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, instructions) VALUES (new.id, new.title, new.instructions);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions) VALUES ('delete', old.id, old.title, old.instructions);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE OF title, instructions ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions) VALUES ('delete', old.id, old.title, old.instructions);
+        INSERT INTO recipes_fts(rowid, title, instructions) VALUES (new.id, new.title, new.instructions);
+    END
+    """,
+]
+
+PG_DROP = [
+    "DROP INDEX IF EXISTS ix_recipes_search_vector",
+    "ALTER TABLE recipes DROP COLUMN IF EXISTS search_vector",
+]
+SQLITE_DROP = [f"DROP TRIGGER IF EXISTS recipes_fts_{suffix}" for suffix in ("ai", "ad", "au")] + [
+    "DROP TABLE IF EXISTS recipes_fts",
+]
+
+
+def create_fulltext(connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for stmt in PG_DDL:
+            connection.execute(text(stmt))
+    elif dialect == "sqlite":
+        existed = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'")
+        ).first()
+        for stmt in SQLITE_DDL:
+            connection.execute(text(stmt))
+        if not existed:
+            # index rows that were inserted before the triggers existed
+            connection.execute(text("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')"))
+
+
+def drop_fulltext(connection) -> None:
+    dialect = connection.dialect.name
+    for stmt in PG_DROP if dialect == "postgresql" else SQLITE_DROP if dialect == "sqlite" else ():
+        connection.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_fulltext(connection)
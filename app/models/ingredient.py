@@ -1,17 +1,39 @@
 from typing import Optional
-from sqlalchemy import Column, Integer, String, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, JSON, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, validates
+from app.utils.normalize import normalize_name
 from .base import Base
 
 
+def _default_name_norm(context) -> str:
+    # covers Core inserts (executemany included) that only pass `name`
+    return normalize_name(context.get_current_parameters().get("name"))
+
+
 class Ingredient(Base):
     __tablename__ = "ingredients"
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False, unique=True, index=True)
+    # normalize_name(name): the key every lookup uses (equality / prefix seeks)
+    name_norm = Column(String(255), nullable=False, default=_default_name_norm)
     aliases = Column(JSON, nullable=True, default=list)
 
     recipes = relationship("Recipe", secondary="recipe_ingredient", back_populates="ingredients")
 
+    __table_args__ = (
+        UniqueConstraint("name_norm", name="uq_ingredients_name_norm"),
+        # PostgreSQL needs text_pattern_ops for LIKE 'x%' under a non-C collation;
+        # elsewhere the unique index already serves prefix ranges
+        Index(
+            "ix_ingredients_name_norm_prefix", "name_norm", postgresql_ops={"name_norm": "text_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @validates("name")
+    def _sync_name_norm(self, key, value):
+        self.name_norm = normalize_name(value)
+        return value
+
     def __repr__(self) -> str:
         return f"<Ingredient id={self.id} name={self.name!r}>"
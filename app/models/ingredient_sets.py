@@ -0,0 +1,93 @@
+"""
+Denormalized `recipes.ingredient_ids int[]` (PostgreSQL only).
+
+Sorted ingredient ids per recipe, GIN-indexed, so set queries ("uses any of",
+"only uses what I have", "missing at most k") are one index-assisted
+statement. Statement-level triggers on recipe_ingredient keep it in sync, so
+direct inserts (e.g. fixtures/recipes_fixtures.py) are covered too. Other
+dialects compute the same answers from recipe_ingredient
+(app/services/ingredient_sets.py). Not mapped on Recipe. Created by the
+b81d4e6f0c23 migration (create_ingredient_sets(backfill=True)) and by the
+metadata listener below for `init_db()`.
+"""
+from sqlalchemy import event, text
+from .base import Base
+
+_RECOMPUTE = """
+    UPDATE recipes r SET ingredient_ids = COALESCE(
+        (SELECT array_agg(ri.ingredient_id ORDER BY ri.ingredient_id)
+         FROM recipe_ingredient ri WHERE ri.recipe_id = r.id),
+        '{{}}'::integer[])
+    WHERE r.id IN ({changed})
+"""
+
+PG_DDL = [
+    "ALTER TABLE recipes ADD COLUMN IF NOT EXISTS ingredient_ids integer[] NOT NULL DEFAULT '{}'",
+    f"""
+    CREATE OR REPLACE FUNCTION recipes_sync_ingredient_ids() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            {_RECOMPUTE.format(changed="SELECT recipe_id FROM new_rows")};
+        ELSIF TG_OP = 'DELETE' THEN
+            {_RECOMPUTE.format(changed="SELECT recipe_id FROM old_rows")};
+        ELSE
+            {_RECOMPUTE.format(changed="SELECT recipe_id FROM new_rows UNION SELECT recipe_id FROM old_rows")};
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_ins ON recipe_ingredient",
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_del ON recipe_ingredient",
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_upd ON recipe_ingredient",
+    """
+    CREATE TRIGGER recipe_ingredient_ids_ins AFTER INSERT ON recipe_ingredient
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_sync_ingredient_ids()
+    """,
+    """
+    CREATE TRIGGER recipe_ingredient_ids_del AFTER DELETE ON recipe_ingredient
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_sync_ingredient_ids()
+    """,
+    """
+    CREATE TRIGGER recipe_ingredient_ids_upd AFTER UPDATE ON recipe_ingredient
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_sync_ingredient_ids()
+    """,
+]
+PG_BACKFILL = _RECOMPUTE.format(changed="SELECT id FROM recipes")
+PG_INDEX = "CREATE INDEX IF NOT EXISTS ix_recipes_ingredient_ids ON recipes USING GIN (ingredient_ids)"
+
+PG_DROP = [
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_ins ON recipe_ingredient",
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_del ON recipe_ingredient",
+    "DROP TRIGGER IF EXISTS recipe_ingredient_ids_upd ON recipe_ingredient",
+    "DROP FUNCTION IF EXISTS recipes_sync_ingredient_ids()",
+    "DROP INDEX IF EXISTS ix_recipes_ingredient_ids",
+    "ALTER TABLE recipes DROP COLUMN IF EXISTS ingredient_ids",
+]
+
+
+def create_ingredient_sets(connection, backfill: bool = False) -> None:
+    """`backfill`: fill ingredient_ids of existing recipes (migrations; the triggers cover later writes)."""
+    if connection.dialect.name != "postgresql":
+        return
+    for stmt in PG_DDL:
+        connection.execute(text(stmt))
+    if backfill:
+        # before the index: building the GIN index once is cheaper than maintaining it row by row
+        connection.execute(text(PG_BACKFILL))
+    connection.execute(text(PG_INDEX))
+
+
+def drop_ingredient_sets(connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    for stmt in PG_DROP:
+        connection.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    create_ingredient_sets(connection)
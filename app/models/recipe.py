@@ -1,13 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Table, ForeignKey
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
+import datetime
+from sqlalchemy import Column, Integer, String, Text, Table, ForeignKey, DateTime, Index, event, inspect
+from sqlalchemy.orm import relationship, Session
 from .base import Base
+from .types import JSONDocument
 
 recipe_ingredient = Table(
     "recipe_ingredient",
     Base.metadata,
     Column("recipe_id", Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True),
     Column("ingredient_id", Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True),
+    # the PK leads with recipe_id; ingredient -> recipes probes need the reverse order
+    Index("ix_recipe_ingredient_ingredient_recipe", "ingredient_id", "recipe_id"),
 )
 
 class Recipe(Base):
@@ -21,8 +24,25 @@ class Recipe(Base):
     source = Column(String(255), nullable=True)
     image_url = Column(String(1024), nullable=True)
     thumbnail_url = Column(String(1024), nullable=True)
-    image_meta = Column(JSONB, nullable=True)
+    image_meta = Column(JSONDocument, nullable=True)
 
     likes_count = Column(Integer, default=0, nullable=False)
+    # bumped on every ORM update (and on ingredient list changes, below); used by
+    # incremental exports (`updated_since`)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow,
+                        nullable=False, index=True)
 
     ingredients = relationship("Ingredient", secondary=recipe_ingredient, back_populates="recipes")
+
+    __table_args__ = (
+        # facet filters (app.utils.facets): prep-time bound first, servings range within it
+        Index("ix_recipes_prep_servings", "prep_minutes", "servings"),
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_recipes_with_changed_ingredients(session, flush_context, instances):
+    # a many-to-many change alone does not UPDATE the recipes row, so onupdate would not fire
+    for obj in session.dirty:
+        if isinstance(obj, Recipe) and inspect(obj).attrs.ingredients.history.has_changes():
+            obj.updated_at = datetime.datetime.utcnow()
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, SmallInteger, Float, DateTime, ForeignKey
+from .base import Base
+
+
+class RecipeRecommendation(Base):
+    """Precomputed "people who saved this also saved" lists, see app/services/recommendations.py."""
+    __tablename__ = "recipe_recommendation"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(SmallInteger, primary_key=True)
+    other_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    support = Column(Integer, nullable=False)  # users who saved both recipes
+    computed_at = Column(DateTime, nullable=False)
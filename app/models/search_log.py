@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from .base import Base
+
+
+class SearchQueryStat(Base):
+    """Aggregated ingredient-set searches, flushed in batches by app/services/query_log.py."""
+    __tablename__ = "search_query_stat"
+
+    # sorted normalize_name() keys joined by ","
+    query_key = Column(String(512), primary_key=True)
+    hits = Column(BigInteger, nullable=False, default=0, index=True)
+    last_seen = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, SmallInteger, Float, ForeignKey
+from .base import Base
+
+
+class RecipeNeighbor(Base):
+    """Precomputed top-k similar recipes (by ingredient set), see app/services/similar.py."""
+    __tablename__ = "recipe_neighbor"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(SmallInteger, primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from .base import Base
+
+
+class RecipeTrending(Base):
+    """Checkpointed time-decayed trending scores, see app/services/trending.py."""
+    __tablename__ = "recipe_trending"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    # forward-decayed score relative to the start of `epoch` (app/utils/trending.py)
+    epoch = Column(Integer, nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
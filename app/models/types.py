@@ -0,0 +1,10 @@
+"""
+Column types that use the PostgreSQL-native type on PostgreSQL and a portable
+equivalent elsewhere (SQLite): JSONB -> JSON (text), UUID -> CHAR(32) hex.
+Python values are the same on both (dict/list, uuid.UUID).
+"""
+from sqlalchemy import JSON, Uuid
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+GUID = Uuid(as_uuid=True).with_variant(UUID(as_uuid=True), "postgresql")
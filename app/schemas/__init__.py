@@ -1,4 +1,5 @@
+from .action import ActionOp, ActionBatchIn, ActionBatchOut, ActionResult
 from .query import IngredientsQuery
 from .recipe import RecipeOut, RecipeSearchOut
 
-__all__ = ["IngredientsQuery", "RecipeOut", "RecipeSearchOut"]
+__all__ = ["ActionOp", "ActionBatchIn", "ActionBatchOut", "ActionResult", "IngredientsQuery", "RecipeOut", "RecipeSearchOut"]
@@ -0,0 +1,24 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class ActionOp(BaseModel):
+    recipe_id: int
+    action_type: Literal["like", "bookmark"]
+    desired_state: bool
+
+
+class ActionBatchIn(BaseModel):
+    ops: List[ActionOp] = Field(..., min_length=1, max_length=200, description="Operations, applied in order; the last one per recipe/action wins")
+
+
+class ActionResult(BaseModel):
+    recipe_id: int
+    action_type: str
+    state: Optional[bool] = None
+    likes_count: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ActionBatchOut(BaseModel):
+    results: List[ActionResult]
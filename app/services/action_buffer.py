@@ -0,0 +1,292 @@
+"""
+Write-behind buffer for like/bookmark toggles (ACTION_WRITE_BEHIND=1).
+
+Toggles update an in-process map of desired states and return immediately;
+a background task flushes the map every ACTION_FLUSH_INTERVAL seconds, or
+sooner once ACTION_FLUSH_MAX_PENDING keys are pending. For every key the map
+keeps the state last persisted and the state the user wants, so a like
+followed by an unlike cancels out and never reaches the database. A flush is
+one multi-row INSERT .. ON CONFLICT DO NOTHING plus one DELETE.
+
+The buffer is per process: with several workers, a user's toggles must land on
+the same worker to be coalesced, and reads on other workers see them after
+the next flush (at most ACTION_FLUSH_INTERVAL later).
+
+A toggle was already confirmed to the client, so a failed flush keeps it: a
+row the database rejects (IntegrityError/DataError, e.g. the anon user was
+purged meanwhile) is dropped, every other failure (connection lost, lock
+timeout) puts the batch back into the buffer, merged with toggles made during
+the flush, and the next flush is retried with exponential backoff up to
+ACTION_FLUSH_MAX_BACKOFF seconds. On shutdown close() keeps retrying for up
+to ACTION_CLOSE_TIMEOUT seconds and logs the keys it could not write.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models.anon import RecipeAction
+from app.services.bookmarks import invalidate_bookmark_count
+
+logger = logging.getLogger(__name__)
+
+ACTION_WRITE_BEHIND = os.getenv("ACTION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+ACTION_FLUSH_INTERVAL = float(os.getenv("ACTION_FLUSH_INTERVAL", "0.5"))
+ACTION_FLUSH_MAX_PENDING = int(os.getenv("ACTION_FLUSH_MAX_PENDING", "500"))
+ACTION_FLUSH_MAX_BACKOFF = float(os.getenv("ACTION_FLUSH_MAX_BACKOFF", "30"))
+ACTION_CLOSE_TIMEOUT = float(os.getenv("ACTION_CLOSE_TIMEOUT", "10"))
+
+# the database rejects the row itself: retrying cannot succeed
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+Key = Tuple[object, int, str]  # (anon_user_id, recipe_id, action_type)
+
+
+def insert_ignore(dialect_name: str):
+    """INSERT that skips rows violating uix_anon_recipe_action."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(RecipeAction).on_conflict_do_nothing(
+            index_elements=["anon_user_id", "recipe_id", "action_type"]
+        )
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(RecipeAction).on_conflict_do_nothing()
+    raise NotImplementedError(f"insert_ignore: unsupported dialect {dialect_name}")
+
+
+class ActionBuffer:
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        interval: float = ACTION_FLUSH_INTERVAL,
+        max_pending: int = ACTION_FLUSH_MAX_PENDING,
+        max_backoff: float = ACTION_FLUSH_MAX_BACKOFF,
+        close_timeout: float = ACTION_CLOSE_TIMEOUT,
+    ):
+        self.sessionmaker = sessionmaker
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.close_timeout = close_timeout
+        # consecutive failed flushes of the background task
+        self.failures = 0
+        self.dropped = 0
+        # key -> (persisted, desired); entries where both agree are dropped
+        self._pending: Dict[Key, Tuple[bool, bool]] = {}
+        self._by_user: Dict[object, Set[Key]] = {}
+        # batch currently being written; its desired states are what the DB is about to hold
+        self._inflight: Dict[Key, Tuple[bool, bool]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # state --------------------------------------------------------------
+
+    def _set(self, key: Key, persisted: bool, desired: bool) -> None:
+        if persisted == desired:
+            self._pending.pop(key, None)
+            keys = self._by_user.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[key[0]]
+        else:
+            self._pending[key] = (persisted, desired)
+            self._by_user.setdefault(key[0], set()).add(key)
+        if key[2] == "bookmark":
+            invalidate_bookmark_count(key[0])
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def toggle(self, session: AsyncSession, anon_id, recipe_id: int, action_type: str) -> bool:
+        """Flip the user's state for (recipe, action) and return the new state."""
+        key = (anon_id, recipe_id, action_type)
+        if key not in self._pending and key in self._inflight:
+            persisted = self._inflight[key][1]
+            self._set(key, persisted, not persisted)
+            return not persisted
+        if key not in self._pending:
+            q = await session.execute(
+                select(RecipeAction.id).where(
+                    RecipeAction.anon_user_id == anon_id,
+                    RecipeAction.recipe_id == recipe_id,
+                    RecipeAction.action_type == action_type,
+                )
+            )
+            persisted = q.first() is not None
+            # another toggle may have landed while we were reading
+            if key not in self._pending:
+                self._set(key, persisted, not persisted)
+                return not persisted
+        persisted, desired = self._pending[key]
+        self._set(key, persisted, not desired)
+        return not desired
+
+    def set_desired(self, anon_id, recipe_id: int, action_type: str, persisted: bool, desired: bool) -> bool:
+        """Set the user's state for (recipe, action); returns the state they had before."""
+        key = (anon_id, recipe_id, action_type)
+        if key in self._pending:
+            persisted, previous = self._pending[key]
+        elif key in self._inflight:
+            # the batch being written is what the database is about to hold
+            persisted = previous = self._inflight[key][1]
+        else:
+            previous = persisted
+        self._set(key, persisted, desired)
+        return previous
+
+    def _user_keys(self, anon_id) -> Set[Key]:
+        return self._by_user.get(anon_id, set()) | {k for k in self._inflight if k[0] == anon_id}
+
+    def pending_for_user(self, anon_id) -> Dict[Tuple[int, str], bool]:
+        """{(recipe_id, action_type): desired} for the user's unflushed toggles, including a batch being written."""
+        out = {}
+        for key in self._user_keys(anon_id):
+            # a toggle made during the flush overrides the batch being written
+            state = self._pending.get(key) or self._inflight[key]
+            out[(key[1], key[2])] = state[1]
+        return out
+
+    def has_pending(self, anon_id) -> bool:
+        return bool(self._user_keys(anon_id))
+
+    def likes_delta(self, recipe_id: int) -> int:
+        """Likes on `recipe_id` not in the database yet (unflushed and in-flight toggles)."""
+        delta = 0
+        for key in self._pending.keys() | self._inflight.keys():
+            if key[1] != recipe_id or key[2] != "like":
+                continue
+            # the database still holds the state from before the in-flight batch
+            base = self._inflight[key][0] if key in self._inflight else self._pending[key][0]
+            final = self._pending[key][1] if key in self._pending else self._inflight[key][1]
+            delta += int(final) - int(base)
+        return delta
+
+    def discard_user(self, anon_id) -> None:
+        for key in self._by_user.pop(anon_id, set()):
+            self._pending.pop(key, None)
+
+    # flushing -----------------------------------------------------------
+
+    async def flush(self) -> int:
+        """
+        Write all pending toggles; returns the number of keys handled. If the
+        write fails for any other reason than a rejected row, the unwritten
+        keys are back in the buffer and the error is raised.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending, self._by_user = self._pending, {}, {}
+            self._inflight = batch
+            try:
+                await self._write(batch)
+            except PERMANENT_ERRORS:
+                logger.warning("Action buffer flush of %d keys hit a rejected row; writing row by row", len(batch))
+                await self._write_rows(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            finally:
+                self._inflight = {}
+            return len(batch)
+
+    def _requeue(self, batch: Dict[Key, Tuple[bool, bool]]) -> None:
+        """Put unwritten keys back; a toggle made meanwhile keeps its desired state."""
+        for key, (persisted, desired) in batch.items():
+            if key in self._pending:
+                # that toggle assumed the batch was written; the database still holds `persisted`
+                desired = self._pending[key][1]
+            self._set(key, persisted, desired)
+
+    async def _write(self, batch: Dict[Key, Tuple[bool, bool]]) -> None:
+        inserts = [k for k, (_, desired) in batch.items() if desired]
+        deletes = [k for k, (_, desired) in batch.items() if not desired]
+        async with self.sessionmaker() as session:
+            if inserts:
+                stmt = insert_ignore(session.get_bind().dialect.name)
+                await session.execute(stmt, [
+                    {"anon_user_id": a, "recipe_id": r, "action_type": t} for a, r, t in inserts
+                ])
+            if deletes:
+                await session.execute(delete(RecipeAction).where(
+                    tuple_(RecipeAction.anon_user_id, RecipeAction.recipe_id, RecipeAction.action_type).in_(deletes)
+                ))
+            await session.commit()
+
+    async def _write_rows(self, batch: Dict[Key, Tuple[bool, bool]]) -> None:
+        # one bad row (e.g. the anon user was deleted meanwhile) must not drop the rest
+        items = list(batch.items())
+        for n, (key, state) in enumerate(items):
+            try:
+                await self._write({key: state})
+            except PERMANENT_ERRORS:
+                self.dropped += 1
+                logger.warning("Dropping buffered action %s: rejected by the database", key, exc_info=True)
+            except Exception:
+                self._requeue(dict(items[n:]))
+                raise
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.max_backoff, self.interval * 2 ** failures)
+
+    async def run(self) -> None:
+        while True:
+            if self.failures:
+                # requeued keys may keep _wakeup set; back off regardless
+                await asyncio.sleep(self._backoff(self.failures))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                self.failures = 0
+            except Exception:
+                self.failures += 1
+                logger.exception(
+                    "Action buffer flush failed (%d in a row); %d keys kept, retrying in %.1fs",
+                    self.failures, len(self._pending), self._backoff(self.failures),
+                )
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="action-buffer")
+
+    async def close(self) -> None:
+        """Stop the background task and flush what is left (graceful shutdown), retrying for up to close_timeout seconds."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.close_timeout
+        failures = 0
+        while True:
+            try:
+                await self.flush()
+                return
+            except Exception:
+                failures += 1
+                delay = self._backoff(failures)
+                if loop.time() + delay > deadline:
+                    logger.exception("Action buffer closed with %d unwritten keys: %s", len(self._pending), sorted(self._pending, key=str))
+                    return
+                logger.warning("Action buffer flush on shutdown failed; retrying in %.1fs", delay, exc_info=True)
+                await asyncio.sleep(delay)
+
+
+action_buffer = ActionBuffer()
+
@@ -0,0 +1,112 @@
+"""
+Like/bookmark popularity and history from the `recipe_action_daily` rollup.
+
+The rollup and, on PostgreSQL, the monthly-partitioned `recipe_action_event`
+log are written by triggers on recipe_action (app/models/action_log.py), so
+these queries never scan raw actions. `maintain_action_log()` keeps
+ACTION_LOG_PARTITIONS_AHEAD future months of partitions and, with
+ACTION_LOG_RETENTION_MONTHS > 0, detaches and drops older months; it runs at
+startup, every ACTION_LOG_INTERVAL_SECONDS when set, or from
+scripts/maintain_action_log.py.
+"""
+import asyncio
+import datetime
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models import Recipe, RecipeActionDaily
+
+logger = logging.getLogger(__name__)
+
+ACTION_LOG_PARTITIONS_AHEAD = int(os.getenv("ACTION_LOG_PARTITIONS_AHEAD", "3"))
+# 0 keeps the event log forever; the daily rollup is always kept
+ACTION_LOG_RETENTION_MONTHS = int(os.getenv("ACTION_LOG_RETENTION_MONTHS", "0"))
+# 0 disables the in-process schedule (startup still creates partitions)
+ACTION_LOG_INTERVAL_SECONDS = int(os.getenv("ACTION_LOG_INTERVAL_SECONDS", "0"))
+
+ACTION_TYPES = ("like", "bookmark")
+
+
+async def maintain_action_log(
+    months_ahead: int = ACTION_LOG_PARTITIONS_AHEAD,
+    retention_months: int = ACTION_LOG_RETENTION_MONTHS,
+    sessionmaker: Optional[async_sessionmaker] = None,
+) -> Tuple[int, int]:
+    """Create missing future partitions and drop expired ones; returns (created, dropped). PostgreSQL only."""
+    sessionmaker = sessionmaker or AsyncSessionLocal
+    async with sessionmaker() as session:
+        if session.get_bind().dialect.name != "postgresql":
+            return 0, 0
+        created = (await session.execute(
+            text("SELECT recipe_action_event_ensure_partitions(:n)"), {"n": months_ahead}
+        )).scalar_one()
+        dropped = 0
+        if retention_months > 0:
+            # DETACH takes a brief exclusive lock on the parent; give up rather than queue behind traffic
+            await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+            dropped = (await session.execute(
+                text("SELECT recipe_action_event_drop_partitions(:n)"), {"n": retention_months}
+            )).scalar_one()
+        await session.commit()
+    if created or dropped:
+        logger.info("Action log: created %d partitions, dropped %d", created, dropped)
+    return int(created), int(dropped)
+
+
+async def run_action_log_schedule(interval_seconds: int = ACTION_LOG_INTERVAL_SECONDS) -> None:
+    """Background loop started from the app lifespan when ACTION_LOG_INTERVAL_SECONDS > 0."""
+    while True:
+        try:
+            await maintain_action_log()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Action log maintenance failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def _since(days: int) -> datetime.date:
+    return datetime.datetime.utcnow().date() - datetime.timedelta(days=days - 1)
+
+
+async def popular_recipes(session: AsyncSession, action_type: str = "like", days: int = 7, limit: int = 12) -> List[Dict]:
+    """Recipes with the most net `action_type` gains over the last `days` UTC days (today included)."""
+    net = func.sum(RecipeActionDaily.added - RecipeActionDaily.removed)
+    top = (
+        select(RecipeActionDaily.recipe_id, net.label("net"))
+        .where(RecipeActionDaily.day >= _since(days), RecipeActionDaily.action_type == action_type)
+        .group_by(RecipeActionDaily.recipe_id)
+        .having(net > 0)
+        .subquery()
+    )
+    stmt = (
+        select(Recipe.id, Recipe.title, Recipe.thumbnail_url, Recipe.image_url, Recipe.image_meta, top.c.net)
+        .join(top, top.c.recipe_id == Recipe.id)
+        .order_by(top.c.net.desc(), Recipe.id)
+        .limit(limit)
+    )
+    res = await session.execute(stmt)
+    return [
+        {"id": r.id, "title": r.title, "thumbnail_url": r.thumbnail_url, "image_url": r.image_url, "image_meta": r.image_meta, "score": int(r.net)}
+        for r in res.all()
+    ]
+
+
+async def recipe_daily_stats(session: AsyncSession, recipe_id: int, days: int = 30) -> List[Dict]:
+    """One entry per day with activity: {"day", "<type>_added", "<type>_removed"} for likes and bookmarks."""
+    stmt = (
+        select(RecipeActionDaily.day, RecipeActionDaily.action_type, RecipeActionDaily.added, RecipeActionDaily.removed)
+        .where(RecipeActionDaily.recipe_id == recipe_id, RecipeActionDaily.day >= _since(days))
+        .order_by(RecipeActionDaily.day)
+    )
+    out: Dict[datetime.date, Dict] = {}
+    for day, action_type, added, removed in (await session.execute(stmt)).all():
+        if action_type not in ACTION_TYPES:
+            continue
+        row = out.setdefault(day, {"day": day.isoformat(), **{f"{t}_{k}": 0 for t in ACTION_TYPES for k in ("added", "removed")}})
+        row[f"{action_type}_added"] = int(added)
+        row[f"{action_type}_removed"] = int(removed)
+    return list(out.values())
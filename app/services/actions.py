@@ -0,0 +1,89 @@
+"""
+Set-based application of many like/bookmark operations for one anon user.
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe
+from app.models.anon import RecipeAction
+from app.schemas.action import ActionOp
+from app.services.action_buffer import ACTION_WRITE_BEHIND, action_buffer, insert_ignore
+from app.services.bookmarks import invalidate_bookmark_count
+from app.services.trending import trending
+
+
+async def apply_action_ops(session: AsyncSession, anon_id, ops: List[ActionOp]) -> List[Dict]:
+    """
+    Bring the user's actions to the requested states and return the final state
+    per (recipe_id, action_type), in first-seen order. Runs a fixed number of
+    statements regardless of len(ops): IN lookups for recipe ids and the
+    user's current actions, one multi-row insert, one delete and one grouped
+    like count. Likes and bookmarks that actually change state are recorded on
+    the trending board.
+    """
+    desired: Dict[Tuple[int, str], bool] = {}
+    for op in ops:
+        # dict keeps first-seen order, later ops overwrite the state
+        desired[(op.recipe_id, op.action_type)] = op.desired_state
+
+    recipe_ids = {rid for rid, _ in desired}
+    q = await session.execute(select(Recipe.id).where(Recipe.id.in_(recipe_ids)))
+    existing_recipes = {row[0] for row in q.all()}
+    valid = {k: v for k, v in desired.items() if k[0] in existing_recipes}
+
+    persisted = set()
+    if valid:
+        q = await session.execute(
+            select(RecipeAction.recipe_id, RecipeAction.action_type).where(
+                RecipeAction.anon_user_id == anon_id,
+                RecipeAction.recipe_id.in_({rid for rid, _ in valid}),
+            )
+        )
+        persisted = {(r, t) for r, t in q.all()}
+    # keys whose state actually changed: they move the trending board
+    changed: Dict[Tuple[int, str], bool] = {}
+    if valid and ACTION_WRITE_BEHIND:
+        for (rid, action_type), state in valid.items():
+            previous = action_buffer.set_desired(anon_id, rid, action_type, (rid, action_type) in persisted, state)
+            if previous != state:
+                changed[(rid, action_type)] = state
+    elif valid:
+        changed = {k: state for k, state in valid.items() if (k in persisted) != state}
+        inserts = [k for k, state in valid.items() if state]
+        deletes = [(anon_id, rid, t) for (rid, t), state in valid.items() if not state]
+        if inserts:
+            await session.execute(insert_ignore(session.get_bind().dialect.name), [
+                {"anon_user_id": anon_id, "recipe_id": rid, "action_type": t} for rid, t in inserts
+            ])
+        if deletes:
+            await session.execute(delete(RecipeAction).where(
+                tuple_(RecipeAction.anon_user_id, RecipeAction.recipe_id, RecipeAction.action_type).in_(deletes)
+            ))
+        await session.commit()
+    for (rid, action_type), state in changed.items():
+        trending.record(rid, action_type, 1 if state else -1)
+    if any(t == "bookmark" for _, t in valid):
+        invalidate_bookmark_count(anon_id)
+
+    like_ids = {rid for rid, t in valid if t == "like"}
+    likes: Dict[int, int] = {}
+    if like_ids:
+        q = await session.execute(
+            select(RecipeAction.recipe_id, func.count())
+            .where(RecipeAction.recipe_id.in_(like_ids), RecipeAction.action_type == "like")
+            .group_by(RecipeAction.recipe_id)
+        )
+        likes = {rid: int(cnt) for rid, cnt in q.all()}
+        if ACTION_WRITE_BEHIND:
+            likes = {rid: max(0, likes.get(rid, 0) + action_buffer.likes_delta(rid)) for rid in like_ids}
+
+    out = []
+    for (rid, action_type), state in desired.items():
+        if rid not in existing_recipes:
+            out.append({"recipe_id": rid, "action_type": action_type, "error": "not_found"})
+            continue
+        item = {"recipe_id": rid, "action_type": action_type, "state": state}
+        if action_type == "like":
+            item["likes_count"] = likes.get(rid, 0)
+        out.append(item)
+    return out
@@ -0,0 +1,143 @@
+"""
+Bookmarks listing shared by the JSON API and the bookmarks page.
+
+Pages are keyset-paginated on (created_at, id) of the bookmark action, newest
+first, so each page is a range scan on ix_recipe_action_user_type_created_at
+instead of an OFFSET. Only card-level columns are selected: instead of the
+full instructions each recipe carries an `excerpt` (their first
+CARD_EXCERPT_CHARS characters, cut in SQL) and ingredient names are fetched
+for the page in one extra query.
+"""
+import base64
+import datetime
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, Ingredient, recipe_ingredient
+from app.models.anon import RecipeAction
+
+BOOKMARKS_PER_PAGE = 24
+# card template shows the first 120 chars and appends "..." when longer
+CARD_EXCERPT_CHARS = 121
+BOOKMARK_COUNT_TTL = float(os.getenv("BOOKMARK_COUNT_TTL", "300"))
+_COUNT_CACHE_MAX = 10000
+
+_count_cache: Dict[str, Tuple[int, float]] = {}
+
+
+def encode_cursor(created_at: datetime.datetime, action_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{action_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime.datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, action_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(ts), int(action_id)
+    except Exception:
+        return None
+
+
+def invalidate_bookmark_count(anon_id) -> None:
+    _count_cache.pop(str(anon_id), None)
+
+
+async def count_bookmarks(session: AsyncSession, anon_id) -> int:
+    key = str(anon_id)
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and hit[1] > now:
+        return hit[0]
+
+    stmt = select(func.count()).select_from(RecipeAction).where(
+        RecipeAction.anon_user_id == anon_id,
+        RecipeAction.action_type == "bookmark",
+    )
+    total = int((await session.execute(stmt)).scalar_one() or 0)
+    if len(_count_cache) >= _COUNT_CACHE_MAX:
+        _count_cache.clear()
+    _count_cache[key] = (total, now + BOOKMARK_COUNT_TTL)
+    return total
+
+
+async def list_bookmarks(
+    session: AsyncSession,
+    anon_id,
+    limit: int = BOOKMARKS_PER_PAGE,
+    cursor: Optional[str] = None,
+) -> Dict:
+    """
+    Return one page of the user's bookmarks:
+    {"recipes": [...], "next_cursor": str | None, "total": int}.
+    """
+    limit = max(1, min(100, int(limit or BOOKMARKS_PER_PAGE)))
+    stmt = (
+        select(
+            Recipe.id,
+            Recipe.title,
+            func.substr(Recipe.instructions, 1, CARD_EXCERPT_CHARS).label("excerpt"),
+            Recipe.prep_minutes,
+            Recipe.servings,
+            Recipe.image_url,
+            Recipe.thumbnail_url,
+            Recipe.image_meta,
+            Recipe.likes_count,
+            RecipeAction.id.label("action_id"),
+            RecipeAction.created_at.label("bookmarked_at"),
+        )
+        .join(RecipeAction, RecipeAction.recipe_id == Recipe.id)
+        .where(
+            RecipeAction.anon_user_id == anon_id,
+            RecipeAction.action_type == "bookmark",
+        )
+        .order_by(RecipeAction.created_at.desc(), RecipeAction.id.desc())
+        .limit(limit + 1)
+    )
+    after = decode_cursor(cursor)
+    if after:
+        stmt = stmt.where(tuple_(RecipeAction.created_at, RecipeAction.id) < tuple_(*after))
+
+    rows = (await session.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    ing_by_recipe: Dict[int, List[str]] = {}
+    if rows:
+        ing_stmt = (
+            select(recipe_ingredient.c.recipe_id, Ingredient.name)
+            .join(Ingredient, Ingredient.id == recipe_ingredient.c.ingredient_id)
+            .where(recipe_ingredient.c.recipe_id.in_([r.id for r in rows]))
+        )
+        for recipe_id, name in (await session.execute(ing_stmt)).all():
+            ing_by_recipe.setdefault(recipe_id, []).append(name)
+
+    recipes = [
+        {
+            "id": r.id,
+            "title": r.title,
+            "excerpt": r.excerpt,
+            "prep_minutes": r.prep_minutes,
+            "servings": r.servings,
+            "image_url": r.image_url,
+            "thumbnail_url": r.thumbnail_url,
+            "image_meta": r.image_meta,
+            "ingredients": ing_by_recipe.get(r.id, []),
+            "likes_count": r.likes_count or 0,
+        }
+        for r in rows
+    ]
+
+    next_cursor = None
+    if has_more and rows and rows[-1].bookmarked_at is not None:
+        next_cursor = encode_cursor(rows[-1].bookmarked_at, rows[-1].action_id)
+
+    return {
+        "recipes": recipes,
+        "next_cursor": next_cursor,
+        "total": await count_bookmarks(session, anon_id),
+    }
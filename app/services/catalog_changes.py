@@ -0,0 +1,224 @@
+"""
+Catalog change feed: what changed in recipes, ingredients and their links since a version.
+
+Triggers append every catalog write to `catalog_change`
+(app/models/catalog_change.py). `changes_since(session, version)` folds the
+changes after `version` into a ChangeSet (changed recipe and ingredient ids,
+added/removed links, and the version to resume from), so a derived structure
+applies a delta instead of being rebuilt from the whole catalog. A consumer
+that never synced (`since=None`), is ahead of the feed (database restored) or
+is older than what pruning kept gets `full=True` and rebuilds once.
+
+`CatalogFeed` polls every CATALOG_FEED_POLL_SECONDS in each worker and hands
+every subscriber its own ChangeSet; a failing subscriber retries from its
+last version without holding the others back. The first poll after start is
+a full one, which is how subscribers do their initial build. Scripts keep
+their version next to what they build (scripts/build_search_index.py
+--if-changed, the snapshot manifest).
+
+Changes older than CATALOG_CHANGE_KEEP_DAYS are pruned every
+CATALOG_CHANGE_PRUNE_SECONDS; the newest change is always kept, so a gap
+before the oldest row is recognised. Versions skipped by rolled-back
+transactions can make that check report a gap that is not there; the
+consumer then rebuilds once, which is safe.
+"""
+import asyncio
+import datetime
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models import CatalogChange, recipe_ingredient
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FEED_ENABLED = os.getenv("CATALOG_FEED_ENABLED", "true").lower() in ("1", "true", "yes")
+CATALOG_FEED_POLL_SECONDS = float(os.getenv("CATALOG_FEED_POLL_SECONDS", "5"))
+# changes read per query; a larger backlog is applied in several change sets
+CATALOG_FEED_BATCH = int(os.getenv("CATALOG_FEED_BATCH", "10000"))
+CATALOG_CHANGE_KEEP_DAYS = float(os.getenv("CATALOG_CHANGE_KEEP_DAYS", "7"))
+# 0 disables pruning from the app (run it from cron with prune_changes() instead)
+CATALOG_CHANGE_PRUNE_SECONDS = float(os.getenv("CATALOG_CHANGE_PRUNE_SECONDS", "3600"))
+
+
+@dataclass
+class ChangeSet:
+    since: Optional[int]
+    version: int
+    # rebuild from scratch: the individual changes are not available
+    full: bool = False
+    # the batch limit was hit; more changes follow after `version`
+    more: bool = False
+    changes: int = 0
+    recipe_ids: Set[int] = field(default_factory=set)
+    ingredient_ids: Set[int] = field(default_factory=set)
+    # (recipe_id, ingredient_id) links added or removed
+    links: Set[Tuple[int, int]] = field(default_factory=set)
+
+    @property
+    def empty(self) -> bool:
+        return not self.full and self.changes == 0
+
+    @property
+    def touched_recipe_ids(self) -> Set[int]:
+        """Recipes whose row or ingredient list changed (deleted ones included)."""
+        return self.recipe_ids | {rid for rid, _ in self.links}
+
+
+async def current_version(session: AsyncSession) -> int:
+    return int((await session.execute(select(func.max(CatalogChange.version)))).scalar() or 0)
+
+
+async def changes_since(session: AsyncSession, since: Optional[int], limit: Optional[int] = CATALOG_FEED_BATCH) -> ChangeSet:
+    """The changes committed after version `since`, folded per entity (at most `limit` of them; None: all)."""
+    if since is None:
+        return ChangeSet(since, await current_version(session), full=True)
+    oldest, latest = (await session.execute(
+        select(func.min(CatalogChange.version), func.max(CatalogChange.version))
+    )).one()
+    latest = int(latest or 0)
+    if since > latest or (oldest is not None and since < oldest - 1):
+        return ChangeSet(since, latest, full=True)
+    rows = (await session.execute(
+        select(CatalogChange.version, CatalogChange.entity, CatalogChange.recipe_id, CatalogChange.ingredient_id)
+        .where(CatalogChange.version > since)
+        .order_by(CatalogChange.version)
+        .limit(limit)
+    )).all()
+    out = ChangeSet(since, rows[-1].version if rows else since, more=limit is not None and len(rows) == limit, changes=len(rows))
+    for _, entity, rid, iid in rows:
+        if entity == "recipe":
+            out.recipe_ids.add(rid)
+        elif entity == "ingredient":
+            out.ingredient_ids.add(iid)
+        else:
+            out.links.add((rid, iid))
+    return out
+
+
+async def affected_recipe_ids(session: AsyncSession, changes: ChangeSet) -> Set[int]:
+    """Recipes that may show something that changed: their row, their links or one of their ingredients."""
+    ids = changes.touched_recipe_ids
+    if changes.ingredient_ids:
+        rows = await session.execute(
+            select(recipe_ingredient.c.recipe_id).where(recipe_ingredient.c.ingredient_id.in_(sorted(changes.ingredient_ids)))
+        )
+        ids |= set(rows.scalars())
+    return ids
+
+
+async def prune_changes(session: AsyncSession, keep_days: float = CATALOG_CHANGE_KEEP_DAYS) -> int:
+    """Delete changes older than `keep_days`, except the newest; returns rows deleted."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=keep_days)
+    newest = select(func.max(CatalogChange.version)).scalar_subquery()
+    res = await session.execute(
+        delete(CatalogChange).where(CatalogChange.changed_at < cutoff, CatalogChange.version < newest)
+    )
+    await session.commit()
+    return res.rowcount or 0
+
+
+Handler = Callable[[AsyncSession, ChangeSet], Awaitable[None]]
+
+
+class CatalogFeed:
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        interval: float = CATALOG_FEED_POLL_SECONDS,
+        batch: int = CATALOG_FEED_BATCH,
+        prune_interval: float = CATALOG_CHANGE_PRUNE_SECONDS,
+    ):
+        self.sessionmaker = sessionmaker
+        self.interval = interval
+        self.batch = batch
+        self.prune_interval = prune_interval
+        # name -> [handler, last applied version (None: not synced yet)]
+        self._subscribers: Dict[str, List] = {}
+        self.polls = 0
+        self.applied = 0
+        self.full = 0
+        self.failures = 0
+        self.pruned = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, name: str, handler: Handler, since: Optional[int] = None) -> None:
+        """Call `handler(session, changes)` for changes after `since` (None: start with a full ChangeSet)."""
+        self._subscribers[name] = [handler, since]
+
+    async def poll(self) -> int:
+        """Hand pending changes to every subscriber; returns how many change sets were applied."""
+        applied = 0
+        async with self.sessionmaker() as session:
+            for name, sub in self._subscribers.items():
+                try:
+                    while True:
+                        changes = await changes_since(session, sub[1], self.batch)
+                        if changes.empty:
+                            break
+                        await sub[0](session, changes)
+                        sub[1] = changes.version
+                        applied += 1
+                        if changes.full:
+                            self.full += 1
+                        if not changes.more:
+                            break
+                except Exception:
+                    self.failures += 1
+                    logger.exception("Catalog feed subscriber %s failed at version %s", name, sub[1])
+                    await session.rollback()
+        self.polls += 1
+        self.applied += applied
+        return applied
+
+    async def prune(self) -> int:
+        async with self.sessionmaker() as session:
+            deleted = await prune_changes(session)
+        self.pruned += deleted
+        return deleted
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        pruned_at = loop.time()
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Catalog feed poll failed")
+            if self.prune_interval > 0 and loop.time() - pruned_at >= self.prune_interval:
+                pruned_at = loop.time()
+                try:
+                    await self.prune()
+                except Exception:
+                    logger.exception("Catalog change pruning failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="catalog-feed")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": CATALOG_FEED_ENABLED,
+            "subscribers": {name: sub[1] for name, sub in self._subscribers.items()},
+            "polls": self.polls,
+            "applied": self.applied,
+            "full": self.full,
+            "failures": self.failures,
+            "pruned": self.pruned,
+        }
+
+
+catalog_feed = CatalogFeed()
@@ -0,0 +1,155 @@
+"""
+Streaming catalog / bookmarks export as NDJSON.
+
+Rows are read through a server-side cursor (`session.stream` with
+`yield_per`), EXPORT_CHUNK at a time; ingredient names are loaded with one
+query per chunk, and every chunk is encoded and handed to the caller before
+the next one is fetched, so memory stays flat however big the catalog is.
+
+Incremental syncs go by the catalog change feed (app/services/catalog_changes.py):
+`plan_recipe_export(session, since_version)` reads the changes after the
+version the consumer last got and `iter_recipe_chunks` streams the recipes
+they touch (their row, their ingredient links or the name of one of their
+ingredients), ordered by id, with `{"id": ..., "deleted": true}` tombstones
+for recipes that are gone. The plan's `version` is what to pass next time;
+when the feed cannot cover the gap (never synced, pruned, restored) the plan
+is `full` and the consumer replaces its copy with the whole catalog.
+
+The full export comes ordered by (updated_at, id). `updated_since` is kept
+for existing consumers but is best-effort only: `updated_at` is set when the
+row is flushed, not when the transaction commits, and ingredient renames or
+link changes made outside the ORM do not bump it, so it can miss changes and
+never reports deletions.
+"""
+import datetime
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, Ingredient, recipe_ingredient
+from app.models.anon import RecipeAction
+from app.services.catalog_changes import affected_recipe_ids, changes_since
+
+EXPORT_CHUNK = 500
+
+_RECIPE_COLUMNS = (
+    Recipe.id,
+    Recipe.title,
+    Recipe.instructions,
+    Recipe.prep_minutes,
+    Recipe.servings,
+    Recipe.source,
+    Recipe.image_url,
+    Recipe.thumbnail_url,
+    Recipe.image_meta,
+    Recipe.likes_count,
+    Recipe.updated_at,
+)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"cannot serialize {type(value).__name__}")
+
+
+def ndjson_line(obj: Dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=_json_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def _ingredients_for(session: AsyncSession, recipe_ids: List[int]) -> Dict[int, List[str]]:
+    stmt = (
+        select(recipe_ingredient.c.recipe_id, Ingredient.name)
+        .join(Ingredient, Ingredient.id == recipe_ingredient.c.ingredient_id)
+        .where(recipe_ingredient.c.recipe_id.in_(recipe_ids))
+        .order_by(recipe_ingredient.c.recipe_id, Ingredient.name)
+    )
+    out: Dict[int, List[str]] = {}
+    for rid, name in (await session.execute(stmt)).all():
+        out.setdefault(rid, []).append(name)
+    return out
+
+
+def _recipe_out(r, ingredients: Dict[int, List[str]]) -> Dict:
+    return {
+        "id": r.id,
+        "title": r.title,
+        "instructions": r.instructions,
+        "prep_minutes": r.prep_minutes,
+        "servings": r.servings,
+        "source": r.source,
+        "image_url": r.image_url,
+        "thumbnail_url": r.thumbnail_url,
+        "image_meta": r.image_meta,
+        "likes_count": r.likes_count or 0,
+        "ingredients": ingredients.get(r.id, []),
+        "updated_at": r.updated_at,
+    }
+
+
+@dataclass
+class RecipeExportPlan:
+    # catalog version the export is complete up to; the consumer's next since_version
+    version: int
+    # whole catalog: the consumer replaces its copy
+    full: bool = True
+    # recipes to send (or tombstone) when not full
+    recipe_ids: Optional[List[int]] = None
+
+
+async def plan_recipe_export(session: AsyncSession, since_version: Optional[int] = None) -> RecipeExportPlan:
+    """Which recipes an export after `since_version` has to send (None: all of them)."""
+    # read before the recipes: a change committed during the export is sent again next time
+    changes = await changes_since(session, since_version, limit=None)
+    if changes.full:
+        return RecipeExportPlan(changes.version)
+    return RecipeExportPlan(changes.version, full=False, recipe_ids=sorted(await affected_recipe_ids(session, changes)))
+
+
+async def _iter_recipe_ids_chunks(session: AsyncSession, recipe_ids: List[int], chunk: int) -> AsyncIterator[List[Dict]]:
+    for start in range(0, len(recipe_ids), chunk):
+        ids = recipe_ids[start:start + chunk]
+        rows = (await session.execute(select(*_RECIPE_COLUMNS).where(Recipe.id.in_(ids)).order_by(Recipe.id))).all()
+        ingredients = await _ingredients_for(session, [r.id for r in rows])
+        found = {r.id: _recipe_out(r, ingredients) for r in rows}
+        yield [found.get(rid) or {"id": rid, "deleted": True} for rid in ids]
+
+
+async def iter_recipe_chunks(
+    session: AsyncSession,
+    updated_since: Optional[datetime.datetime] = None,
+    chunk: int = EXPORT_CHUNK,
+    plan: Optional[RecipeExportPlan] = None,
+) -> AsyncIterator[List[Dict]]:
+    """Recipes of `plan` (see plan_recipe_export), or the whole catalog / those updated since `updated_since`."""
+    if plan is not None and not plan.full:
+        async for rows in _iter_recipe_ids_chunks(session, plan.recipe_ids, chunk):
+            yield rows
+        return
+    stmt = select(*_RECIPE_COLUMNS).order_by(Recipe.updated_at, Recipe.id)
+    if updated_since is not None:
+        stmt = stmt.where(Recipe.updated_at >= updated_since)
+    result = await session.stream(stmt.execution_options(yield_per=chunk))
+    async for rows in result.partitions(chunk):
+        ingredients = await _ingredients_for(session, [r.id for r in rows])
+        yield [_recipe_out(r, ingredients) for r in rows]
+
+
+async def iter_bookmark_chunks(session: AsyncSession, anon_id, chunk: int = EXPORT_CHUNK) -> AsyncIterator[List[Dict]]:
+    stmt = (
+        select(*_RECIPE_COLUMNS, RecipeAction.created_at.label("bookmarked_at"))
+        .join(RecipeAction, RecipeAction.recipe_id == Recipe.id)
+        .where(RecipeAction.anon_user_id == anon_id, RecipeAction.action_type == "bookmark")
+        .order_by(RecipeAction.created_at, RecipeAction.id)
+    )
+    result = await session.stream(stmt.execution_options(yield_per=chunk))
+    async for rows in result.partitions(chunk):
+        ingredients = await _ingredients_for(session, [r.id for r in rows])
+        yield [dict(_recipe_out(r, ingredients), bookmarked_at=r.bookmarked_at) for r in rows]
+
+
+async def ndjson_chunks(chunks: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """One bytes object per chunk of rows (fewer, larger writes than one per line)."""
+    async for rows in chunks:
+        yield b"".join(ndjson_line(r) for r in rows)
@@ -0,0 +1,59 @@
+"""
+Ranked full-text search over recipe title + instructions.
+
+Uses the `search_vector` GIN index on PostgreSQL and the `recipes_fts` FTS5
+table on SQLite (see app/models/fulltext.py); callers only see
+(recipe_id, rank) pairs with higher rank = better match.
+"""
+import re
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.fulltext import FTS_LANGUAGE
+
+MAX_TEXT_HITS = 500
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_query(q: str) -> str:
+    # quote every word (FTS5 syntax characters in user input are not operators),
+    # prefix-match so "bak" finds "bake"; words are ANDed like websearch_to_tsquery
+    return " ".join(f'"{w}"*' for w in _word_re.findall(q))
+
+
+async def search_recipe_ids(session: AsyncSession, q: str, limit: int = 50) -> List[Tuple[int, float]]:
+    q = (q or "").strip()
+    if not q:
+        return []
+    limit = max(1, min(MAX_TEXT_HITS, int(limit)))
+    dialect = session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        stmt = text(f"""
+            SELECT id, ts_rank_cd(search_vector, query) AS rank
+            FROM recipes, websearch_to_tsquery('{FTS_LANGUAGE}', :q) AS query
+            WHERE search_vector @@ query
+            ORDER BY rank DESC, id
+            LIMIT :limit
+        """)
+        params = {"q": q, "limit": limit}
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return []
+        # bm25() is lower-is-better; title column weighted like the 'A' weight on PostgreSQL
+        stmt = text("""
+            SELECT rowid AS id, -bm25(recipes_fts, 4.0, 1.0) AS rank
+            FROM recipes_fts
+            WHERE recipes_fts MATCH :q
+            ORDER BY rank DESC, rowid
+            LIMIT :limit
+        """)
+        params = {"q": match, "limit": limit}
+    else:
+        raise NotImplementedError(f"full-text search is not available for dialect {dialect}")
+
+    res = await session.execute(stmt, params)
+    return [(int(rid), float(rank or 0.0)) for rid, rank in res.all()]
+
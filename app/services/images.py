@@ -0,0 +1,168 @@
+"""
+Image ingestion: fetch each recipe's `image_url` once and store resized renditions.
+
+`ingest_images()` (scripts/ingest_images.py) walks recipes whose image_url
+has no renditions yet, or changed since they were made. The source comes from
+a local path or file:// URL, or over HTTP(S); tests and offline runs pass
+their own `fetcher`. Renditions go to the content-addressed ImageStore
+(app/utils/images.py); a source already stored is not rendered again. The
+recipe's `image_meta["renditions"]` is written and `thumbnail_url` is pointed
+at the local rendition closest to IMAGE_THUMB_WIDTH (the original is kept as
+`renditions.original_thumbnail_url`). The UPDATE bumps `updated_at`, so
+snapshots, fragment and search caches pick the new images up.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import unquote, urlsplit
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe
+from app.utils.images import (
+    FORMATS, IMAGE_WIDTHS, ImageStore, image_store, make_renditions, rendition_url, renditions_of,
+    source_digest, thumbnail_width,
+)
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(25 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "30"))
+# Wikimedia rejects requests without a descriptive User-Agent
+IMAGE_USER_AGENT = os.getenv("IMAGE_USER_AGENT", "what2cook-image-ingest/1.0")
+
+Fetcher = Callable[[str], Awaitable[bytes]]
+
+
+@dataclass
+class IngestReport:
+    ingested: int = 0
+    reused: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+
+def _read_local(url: str) -> bytes:
+    path = unquote(urlsplit(url).path) if url.startswith("file://") else url
+    with open(path, "rb") as fh:
+        data = fh.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise ValueError(f"{url}: larger than IMAGE_MAX_BYTES")
+    return data
+
+
+@asynccontextmanager
+async def default_fetcher() -> AsyncIterator[Fetcher]:
+    """Local paths and file:// URLs from disk, http(s) over one shared client."""
+    import httpx
+
+    async with httpx.AsyncClient(
+        timeout=IMAGE_FETCH_TIMEOUT, follow_redirects=True, headers={"User-Agent": IMAGE_USER_AGENT},
+    ) as client:
+        async def fetch(url: str) -> bytes:
+            if "://" not in url or url.startswith("file://"):
+                return await asyncio.to_thread(_read_local, url)
+            async with client.stream("GET", url) as resp:
+                resp.raise_for_status()
+                chunks, size = [], 0
+                async for chunk in resp.aiter_bytes():
+                    size += len(chunk)
+                    if size > IMAGE_MAX_BYTES:
+                        raise ValueError(f"{url}: larger than IMAGE_MAX_BYTES")
+                    chunks.append(chunk)
+                return b"".join(chunks)
+
+        yield fetch
+
+
+def _meta_dict(meta) -> Dict:
+    if isinstance(meta, str):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            meta = None
+    return dict(meta) if isinstance(meta, dict) else {}
+
+
+async def _ingest_one(session: AsyncSession, rec, fetch: Fetcher, store: ImageStore, report: IngestReport) -> None:
+    data = await fetch(rec.image_url)
+    digest = source_digest(data)
+    old = renditions_of(rec) or {}
+    if old.get("digest") == digest and store.has_all(digest, old["widths"]):
+        # same bytes behind a new URL: only the record changes
+        size, widths = (old["width"], old["height"]), old["widths"]
+        report.reused += 1
+    else:
+        size, files = await asyncio.to_thread(make_renditions, data, IMAGE_WIDTHS)
+        widths = sorted({w for w, _ in files})
+        if store.has_all(digest, widths):
+            report.reused += 1
+        else:
+            for (w, fmt), body in files.items():
+                store.write(digest, w, fmt, body)
+            report.ingested += 1
+
+    meta = _meta_dict(rec.image_meta)
+    meta["renditions"] = {
+        "digest": digest,
+        "source_url": rec.image_url,
+        "width": size[0],
+        "height": size[1],
+        "widths": widths,
+        "formats": list(FORMATS),
+        "original_thumbnail_url": old.get("original_thumbnail_url", rec.thumbnail_url),
+    }
+    thumb = rendition_url(digest, thumbnail_width(widths), "jpeg")
+    await session.execute(update(Recipe).where(Recipe.id == rec.id).values(image_meta=meta, thumbnail_url=thumb))
+    await session.commit()
+
+
+async def ingest_images(
+    session: AsyncSession,
+    fetcher: Optional[Fetcher] = None,
+    store: Optional[ImageStore] = None,
+    force: bool = False,
+    limit: Optional[int] = None,
+) -> IngestReport:
+    """Create renditions for recipes whose image_url has none (or all with `force`)."""
+    store = store or image_store
+    started = time.perf_counter()
+    report = IngestReport()
+    rows = (await session.execute(
+        select(Recipe.id, Recipe.image_url, Recipe.thumbnail_url, Recipe.image_meta)
+        .where(Recipe.image_url.is_not(None), Recipe.image_url != "")
+        .order_by(Recipe.id)
+    )).all()
+    todo = []
+    for rec in rows:
+        rend = renditions_of(rec)
+        if not force and rend and rend.get("source_url") == rec.image_url and store.has_all(rend["digest"], rend["widths"]):
+            report.unchanged += 1
+        else:
+            todo.append(rec)
+    if limit is not None:
+        todo = todo[:limit]
+
+    async def run(fetch: Fetcher) -> None:
+        for rec in todo:
+            try:
+                await _ingest_one(session, rec, fetch, store, report)
+            except Exception:
+                await session.rollback()
+                logger.exception("Image ingest failed for recipe %s (%s)", rec.id, rec.image_url)
+                report.failed += 1
+
+    if fetcher is not None:
+        await run(fetcher)
+    elif todo:
+        async with default_fetcher() as fetch:
+            await run(fetch)
+    report.seconds = time.perf_counter() - started
+    logger.info("Images: %d ingested, %d reused, %d unchanged, %d failed (%.2fs)",
+                report.ingested, report.reused, report.unchanged, report.failed, report.seconds)
+    return report
@@ -0,0 +1,159 @@
+"""
+Set-containment recipe queries over ingredient ids.
+
+Modes:
+- "any":     recipe uses at least one of the given ingredients (`&&`)
+- "subset":  recipe needs nothing beyond the given ingredients (`<@`, "can cook")
+- "missing": recipe uses at least one given ingredient and lacks at most
+             `max_missing` of its own ingredients
+
+PostgreSQL answers from the GIN-indexed `recipes.ingredient_ids` array in one
+statement; other dialects use a single GROUP BY over recipe_ingredient.
+Rows come back as (recipe_id, match_count, total), best match first; with
+`by_share`, equal match counts are ordered by the share of the recipe's own
+ingredients that matched (match_count / total) before the title, then id.
+
+`filters` (prep time / servings bounds, app.utils.facets) go into the WHERE
+clause next to the ingredient condition, where ix_recipes_prep_servings can
+narrow them; `facets` is filled from window aggregates of the same statement,
+computed over all matches before LIMIT.
+"""
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import Integer, select, func, case, text, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, recipe_ingredient
+from app.utils.facets import PREP_BUCKETS, SERVINGS_BUCKETS, FacetCounts, FacetFilter, bucket_names
+
+MODE_ANY = "any"
+MODE_SUBSET = "subset"
+MODE_MISSING = "missing"
+MODES = (MODE_ANY, MODE_SUBSET, MODE_MISSING)
+
+_PG_CONDITIONS = {
+    MODE_ANY: "r.ingredient_ids && :ids",
+    MODE_SUBSET: "r.ingredient_ids <@ :ids AND cardinality(r.ingredient_ids) > 0",
+    MODE_MISSING: "r.ingredient_ids && :ids AND cardinality(r.ingredient_ids) - m.match_count <= :max_missing",
+}
+
+
+async def match_ingredient_set(
+    session: AsyncSession,
+    ingredient_ids: Iterable[int],
+    mode: str = MODE_ANY,
+    max_missing: int = 0,
+    limit: Optional[int] = 100,
+    restrict_to: Optional[Iterable[int]] = None,
+    filters: Optional[FacetFilter] = None,
+    facets: Optional[FacetCounts] = None,
+    by_share: bool = False,
+) -> List[Tuple[int, int, int]]:
+    if mode not in MODES:
+        raise ValueError(f"unknown mode {mode!r}, expected one of {MODES}")
+    ids = sorted({int(i) for i in ingredient_ids})
+    if not ids:
+        return []
+    restrict = sorted({int(i) for i in restrict_to}) if restrict_to is not None else None
+    if restrict is not None and not restrict:
+        return []
+
+    if session.get_bind().dialect.name == "postgresql":
+        rows = await _match_pg(session, ids, mode, max_missing, limit, restrict, filters, facets is not None, by_share)
+    else:
+        rows = await _match_portable(session, ids, mode, max_missing, limit, restrict, filters, facets is not None, by_share)
+    if facets is not None:
+        facets.set_from_row(rows[0][3:] if rows else [0] * len(bucket_names()))
+    return [row[:3] for row in rows]
+
+
+def _pg_facet_columns() -> str:
+    cols = ["count(*) OVER () AS facet_total"]
+    cols += [f"count(*) FILTER (WHERE r.prep_minutes <= {int(limit)}) OVER () AS facet_prep_{int(limit)}"
+             for limit in PREP_BUCKETS]
+    for k, (lo, hi) in enumerate(SERVINGS_BUCKETS):
+        cond = f"r.servings >= {int(lo)}" + (f" AND r.servings <= {int(hi)}" if hi is not None else "")
+        cols.append(f"count(*) FILTER (WHERE {cond}) OVER () AS facet_servings_{k}")
+    return ", " + ", ".join(cols)
+
+
+def _portable_facet_columns():
+    def count_if(cond):
+        return func.sum(case((cond, 1), else_=0)).over()
+
+    cols = [func.count().over().label("facet_total")]
+    cols += [count_if(Recipe.prep_minutes <= limit).label(f"facet_prep_{limit}") for limit in PREP_BUCKETS]
+    for k, (lo, hi) in enumerate(SERVINGS_BUCKETS):
+        cond = Recipe.servings >= lo if hi is None else Recipe.servings.between(lo, hi)
+        cols.append(count_if(cond).label(f"facet_servings_{k}"))
+    return cols
+
+
+async def _match_pg(session, ids, mode, max_missing, limit, restrict, filters, with_facets, by_share) -> List[Tuple]:
+    where = _PG_CONDITIONS[mode]
+    params = {"ids": ids, "max_missing": int(max_missing)}
+    if restrict is not None:
+        where += " AND r.id = ANY(:restrict)"
+    if filters is not None and filters.max_prep_minutes is not None:
+        where += " AND r.prep_minutes <= :max_prep_minutes"
+        params["max_prep_minutes"] = int(filters.max_prep_minutes)
+    if filters is not None and filters.min_servings is not None:
+        where += " AND r.servings >= :min_servings"
+        params["min_servings"] = int(filters.min_servings)
+    if filters is not None and filters.max_servings is not None:
+        where += " AND r.servings <= :max_servings"
+        params["max_servings"] = int(filters.max_servings)
+    share = (" m.match_count::float8 / GREATEST(cardinality(r.ingredient_ids), 1) DESC, r.title, r.id"
+             if by_share else " r.title")
+    sql = f"""
+        SELECT r.id, m.match_count, cardinality(r.ingredient_ids) AS total{_pg_facet_columns() if with_facets else ""}
+        FROM recipes r
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS match_count FROM unnest(r.ingredient_ids) AS x WHERE x = ANY(:ids)
+        ) m
+        WHERE {where}
+        ORDER BY m.match_count DESC,{share}
+    """
+    binds = [bindparam("ids", type_=ARRAY(Integer))]
+    if restrict is not None:
+        params["restrict"] = restrict
+        binds.append(bindparam("restrict", type_=ARRAY(Integer)))
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = int(limit)
+    stmt = text(sql).bindparams(*binds)
+    res = await session.execute(stmt, params)
+    return [(int(row[0]), int(row[1]), int(row[2]), *row[3:]) for row in res.all()]
+
+
+async def _match_portable(session, ids, mode, max_missing, limit, restrict, filters, with_facets, by_share) -> List[Tuple]:
+    ri = recipe_ingredient.c
+    match_count = func.sum(case((ri.ingredient_id.in_(ids), 1), else_=0)).label("match_count")
+    total = func.count().label("total")
+    stmt = (
+        select(ri.recipe_id, match_count, total, *(_portable_facet_columns() if with_facets else ()))
+        .join(Recipe, Recipe.id == ri.recipe_id)
+        .group_by(ri.recipe_id, Recipe.title, Recipe.prep_minutes, Recipe.servings)
+    )
+    if by_share:
+        # total >= 1: every grouped recipe has at least one recipe_ingredient row
+        stmt = stmt.order_by(match_count.desc(), (match_count * 1.0 / total).desc(), Recipe.title, ri.recipe_id)
+    else:
+        stmt = stmt.order_by(match_count.desc(), Recipe.title)
+    # in every mode a recipe must use at least one wanted ingredient
+    stmt = stmt.where(ri.recipe_id.in_(select(ri.recipe_id).where(ri.ingredient_id.in_(ids))))
+    if restrict is not None:
+        stmt = stmt.where(ri.recipe_id.in_(restrict))
+    if filters is not None and filters.max_prep_minutes is not None:
+        stmt = stmt.where(Recipe.prep_minutes <= int(filters.max_prep_minutes))
+    if filters is not None and filters.min_servings is not None:
+        stmt = stmt.where(Recipe.servings >= int(filters.min_servings))
+    if filters is not None and filters.max_servings is not None:
+        stmt = stmt.where(Recipe.servings <= int(filters.max_servings))
+    if mode == MODE_SUBSET:
+        stmt = stmt.having(match_count == total)
+    elif mode == MODE_MISSING:
+        stmt = stmt.having(total - match_count <= int(max_missing))
+    if limit:
+        stmt = stmt.limit(int(limit))
+    res = await session.execute(stmt)
+    return [(int(row[0]), int(row[1] or 0), int(row[2]), *row[3:]) for row in res.all()]
@@ -0,0 +1,135 @@
+"""
+Ingredient-set search log (QUERY_LOG_ENABLED, on by default).
+
+`/search` and `/api/recipes/search_simple` call `query_log.record(inputs)`,
+which normalizes the inputs into a key (sorted, de-duplicated normalize_name()
+keys joined by ",") and offers it to an in-memory Space-Saving sketch of
+QUERY_LOG_CAPACITY counters: O(1), no I/O on the request path. Every
+QUERY_LOG_FLUSH_SECONDS a background task drains the sketch into
+search_query_stat with one multi-row upsert (hits += count). Counts are upper
+bounds once the sketch is full, which is fine for picking popular queries.
+`top_queries()` reads the most searched keys back for cache warm-up
+(app/services/search_cache.py).
+"""
+import asyncio
+import datetime
+import logging
+import os
+from typing import Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models import SearchQueryStat
+from app.utils.heavy_hitters import SpaceSaving
+from app.utils.normalize import normalize_name
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+QUERY_LOG_CAPACITY = int(os.getenv("QUERY_LOG_CAPACITY", "1000"))
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "60"))
+# longer keys (pasted recipes) are not worth logging
+MAX_KEY_LENGTH = 512
+
+
+def query_key(inputs: Iterable[str]) -> str:
+    return ",".join(sorted({normalize_name(s) for s in inputs} - {""}))
+
+
+def upsert_hits(dialect_name: str):
+    """INSERT into search_query_stat that adds `hits` to an existing row."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"upsert_hits: unsupported dialect {dialect_name}")
+    stmt = dialect_insert(SearchQueryStat)
+    return stmt.on_conflict_do_update(
+        index_elements=["query_key"],
+        set_={"hits": SearchQueryStat.hits + stmt.excluded.hits, "last_seen": stmt.excluded.last_seen},
+    )
+
+
+class QueryLog:
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        capacity: int = QUERY_LOG_CAPACITY,
+        interval: float = QUERY_LOG_FLUSH_SECONDS,
+    ):
+        self.sessionmaker = sessionmaker
+        self.interval = interval
+        self.sketch = SpaceSaving(capacity)
+        self.flushed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, inputs: Iterable[str]) -> Optional[str]:
+        """Count one search for the ingredient set in `inputs`; returns its key (None when empty)."""
+        key = query_key(inputs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return None
+        if QUERY_LOG_ENABLED:
+            self.sketch.offer(key)
+        return key
+
+    async def flush(self) -> int:
+        """Write the sketch's counters and reset it; returns the number of keys written."""
+        rows = self.sketch.drain()
+        if not rows:
+            return 0
+        now = datetime.datetime.utcnow()
+        # sorted: concurrent flushes from other workers lock rows in the same order
+        values = [{"query_key": key, "hits": count, "last_seen": now} for key, count, _ in sorted(rows)]
+        async with self.sessionmaker() as session:
+            await session.execute(upsert_hits(session.get_bind().dialect.name), values)
+            await session.commit()
+        self.flushed += len(values)
+        return len(values)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Query log flush failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="query-log")
+
+    async def close(self) -> None:
+        """Stop the background task and write what is left (graceful shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final query log flush failed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": QUERY_LOG_ENABLED,
+            "tracked": len(self.sketch),
+            "pending_searches": self.sketch.offered,
+            "flushed_keys": self.flushed,
+            "top": [{"query": k, "count": c, "error": e} for k, c, e in self.sketch.top(5)],
+        }
+
+
+query_log = QueryLog()
+
+
+async def top_queries(session: AsyncSession, limit: int, days: Optional[int] = None) -> List[str]:
+    """Most searched query keys, optionally only those seen in the last `days` days."""
+    stmt = select(SearchQueryStat.query_key)
+    if days:
+        stmt = stmt.where(SearchQueryStat.last_seen >= datetime.datetime.utcnow() - datetime.timedelta(days=days))
+    stmt = stmt.order_by(SearchQueryStat.hits.desc(), SearchQueryStat.query_key).limit(limit)
+    return list((await session.execute(stmt)).scalars().all())
@@ -1,18 +1,26 @@
-from typing import List, Dict, Optional
-from sqlalchemy import select, func, desc
+from typing import List, Dict, Optional, Set
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from app.models import Recipe, Ingredient, recipe_ingredient
+from app.models import Recipe, Ingredient
+from app.services.fulltext import search_recipe_ids, MAX_TEXT_HITS
+from app.services.ingredient_sets import MODE_ANY, match_ingredient_set
+from app.services.search_index import get_search_index
+from app.utils.concurrency import gather_reads
+from app.utils.facets import FacetCounts, FacetFilter
 
 PER_PAGE = 9
 
 async def list_recipes(session: AsyncSession, page: int = 1, per_page: int = PER_PAGE) -> Dict:
     offset = (page - 1) * per_page
-    stmt = select(Recipe).options(selectinload(Recipe.ingredients)).order_by(Recipe.title).offset(offset).limit(per_page)
-    res = await session.execute(stmt)
-    recs = res.scalars().unique().all()
-    total = (await session.execute(select(func.count()).select_from(Recipe))).scalar_one()
-    total_pages = max(1, (int(total) + per_page - 1) // per_page)
+
+    async def load_page(s: AsyncSession):
+        stmt = select(Recipe).options(selectinload(Recipe.ingredients)).order_by(Recipe.title, Recipe.id).offset(offset).limit(per_page)
+        res = await s.execute(stmt)
+        return [to_out(r) for r in res.scalars().unique().all()]
+
+    async def count_all(s: AsyncSession):
+        return (await s.execute(select(func.count()).select_from(Recipe))).scalar_one()
 
     def to_out(rec):
         return {
@@ -28,8 +36,10 @@ async def list_recipes(session: AsyncSession, page: int = 1, per_page: int = PER
             "likes_count": getattr(rec, "likes_count", 0)
         }
 
+    recipes, total = await gather_reads(session, load_page, count_all)
+    total_pages = max(1, (int(total) + per_page - 1) // per_page)
     return {
-        "recipes": [to_out(r) for r in recs],
+        "recipes": recipes,
         "page": page,
         "total_pages": total_pages,
         "per_page": per_page,
@@ -56,42 +66,173 @@ async def get_recipe(session: AsyncSession, recipe_id: int) -> Optional[Dict]:
         "likes_count": getattr(rec, "likes_count", 0)
     }
 
-async def search_recipes(session: AsyncSession, mapped_names: List[str], limit: int = 20) -> List[Dict]:
-    if not mapped_names:
-        return []
-    ing_ids_subq = select(Ingredient.id).where(Ingredient.name.in_(mapped_names))
-    stmt = (
-        select(Recipe, func.count(recipe_ingredient.c.ingredient_id).label("match_count"))
-        .join(recipe_ingredient, recipe_ingredient.c.recipe_id == Recipe.id)
-        .where(recipe_ingredient.c.ingredient_id.in_(ing_ids_subq))
-        .group_by(Recipe.id)
-        .order_by(desc("match_count"), Recipe.title)
-        .limit(max(1, min(100, int(limit or 20))))
-    )
+async def recipe_cards_by_ids(session: AsyncSession, recipe_ids: List[int]) -> Dict[int, Dict]:
+    if not recipe_ids:
+        return {}
+    stmt = select(Recipe).options(selectinload(Recipe.ingredients)).where(Recipe.id.in_(recipe_ids))
     res = await session.execute(stmt)
-    rows = res.all()
-    out = []
-    for rec, match_count in rows:
-        ing_stmt = select(Ingredient.name).select_from(recipe_ingredient.join(Ingredient)).where(recipe_ingredient.c.recipe_id == rec.id)
-        ing_res = await session.execute(ing_stmt)
-        rec_ing_names = [row[0] for row in ing_res.fetchall()]
-        total = max(len(rec_ing_names), 1)
-        score = round(match_count / total, 3)
-        out.append({
+    out = {}
+    for rec in res.scalars().unique().all():
+        out[rec.id] = {
             "id": rec.id,
             "title": rec.title,
-            "score": score,
-            "match_count": int(match_count),
-            "missing": sorted([i for i in rec_ing_names if i.lower() not in [u.lower() for u in mapped_names]]),
-            "have": sorted([i for i in rec_ing_names if i.lower() in [u.lower() for u in mapped_names]]),
-            "ingredients": rec_ing_names,
             "instructions": rec.instructions,
             "prep_minutes": rec.prep_minutes,
             "servings": rec.servings,
+            "source": rec.source,
             "image_url": rec.image_url,
             "thumbnail_url": rec.thumbnail_url,
             "image_meta": rec.image_meta,
-            "source": rec.source,
+            "ingredients": [ing.name for ing in rec.ingredients or []],
             "likes_count": getattr(rec, "likes_count", 0),
-        })
+        }
+    return out
+
+
+async def simple_search(
+    session: AsyncSession,
+    wanted: Set[str],
+    limit: int = 50,
+    filters: Optional[FacetFilter] = None,
+    facets: Optional[FacetCounts] = None,
+) -> List[Dict]:
+    """
+    Recipes using ANY of the normalized ingredient keys in `wanted`, most
+    matches first, then the larger share of the recipe's ingredients
+    (/api/recipes/search_simple; also run by the search cache warm-up).
+    Ranked, limited and counted into `facets` (window aggregates over all
+    matches) in one match_ingredient_set statement.
+    """
+    ing_ids = (await session.execute(select(Ingredient.id).where(Ingredient.name_norm.in_(wanted)))).scalars().all()
+    rows = await match_ingredient_set(session, ing_ids, mode=MODE_ANY, limit=limit, filters=filters, facets=facets, by_share=True)
+
+    cards = await recipe_cards_by_ids(session, [rid for rid, _, _ in rows])
+    out = []
+    for rid, match_count, total in rows:
+        card = cards.get(rid)
+        if card:
+            card["match_count"] = match_count
+            card["score"] = match_count / max(total, 1)
+            out.append(card)
+    return out
+
+
+async def text_search_recipes(session: AsyncSession, q: str, limit: int = 20) -> List[Dict]:
+    """Full-text search over title + instructions, best match first, each with a `text_rank`."""
+    hits = await search_recipe_ids(session, q, limit=max(1, min(100, int(limit or 20))))
+    cards = await recipe_cards_by_ids(session, [rid for rid, _ in hits])
+    out = []
+    for rid, rank in hits:
+        card = cards.get(rid)
+        if card:
+            card["text_rank"] = round(rank, 4)
+            out.append(card)
+    return out
+
+
+async def _filtered_text_search(
+    session: AsyncSession, text_rank: Dict[int, float], limit: int,
+    filters: Optional[FacetFilter], facets: Optional[FacetCounts],
+) -> List[Dict]:
+    """Text hits narrowed by `filters`, counted into `facets` over one (id, prep, servings) query."""
+    stmt = select(Recipe.id, Recipe.prep_minutes, Recipe.servings).where(Recipe.id.in_(list(text_rank)))
+    kept = []
+    for rid, prep, servings in (await session.execute(stmt)).all():
+        if filters and not filters.matches(prep, servings):
+            continue
+        if facets is not None:
+            facets.add(prep, servings)
+        kept.append(rid)
+    kept.sort(key=lambda rid: (-text_rank[rid], rid))
+    kept = kept[:limit]
+    cards = await recipe_cards_by_ids(session, kept)
+    out = []
+    for rid in kept:
+        card = cards.get(rid)
+        if card:
+            card["text_rank"] = round(text_rank[rid], 4)
+            out.append(card)
+    return out
+
+
+async def search_recipes(
+    session: AsyncSession,
+    mapped_names: List[str],
+    limit: int = 20,
+    text_query: Optional[str] = None,
+    mode: str = MODE_ANY,
+    max_missing: int = 0,
+    filters: Optional[FacetFilter] = None,
+    facets: Optional[FacetCounts] = None,
+) -> List[Dict]:
+    """
+    Rank recipes by how many of `mapped_names` they use (see
+    app.services.ingredient_sets for `mode`/`max_missing`; answered from the
+    shared index file when SEARCH_INDEX_PATH is set). With `text_query`,
+    only recipes matching it in full-text search are considered and the text
+    rank breaks ties between equal ingredient matches; without ingredients the
+    result is plain text search. `filters` narrow the matches by prep time and
+    servings; `facets` is filled with bucket counts over all filtered matches.
+    """
+    limit = max(1, min(100, int(limit or 20)))
+    text_rank: Dict[int, float] = {}
+    if text_query and text_query.strip():
+        text_rank = dict(await search_recipe_ids(session, text_query, limit=MAX_TEXT_HITS))
+        if not text_rank:
+            return []
+        if not mapped_names:
+            if filters or facets is not None:
+                return await _filtered_text_search(session, text_rank, limit, filters, facets)
+            return await text_search_recipes(session, text_query, limit=limit)
+    if not mapped_names:
+        return []
+
+    index = get_search_index()
+    if index is not None:
+        rows = index.match(
+            index.slots_for_names(mapped_names), mode=mode, max_missing=max_missing,
+            limit=None if text_rank else limit,
+            restrict_to=list(text_rank) if text_rank else None,
+            filters=filters, facets=facets,
+        )
+    else:
+        ing_ids = (await session.execute(select(Ingredient.id).where(Ingredient.name.in_(mapped_names)))).scalars().all()
+        rows = await match_ingredient_set(
+            session, ing_ids, mode=mode, max_missing=max_missing,
+            limit=None if text_rank else limit,
+            restrict_to=list(text_rank) if text_rank else None,
+            filters=filters, facets=facets,
+        )
+    if text_rank:
+        rows.sort(key=lambda row: (-row[1], -text_rank.get(row[0], 0.0)))
+        rows = rows[:limit]
+
+    cards = await recipe_cards_by_ids(session, [rid for rid, _, _ in rows])
+    wanted = {n.lower() for n in mapped_names}
+    out = []
+    for rid, match_count, total in rows:
+        card = cards.get(rid)
+        if not card:
+            continue
+        rec_ing_names = card["ingredients"]
+        item = {
+            "id": rid,
+            "title": card["title"],
+            "score": round(match_count / max(total, 1), 3),
+            "match_count": match_count,
+            "missing": sorted(i for i in rec_ing_names if i.lower() not in wanted),
+            "have": sorted(i for i in rec_ing_names if i.lower() in wanted),
+            "ingredients": rec_ing_names,
+            "instructions": card["instructions"],
+            "prep_minutes": card["prep_minutes"],
+            "servings": card["servings"],
+            "image_url": card["image_url"],
+            "thumbnail_url": card["thumbnail_url"],
+            "image_meta": card["image_meta"],
+            "source": card["source"],
+            "likes_count": card["likes_count"],
+        }
+        if text_rank:
+            item["text_rank"] = round(text_rank.get(rid, 0.0), 4)
+        out.append(item)
     return out
@@ -0,0 +1,266 @@
+"""
+"People who saved this also saved": item-item co-occurrence over likes and bookmarks.
+
+Every anon user is a row of a binary users x recipes matrix X (1 = liked or
+bookmarked). Rows of C = X^T X are co-occurrence counts; each recipe keeps its
+top RECS_TOP_N partners by cosine score c_ij / sqrt(n_i * n_j) (n = users who
+saved the recipe), with at least RECS_MIN_SUPPORT shared users, in the
+recipe_recommendation table. Pages read that table only.
+
+With the optional `recs` extra (NumPy + SciPy) X is a CSR matrix and rows of
+C come from one sparse product; without it the same numbers come from plain
+dicts, which is fine for small catalogs.
+
+`refresh_recommendations()` is incremental: it recomputes only recipes saved
+by users who were active since the previous run (new actions, or last_seen
+bumped by a toggle), plus recipes whose stored lists point at those. Removals
+that left no trace (e.g. purged anon users) are picked up by a full rebuild
+(`full=True`, or scripts/build_recommendations.py --full).
+"""
+import asyncio
+import datetime
+import functools
+import logging
+import math
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal
+from app.deps import ANON_TOUCH_INTERVAL
+from app.models import Recipe, RecipeRecommendation
+from app.models.anon import AnonUser, RecipeAction
+
+
+logger = logging.getLogger(__name__)
+
+RECS_TOP_N = int(os.getenv("RECS_TOP_N", "12"))
+RECS_MIN_SUPPORT = int(os.getenv("RECS_MIN_SUPPORT", "2"))
+# 0 disables the in-process schedule (use scripts/build_recommendations.py from cron instead)
+RECS_INTERVAL_SECONDS = int(os.getenv("RECS_INTERVAL_SECONDS", "0"))
+# every Nth scheduled run is a full rebuild; 0 = incremental only
+RECS_FULL_EVERY = int(os.getenv("RECS_FULL_EVERY", "24"))
+
+ACTION_TYPES = ("like", "bookmark")
+
+Scored = List[Tuple[int, float, int]]  # (other_id, score, support)
+
+
+@functools.lru_cache(maxsize=None)
+def _sparse_backend():
+    """(numpy, scipy.sparse) from the optional "recs" extra, or None; imported on first rebuild, not at startup."""
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError:
+        return None
+    return numpy, sparse
+
+
+def _top_n_python(user_items: Dict, targets: Iterable[int], counts: Dict[int, int], top_n: int, min_support: int) -> Dict[int, Scored]:
+    item_users: Dict[int, List] = defaultdict(list)
+    for user, items in user_items.items():
+        for item in items:
+            item_users[item].append(user)
+    out: Dict[int, Scored] = {}
+    for item in targets:
+        co: Counter = Counter()
+        for user in item_users.get(item, ()):
+            co.update(user_items[user])
+        co.pop(item, None)
+        n_i = counts.get(item, 0)
+        scored = [
+            (other, c / math.sqrt(n_i * counts[other]), c)
+            for other, c in co.items()
+            if c >= min_support and n_i and counts.get(other)
+        ]
+        scored.sort(key=lambda s: (-s[1], -s[2], s[0]))
+        out[item] = scored[:top_n]
+    return out
+
+
+def _top_n_sparse(user_items: Dict, targets: Iterable[int], counts: Dict[int, int], top_n: int, min_support: int) -> Dict[int, Scored]:
+    np, sparse = _sparse_backend()
+    targets = list(targets)
+    items = sorted({i for its in user_items.values() for i in its} | set(targets))
+    col = {item: k for k, item in enumerate(items)}
+    rows, cols = [], []
+    for r, its in enumerate(user_items.values()):
+        rows.extend([r] * len(its))
+        cols.extend(col[i] for i in its)
+    X = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(user_items), len(items)),
+    )
+    item_ids = np.asarray(items, dtype=np.int64)
+    n = np.asarray([counts.get(i, 0) for i in items], dtype=np.float64)
+    t_idx = np.asarray([col[t] for t in targets], dtype=np.int64)
+    # rows of X^T X for the targets only: (targets x users) @ (users x items)
+    C = (X.tocsc()[:, t_idx].T @ X).tocsr()
+
+    out: Dict[int, Scored] = {}
+    for r, item in enumerate(targets):
+        lo, hi = C.indptr[r], C.indptr[r + 1]
+        others, co = C.indices[lo:hi], C.data[lo:hi]
+        keep = (others != t_idx[r]) & (co >= min_support) & (n[others] > 0)
+        others, co = others[keep], co[keep]
+        if not len(others) or not n[t_idx[r]]:
+            out[item] = []
+            continue
+        score = co / np.sqrt(n[t_idx[r]] * n[others])
+        order = np.lexsort((item_ids[others], -co, -score))[:top_n]
+        out[item] = [(int(item_ids[others[k]]), float(score[k]), int(co[k])) for k in order]
+    return out
+
+
+def top_co_occurring(user_items: Dict, targets: Iterable[int], counts: Dict[int, int],
+                     top_n: int = RECS_TOP_N, min_support: int = RECS_MIN_SUPPORT) -> Dict[int, Scored]:
+    """Top partners for each target recipe. `counts` are global saver counts per recipe."""
+    if user_items and _sparse_backend() is not None:
+        return _top_n_sparse(user_items, targets, counts, top_n, min_support)
+    return _top_n_python(user_items, targets, counts, top_n, min_support)
+
+
+def _saves():
+    # recipe_action.recipe_id has no FK; skip actions on recipes that are gone
+    return (
+        select(RecipeAction.anon_user_id, RecipeAction.recipe_id)
+        .join(Recipe, Recipe.id == RecipeAction.recipe_id)
+        .where(RecipeAction.action_type.in_(ACTION_TYPES))
+    )
+
+
+async def _load_user_items(session: AsyncSession, stmt) -> Dict:
+    acc: Dict = defaultdict(set)
+    for user, rid in (await session.execute(stmt)).all():
+        acc[user].add(rid)
+    return acc
+
+
+async def _saver_counts(session: AsyncSession) -> Dict[int, int]:
+    stmt = (
+        select(RecipeAction.recipe_id, func.count(func.distinct(RecipeAction.anon_user_id)))
+        .where(RecipeAction.action_type.in_(ACTION_TYPES))
+        .group_by(RecipeAction.recipe_id)
+    )
+    return {rid: int(n) for rid, n in (await session.execute(stmt)).all()}
+
+
+async def _store(session: AsyncSession, recs: Dict[int, Scored], computed_at: datetime.datetime) -> None:
+    ids = list(recs)
+    for i in range(0, len(ids), 1000):
+        await session.execute(delete(RecipeRecommendation).where(RecipeRecommendation.recipe_id.in_(ids[i:i + 1000])))
+    rows = [
+        {"recipe_id": rid, "rank": rank, "other_id": other, "score": round(score, 4),
+         "support": support, "computed_at": computed_at}
+        for rid, top in recs.items()
+        for rank, (other, score, support) in enumerate(top, 1)
+    ]
+    for i in range(0, len(rows), 5000):
+        await session.execute(insert(RecipeRecommendation), rows[i:i + 5000])
+    await session.commit()
+
+
+async def refresh_recommendations(session: AsyncSession, full: bool = False) -> int:
+    """Recompute stored lists; returns the number of recipes written."""
+    started = time.perf_counter()
+    computed_at = datetime.datetime.utcnow()
+    watermark = None
+    if not full:
+        watermark = (await session.execute(select(func.max(RecipeRecommendation.computed_at)))).scalar()
+    if watermark is None:
+        full = True
+
+    if full:
+        user_items = await _load_user_items(session, _saves())
+        counts = Counter(rid for items in user_items.values() for rid in items)
+        targets: Set[int] = set(counts)
+        # recipes that lost all their savers still need their old list cleared
+        stale = await session.execute(select(RecipeRecommendation.recipe_id).distinct())
+        targets |= {rid for (rid,) in stale.all()}
+    else:
+        # a toggle bumps last_seen at most every ANON_TOUCH_INTERVAL
+        since_seen = watermark - ANON_TOUCH_INTERVAL
+        active = (
+            select(RecipeAction.anon_user_id)
+            .where(RecipeAction.action_type.in_(ACTION_TYPES), RecipeAction.created_at >= watermark)
+            .union(select(AnonUser.id).where(AnonUser.last_seen >= since_seen))
+        )
+        touched = await session.execute(_saves().with_only_columns(RecipeAction.recipe_id).distinct()
+                                        .where(RecipeAction.anon_user_id.in_(active)))
+        targets = {rid for (rid,) in touched.all()}
+        if not targets:
+            logger.info("Recommendations: nothing changed since %s", watermark)
+            return 0
+        pointing = await session.execute(
+            select(RecipeRecommendation.recipe_id).where(RecipeRecommendation.other_id.in_(targets)).distinct()
+        )
+        targets |= {rid for (rid,) in pointing.all()}
+        # only users who saved a target contribute to the target rows
+        savers = _saves().with_only_columns(RecipeAction.anon_user_id).where(RecipeAction.recipe_id.in_(targets))
+        user_items = await _load_user_items(session, _saves().where(RecipeAction.anon_user_id.in_(savers.scalar_subquery())))
+        counts = await _saver_counts(session)
+
+    recs = top_co_occurring(user_items, sorted(targets), counts)
+    await _store(session, recs, computed_at)
+    logger.info(
+        "Recommendations: %s refresh wrote %d recipes from %d users in %.2fs (%s)",
+        "full" if full else "incremental", len(recs), len(user_items), time.perf_counter() - started,
+        "scipy" if _sparse_backend() is not None else "python",
+    )
+    return len(recs)
+
+
+async def run_recommendations_schedule(interval_seconds: int = RECS_INTERVAL_SECONDS) -> None:
+    """Background loop started from the app lifespan when RECS_INTERVAL_SECONDS > 0."""
+    runs = 0
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                await refresh_recommendations(session, full=bool(RECS_FULL_EVERY) and runs % RECS_FULL_EVERY == 0)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Recommendations refresh failed")
+        runs += 1
+        await asyncio.sleep(interval_seconds)
+
+
+async def get_recommendations(session: AsyncSession, recipe_id: int, limit: int = 6) -> List[Dict]:
+    stmt = (
+        select(Recipe.id, Recipe.title, Recipe.thumbnail_url, Recipe.image_url, Recipe.image_meta, RecipeRecommendation.score)
+        .join(Recipe, Recipe.id == RecipeRecommendation.other_id)
+        .where(RecipeRecommendation.recipe_id == recipe_id)
+        .order_by(RecipeRecommendation.rank)
+        .limit(limit)
+    )
+    res = await session.execute(stmt)
+    return [
+        {"id": r.id, "title": r.title, "thumbnail_url": r.thumbnail_url, "image_url": r.image_url, "image_meta": r.image_meta, "score": r.score}
+        for r in res.all()
+    ]
+
+
+async def get_recommendations_for_set(session: AsyncSession, recipe_ids: Iterable[int],
+                                      exclude: Optional[Iterable[int]] = None, limit: int = 6) -> List[Dict]:
+    """Blend the stored lists of several recipes (e.g. a page of bookmarks)."""
+    ids = list(recipe_ids)
+    if not ids:
+        return []
+    skip = set(ids) | set(exclude or ())
+    score = func.sum(RecipeRecommendation.score).label("score")
+    stmt = (
+        select(Recipe.id, Recipe.title, Recipe.thumbnail_url, Recipe.image_url, Recipe.image_meta, score)
+        .join(Recipe, Recipe.id == RecipeRecommendation.other_id)
+        .where(RecipeRecommendation.recipe_id.in_(ids), RecipeRecommendation.other_id.not_in(skip))
+        .group_by(Recipe.id, Recipe.title, Recipe.thumbnail_url, Recipe.image_url, Recipe.image_meta)
+        .order_by(score.desc(), Recipe.id)
+        .limit(limit)
+    )
+    res = await session.execute(stmt)
+    return [
+        {"id": r.id, "title": r.title, "thumbnail_url": r.thumbnail_url, "image_url": r.image_url, "image_meta": r.image_meta, "score": float(r.score)}
+        for r in res.all()
+    ]
@@ -0,0 +1,105 @@
+"""
+Anon user retention: purge anonymous users that never saved anything.
+
+An anon user is inactive when it has no rows in recipe_action and its
+last_seen is older than ANON_RETENTION_DAYS. Rows are deleted in batches of
+ANON_GC_BATCH_SIZE, each batch in its own short transaction, oldest first via
+ix_anon_user_last_seen. Between batches the job sleeps at least
+ANON_GC_PAUSE_SECONDS and, when a batch was slow (the DB is busy), in
+proportion to how long it took, so it backs off under live traffic.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select, delete, exists
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models.anon import AnonUser, RecipeAction
+
+logger = logging.getLogger(__name__)
+
+ANON_RETENTION_DAYS = int(os.getenv("ANON_RETENTION_DAYS", "30"))
+ANON_GC_BATCH_SIZE = int(os.getenv("ANON_GC_BATCH_SIZE", "500"))
+ANON_GC_PAUSE_SECONDS = float(os.getenv("ANON_GC_PAUSE_SECONDS", "0.2"))
+ANON_GC_MAX_BATCHES = int(os.getenv("ANON_GC_MAX_BATCHES", "200"))
+# 0 disables the in-process schedule (use scripts/purge_anon_users.py from cron instead)
+ANON_GC_INTERVAL_SECONDS = int(os.getenv("ANON_GC_INTERVAL_SECONDS", "0"))
+# sleep this many times the duration of the previous batch (load-proportional back-off)
+_BACKOFF_FACTOR = 4.0
+
+
+@dataclass
+class PurgeReport:
+    purged: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    exhausted: bool = True  # False when max_batches stopped the run early
+
+
+async def purge_inactive_anon_users(
+    older_than_days: int = ANON_RETENTION_DAYS,
+    batch_size: int = ANON_GC_BATCH_SIZE,
+    pause_seconds: float = ANON_GC_PAUSE_SECONDS,
+    max_batches: int = ANON_GC_MAX_BATCHES,
+    sessionmaker: Optional[async_sessionmaker] = None,
+) -> PurgeReport:
+    sessionmaker = sessionmaker or AsyncSessionLocal
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    report = PurgeReport()
+    started = time.perf_counter()
+
+    while True:
+        if report.batches >= max_batches:
+            report.exhausted = False
+            break
+
+        batch_started = time.perf_counter()
+        async with sessionmaker() as session:
+            dialect = session.bind.dialect.name if session.bind is not None else ""
+            victims = (
+                select(AnonUser.id)
+                .where(
+                    AnonUser.last_seen < cutoff,
+                    ~exists().where(RecipeAction.anon_user_id == AnonUser.id),
+                )
+                .order_by(AnonUser.last_seen)
+                .limit(batch_size)
+            )
+            if dialect == "postgresql":
+                # don't wait on rows a live request is touching; next run gets them
+                victims = victims.with_for_update(skip_locked=True)
+            res = await session.execute(delete(AnonUser).where(AnonUser.id.in_(victims.scalar_subquery())))
+            await session.commit()
+            deleted = int(res.rowcount or 0)
+
+        report.batches += 1
+        report.purged += deleted
+        if deleted < batch_size:
+            break
+
+        took = time.perf_counter() - batch_started
+        await asyncio.sleep(max(pause_seconds, took * _BACKOFF_FACTOR))
+
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        "Anon retention: purged %d users inactive for %d+ days in %d batches (%.2fs)%s",
+        report.purged, older_than_days, report.batches, report.seconds,
+        "" if report.exhausted else "; stopped at max_batches",
+    )
+    return report
+
+
+async def run_retention_schedule(interval_seconds: int = ANON_GC_INTERVAL_SECONDS) -> None:
+    """Background loop started from the app lifespan when ANON_GC_INTERVAL_SECONDS > 0."""
+    while True:
+        try:
+            await purge_inactive_anon_users()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Anon retention run failed")
+        await asyncio.sleep(interval_seconds)
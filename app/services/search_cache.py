@@ -0,0 +1,183 @@
+"""
+Result cache for unfiltered ingredient-set searches, warmed from the query log.
+
+`/api/recipes/search_simple` (no facet filters) and `/search` (no text query)
+keep results per (kind, query key, limit), least-recently-used beyond
+SEARCH_CACHE_MAX_ENTRIES and for at most SEARCH_CACHE_TTL_SECONDS (likes
+counts on the results move without the catalog changing). Per worker, in memory.
+Each entry also keeps the ingredient names it was searched with.
+
+`warm_search_cache()` precomputes the SEARCH_WARM_TOP most searched keys
+(app/services/query_log.py) with the same code paths the routes use.
+`apply_catalog_changes()` follows the catalog change feed
+(app/services/catalog_changes.py): it drops the entries that list a changed
+recipe or were searched with an ingredient of one, and warms what was dropped
+again. The feed's first (full) change set, and any ingredient change, clear
+and re-warm everything. Without the feed the cache is warmed once at startup
+and entries only expire by TTL.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import AbstractSet, Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models import Ingredient, recipe_ingredient
+from app.services.catalog_changes import ChangeSet
+from app.services.query_log import top_queries
+from app.services.recipes import search_recipes, simple_search
+from app.utils.mapping import map_input_to_ingredient_names
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+# 0 disables the warm-up
+SEARCH_WARM_TOP = int(os.getenv("SEARCH_WARM_TOP", "50"))
+# only queries searched within this many days are warmed (0 = any)
+SEARCH_WARM_DAYS = int(os.getenv("SEARCH_WARM_DAYS", "30"))
+
+# limits the routes use by default, so warmed entries are the ones requests ask for
+SIMPLE_LIMIT = 50
+PAGE_LIMIT = 20
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl: float = SEARCH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (stored at, results, ingredient names searched)
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[Dict], FrozenSet[str]]]" = OrderedDict()
+        # catalog change feed version the entries reflect
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+        self.warmed = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        hit = self._entries.get(key)
+        return hit is not None and time.monotonic() - hit[0] <= self.ttl
+
+    def get(self, key: Hashable) -> Optional[List[Dict]]:
+        if not SEARCH_CACHE_ENABLED:
+            return None
+        hit = self._entries.get(key)
+        if hit is None or time.monotonic() - hit[0] > self.ttl:
+            if hit is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return hit[1]
+
+    def put(self, key: Hashable, results: List[Dict], terms: Iterable[str] = ()) -> None:
+        """Store `results`; `terms` are the ingredient names (or normalized keys) they were searched with."""
+        if not SEARCH_CACHE_ENABLED:
+            return
+        self._entries[key] = (time.monotonic(), results, frozenset(terms))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, recipe_ids: AbstractSet[int], terms: AbstractSet[str]) -> int:
+        """Drop entries listing one of `recipe_ids` or searched with one of `terms`; returns how many."""
+        stale = [
+            key for key, (_, results, searched) in self._entries.items()
+            if not searched or not searched.isdisjoint(terms) or any(r.get("id") in recipe_ids for r in results)
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def clear(self) -> int:
+        dropped = len(self._entries)
+        self._entries.clear()
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": SEARCH_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidated": self.invalidated,
+            "warmed": self.warmed,
+            "version": self.version,
+        }
+
+
+search_cache = SearchCache()
+
+
+async def warm_search_cache(
+    top: int = SEARCH_WARM_TOP,
+    days: int = SEARCH_WARM_DAYS,
+    sessionmaker: Optional[async_sessionmaker] = None,
+    cache: Optional[SearchCache] = None,
+    only_missing: bool = False,
+) -> int:
+    """Compute and cache results for the `top` most searched keys (`only_missing`: those not cached); returns how many were warmed."""
+    cache = cache or search_cache
+    if top <= 0 or not SEARCH_CACHE_ENABLED:
+        return 0
+    sessionmaker = sessionmaker or AsyncSessionLocal
+    started = time.perf_counter()
+    warmed = 0
+    async with sessionmaker() as session:
+        for key in await top_queries(session, top, days or None):
+            simple_key, page_key = ("simple", key, SIMPLE_LIMIT), ("page", key, PAGE_LIMIT)
+            if only_missing and simple_key in cache and page_key in cache:
+                continue
+            wanted = set(key.split(","))
+            cache.put(simple_key, await simple_search(session, wanted, SIMPLE_LIMIT), wanted)
+            mapped = await map_input_to_ingredient_names(session, sorted(wanted))
+            if mapped:
+                cache.put(page_key, await search_recipes(session, mapped, limit=PAGE_LIMIT), mapped)
+            warmed += 1
+    cache.warmed += warmed
+    if warmed:
+        logger.info("Search cache: warmed %d queries (%.2fs)", warmed, time.perf_counter() - started)
+    return warmed
+
+
+async def apply_catalog_changes(session: AsyncSession, changes: ChangeSet, cache: Optional[SearchCache] = None) -> int:
+    """Catalog feed subscriber: drop entries the changes can affect and warm them again; returns entries dropped."""
+    cache = cache or search_cache
+    if changes.full or changes.ingredient_ids:
+        # first sync, or added/renamed ingredients: name mapping may differ for any query
+        dropped = cache.clear()
+        await warm_search_cache(cache=cache)
+    else:
+        recipe_ids = changes.touched_recipe_ids
+        # ingredients of the changed recipes, plus those of removed links
+        ingredient_ids = select(recipe_ingredient.c.ingredient_id).where(recipe_ingredient.c.recipe_id.in_(sorted(recipe_ids)))
+        rows = await session.execute(
+            select(Ingredient.name, Ingredient.name_norm).where(or_(
+                Ingredient.id.in_(ingredient_ids),
+                Ingredient.id.in_(sorted({iid for _, iid in changes.links})),
+            ))
+        )
+        terms = {t for row in rows for t in row}
+        dropped = cache.invalidate(recipe_ids, terms)
+        if dropped:
+            await warm_search_cache(cache=cache, only_missing=True)
+    cache.version = changes.version
+    return dropped
+
+
+async def run_search_cache_warmup() -> None:
+    """Background warm-up for workers without the catalog feed (which warms on its first poll)."""
+    try:
+        await warm_search_cache()
+    except Exception:
+        logger.exception("Search cache warm-up failed")
@@ -0,0 +1,115 @@
+"""
+Shared on-disk search index (see app/utils/index_file.py for the format).
+
+With SEARCH_INDEX_PATH set, ingredient name mapping and ingredient-set
+matching are answered from a memory-mapped file instead of SQL; recipe cards
+still come from the DB. `build_search_index()` (scripts/build_search_index.py,
+or on startup with SEARCH_INDEX_BUILD_ON_START) writes a new generation and
+every worker picks it up within SEARCH_INDEX_CHECK_SECONDS. Without the
+setting, or while the file does not exist yet, callers fall back to SQL.
+
+Next to the file, `<path>.catalog-version` records the catalog change feed
+version (app/services/catalog_changes.py) the generation was built from;
+`build_search_index_if_changed()` (the script's --if-changed) only writes a
+new generation when the feed has changes after it.
+"""
+import logging
+import os
+import time
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, Ingredient, recipe_ingredient
+from app.services.catalog_changes import changes_since, current_version
+from app.utils.index_file import IndexFile, IndexFormatError, write_index
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "")
+SEARCH_INDEX_CHECK_SECONDS = float(os.getenv("SEARCH_INDEX_CHECK_SECONDS", "2"))
+SEARCH_INDEX_BUILD_ON_START = os.getenv("SEARCH_INDEX_BUILD_ON_START", "false").lower() in ("1", "true", "yes")
+
+_current: Optional[IndexFile] = None
+_checked_at = 0.0
+
+
+def get_search_index(path: Optional[str] = None) -> Optional[IndexFile]:
+    """Current index generation, or None when disabled/missing. Cheap to call per request."""
+    global _current, _checked_at
+    path = path or SEARCH_INDEX_PATH
+    if not path:
+        return None
+    now = time.monotonic()
+    if _current is not None and _current.path == path and now - _checked_at < SEARCH_INDEX_CHECK_SECONDS:
+        return _current
+    _checked_at = now
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _current = None
+        return None
+    if _current is not None and _current.path == path and _current.identity == (st.st_ino, st.st_mtime_ns, st.st_size):
+        return _current
+    try:
+        fresh = IndexFile(path)
+    except (OSError, IndexFormatError):
+        logger.exception("Cannot open search index %s; falling back to SQL", path)
+        _current = None
+        return None
+    if _current is not None:
+        logger.info("Search index swapped: generation %d -> %d", _current.generation, fresh.generation)
+    # the previous mapping is released once in-flight requests drop their reference
+    _current = fresh
+    return fresh
+
+
+async def build_search_index(session: AsyncSession, path: Optional[str] = None) -> int:
+    """Write a new index generation from the DB; returns its generation number."""
+    path = path or SEARCH_INDEX_PATH
+    if not path:
+        raise ValueError("SEARCH_INDEX_PATH is not set")
+    started = time.perf_counter()
+    # read first: a change committed while the tables are read is rebuilt again next time
+    version = await current_version(session)
+    ingredients = (await session.execute(select(Ingredient.id, Ingredient.name, Ingredient.name_norm))).all()
+    recipes = (await session.execute(select(Recipe.id, Recipe.title, Recipe.prep_minutes, Recipe.servings))).all()
+    pairs = (await session.execute(select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id))).all()
+    generation = write_index(path, ingredients, recipes, pairs)
+    _write_built_version(path, version)
+    logger.info(
+        "Search index generation %d written to %s: %d ingredients, %d recipes, %d postings (%.2fs)",
+        generation, path, len(ingredients), len(recipes), len(pairs), time.perf_counter() - started,
+    )
+    return generation
+
+
+def _version_path(path: str) -> str:
+    return f"{path}.catalog-version"
+
+
+def _write_built_version(path: str, version: int) -> None:
+    tmp = f"{_version_path(path)}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(str(version))
+    os.replace(tmp, _version_path(path))
+
+
+def built_version(path: Optional[str] = None) -> Optional[int]:
+    """Catalog version the index at `path` was built from; None when unknown."""
+    path = path or SEARCH_INDEX_PATH
+    try:
+        with open(_version_path(path), encoding="utf-8") as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+async def build_search_index_if_changed(session: AsyncSession, path: Optional[str] = None) -> Optional[int]:
+    """Write a new generation only if the catalog changed since the current one; returns it, or None when skipped."""
+    path = path or SEARCH_INDEX_PATH
+    if not path:
+        raise ValueError("SEARCH_INDEX_PATH is not set")
+    if os.path.exists(path) and (await changes_since(session, built_version(path), limit=1)).empty:
+        logger.info("Search index %s is up to date (catalog version %s)", path, built_version(path))
+        return None
+    return await build_search_index(session, path)
@@ -0,0 +1,213 @@
+"""
+"Similar recipes" from ingredient-set overlap, precomputed with MinHash + LSH.
+
+Every recipe's ingredient id set gets a MinHash signature of NUM_PERM values;
+the signature is cut into LSH_BANDS bands and recipes that share any band
+bucket become candidates. Only candidates are scored with exact Jaccard, and
+the top k go to the recipe_neighbor table, which the detail page reads with
+one primary-key range lookup.
+
+`rebuild_neighbors()` recomputes everything; `update_neighbors(ids)` only
+recomputes the given recipes and the recipes they collide with in LSH (whose
+top-k lists are the only ones that can change).
+"""
+import logging
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe, RecipeNeighbor, recipe_ingredient
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+# 64 bands x 2 rows: collision threshold ~(1/64)**(1/2) = 0.125, low enough for
+# recipe neighbors, which typically share a third of their ingredients or less
+# (scripts/bench_similar.py: recall@8 ~0.98 at ~5% of the catalog scored)
+LSH_BANDS = 64
+NEIGHBORS_K = 8
+MIN_SCORE = 0.1
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = LSH_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rnd = random.Random(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._perms = [
+            (rnd.randrange(1, _MERSENNE_PRIME), rnd.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items: Iterable[int]) -> Tuple[int, ...]:
+        items = list(items)
+        if not items:
+            return ()
+        return tuple(
+            min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in items)
+            for a, b in self._perms
+        )
+
+    def band_keys(self, sig: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        r = self.rows
+        return [(i, sig[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+@dataclass
+class LSHIndex:
+    hasher: MinHasher
+    sets: Dict[int, FrozenSet[int]]
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]]
+    keys: Dict[int, List[Tuple[int, Tuple[int, ...]]]]
+
+    @classmethod
+    def build(cls, sets: Dict[int, FrozenSet[int]], hasher: Optional[MinHasher] = None) -> "LSHIndex":
+        hasher = hasher or MinHasher()
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        keys = {}
+        for rid, items in sets.items():
+            sig = hasher.signature(items)
+            if not sig:
+                continue
+            keys[rid] = hasher.band_keys(sig)
+            for key in keys[rid]:
+                buckets[key].append(rid)
+        return cls(hasher=hasher, sets=sets, buckets=buckets, keys=keys)
+
+    def remove(self, rid: int) -> None:
+        for key in self.keys.pop(rid, ()):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.remove(rid)
+                if not bucket:
+                    del self.buckets[key]
+        self.sets.pop(rid, None)
+
+    def upsert(self, rid: int, items: FrozenSet[int]) -> None:
+        self.remove(rid)
+        sig = self.hasher.signature(items)
+        if not sig:
+            return
+        self.sets[rid] = items
+        self.keys[rid] = self.hasher.band_keys(sig)
+        for key in self.keys[rid]:
+            self.buckets[key].append(rid)
+
+    def candidates(self, rid: int) -> Set[int]:
+        out: Set[int] = set()
+        for key in self.keys.get(rid, ()):
+            out.update(self.buckets[key])
+        out.discard(rid)
+        return out
+
+    def top_k(self, rid: int, k: int = NEIGHBORS_K, min_score: float = MIN_SCORE) -> List[Tuple[int, float]]:
+        mine = self.sets.get(rid, frozenset())
+        scored = [(other, jaccard(mine, self.sets[other])) for other in self.candidates(rid)]
+        scored = [s for s in scored if s[1] >= min_score]
+        scored.sort(key=lambda s: (-s[1], s[0]))
+        return scored[:k]
+
+
+# kept between update_neighbors() calls in a long-running process, so an
+# incremental update only re-hashes the changed recipes
+_index: Optional[LSHIndex] = None
+
+
+async def load_ingredient_sets(session: AsyncSession, recipe_ids: Optional[Iterable[int]] = None) -> Dict[int, FrozenSet[int]]:
+    stmt = select(recipe_ingredient.c.recipe_id, recipe_ingredient.c.ingredient_id)
+    if recipe_ids is not None:
+        stmt = stmt.where(recipe_ingredient.c.recipe_id.in_(list(recipe_ids)))
+    res = await session.execute(stmt)
+    acc: Dict[int, Set[int]] = defaultdict(set)
+    for rid, iid in res.all():
+        acc[rid].add(iid)
+    return {rid: frozenset(items) for rid, items in acc.items()}
+
+
+async def _store(session: AsyncSession, neighbors: Dict[int, List[Tuple[int, float]]], stale: Iterable[int] = ()) -> None:
+    """Replace the neighbors of the recipes in `neighbors` and drop those of `stale` recipes (no ingredients left)."""
+    ids = list(neighbors) + sorted(set(stale) - set(neighbors))
+    for i in range(0, len(ids), 1000):
+        await session.execute(delete(RecipeNeighbor).where(RecipeNeighbor.recipe_id.in_(ids[i:i + 1000])))
+    rows = [
+        {"recipe_id": rid, "rank": rank, "neighbor_id": other, "score": round(score, 4)}
+        for rid, top in neighbors.items()
+        for rank, (other, score) in enumerate(top, 1)
+    ]
+    for i in range(0, len(rows), 5000):
+        await session.execute(insert(RecipeNeighbor), rows[i:i + 5000])
+    await session.commit()
+
+
+async def rebuild_neighbors(session: AsyncSession, k: int = NEIGHBORS_K) -> int:
+    """Recompute neighbors for the whole catalog; returns the number of recipes written."""
+    global _index
+    started = time.perf_counter()
+    sets = await load_ingredient_sets(session)
+    index = _index = LSHIndex.build(sets)
+    neighbors = {rid: index.top_k(rid, k) for rid in sets}
+    # recipes that lost all their ingredients since their neighbors were stored
+    stored = (await session.execute(select(RecipeNeighbor.recipe_id).distinct())).scalars().all()
+    await _store(session, neighbors, stale=[rid for rid in stored if rid not in sets])
+    logger.info("Rebuilt similar recipes for %d recipes in %.2fs", len(neighbors), time.perf_counter() - started)
+    return len(neighbors)
+
+
+async def update_neighbors(session: AsyncSession, recipe_ids: Iterable[int], k: int = NEIGHBORS_K) -> int:
+    """Recompute neighbors after the given recipes were added, changed or deleted."""
+    global _index
+    changed = set(recipe_ids)
+    if not changed:
+        return 0
+    if _index is None:
+        _index = LSHIndex.build(await load_ingredient_sets(session))
+    else:
+        fresh = await load_ingredient_sets(session, changed)
+        for rid in changed:
+            if rid in fresh:
+                _index.upsert(rid, fresh[rid])
+            else:
+                _index.remove(rid)
+    index = _index
+    sets = index.sets
+    affected = {rid for rid in changed if rid in sets}
+    for rid in list(affected):
+        affected |= index.candidates(rid)
+    # recipes that listed a changed recipe before the change may have to drop it
+    res = await session.execute(
+        select(RecipeNeighbor.recipe_id).where(RecipeNeighbor.neighbor_id.in_(changed)).distinct()
+    )
+    affected |= {rid for (rid,) in res.all() if rid in sets}
+    await _store(session, {rid: index.top_k(rid, k) for rid in affected}, stale=changed - sets.keys())
+    return len(affected)
+
+
+async def get_similar_recipes(session: AsyncSession, recipe_id: int, limit: int = 6) -> List[Dict]:
+    stmt = (
+        select(Recipe.id, Recipe.title, Recipe.thumbnail_url, Recipe.image_url, Recipe.image_meta, RecipeNeighbor.score)
+        .join(Recipe, Recipe.id == RecipeNeighbor.neighbor_id)
+        .where(RecipeNeighbor.recipe_id == recipe_id)
+        .order_by(RecipeNeighbor.rank)
+        .limit(limit)
+    )
+    res = await session.execute(stmt)
+    return [
+        {"id": r.id, "title": r.title, "thumbnail_url": r.thumbnail_url, "image_url": r.image_url, "image_meta": r.image_meta, "score": r.score}
+        for r in res.all()
+    ]
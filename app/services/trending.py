@@ -0,0 +1,200 @@
+"""
+Trending recipes: time-decayed like/bookmark/view scores kept in memory.
+
+Like/bookmark toggles and batches (app/api/actions.py,
+app/services/actions.py) and detail page views (app/frontend/routes.py) call
+`trending.record()`, which adds the event's TRENDING_WEIGHTS weight (or
+takes it back on unlike/unbookmark) to a DecayedTopK board
+(app/utils/trending.py) with a half-life of TRENDING_HALF_LIFE_HOURS. The
+homepage carousel and /api/recipes/trending read `top(k)` from the board's
+heap; neither aggregates recipe_action.
+
+Every TRENDING_CHECKPOINT_SECONDS the increments recorded since the last
+checkpoint are added to recipe_trending with one upsert. Scores are stored in
+the board's forward-decayed form, so the upsert is a plain addition and
+several workers can checkpoint concurrently. The board is then reloaded with
+the TRENDING_KEEP best rows, which brings in events seen by other workers.
+At startup the board is loaded from the table.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, case
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db import AsyncSessionLocal
+from app.models import RecipeTrending
+from app.services.recipes import recipe_cards_by_ids
+from app.utils.trending import DecayedTopK
+
+logger = logging.getLogger(__name__)
+
+TRENDING_ENABLED = os.getenv("TRENDING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_CHECKPOINT_SECONDS = float(os.getenv("TRENDING_CHECKPOINT_SECONDS", "60"))
+TRENDING_KEEP = int(os.getenv("TRENDING_KEEP", "1000"))
+
+TRENDING_WEIGHTS = {"view": 1.0, "like": 3.0, "bookmark": 5.0}
+
+
+def upsert_scores(dialect_name: str, epoch_factor: float):
+    """INSERT into recipe_trending that adds to an existing row, carrying a previous-epoch score over."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"upsert_scores: unsupported dialect {dialect_name}")
+    stmt = dialect_insert(RecipeTrending)
+    t = RecipeTrending
+    return stmt.on_conflict_do_update(
+        index_elements=["recipe_id"],
+        set_={
+            "score": case(
+                (t.epoch == stmt.excluded.epoch, t.score + stmt.excluded.score),
+                (t.epoch == stmt.excluded.epoch - 1, t.score * epoch_factor + stmt.excluded.score),
+                else_=stmt.excluded.score,
+            ),
+            "epoch": stmt.excluded.epoch,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+class TrendingEngine:
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        half_life_hours: float = TRENDING_HALF_LIFE_HOURS,
+        interval: float = TRENDING_CHECKPOINT_SECONDS,
+        keep: int = TRENDING_KEEP,
+    ):
+        self.sessionmaker = sessionmaker
+        self.interval = interval
+        self.keep = keep
+        self.board = DecayedTopK(half_life_hours * 3600)
+        # stored-score increments since the last checkpoint, in the epoch `_pending_epoch`
+        self._pending: Dict[int, float] = {}
+        self._pending_epoch = self.board.epoch
+        self.events = 0
+        self.checkpoints = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _sync_pending(self) -> None:
+        if self._pending_epoch != self.board.epoch:
+            self._pending = {
+                k: self.board.rescale(d, self._pending_epoch) for k, d in self._pending.items()
+            }
+            self._pending_epoch = self.board.epoch
+
+    def record(self, recipe_id: int, event: str, sign: int = 1) -> None:
+        """Count a "view", "like" or "bookmark" (sign=-1 takes a like/bookmark back)."""
+        if not TRENDING_ENABLED:
+            return
+        delta = self.board.add(recipe_id, TRENDING_WEIGHTS[event] * sign)
+        self._sync_pending()
+        self._pending[recipe_id] = self._pending.get(recipe_id, 0.0) + delta
+        self.events += 1
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        return self.board.top(k)
+
+    async def load(self) -> int:
+        """Replace the board with the best TRENDING_KEEP checkpointed scores; returns how many were loaded."""
+        self.board.advance(time.time())
+        epoch = self.board.epoch
+        factor = self.board.epoch_factor
+        current = case((RecipeTrending.epoch == epoch, RecipeTrending.score), else_=RecipeTrending.score * factor)
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(
+                select(RecipeTrending.recipe_id, RecipeTrending.epoch, RecipeTrending.score)
+                .where(RecipeTrending.epoch >= epoch - 1, RecipeTrending.score > 0)
+                .order_by(current.desc())
+                .limit(self.keep)
+            )).all()
+        scores = {rid: self.board.rescale(score, row_epoch, epoch) for rid, row_epoch, score in rows}
+        # events recorded while the query ran are not in the table yet
+        self._sync_pending()
+        for rid, d in self._pending.items():
+            scores[rid] = scores.get(rid, 0.0) + self.board.rescale(d, self._pending_epoch, epoch)
+        self.board.replace(scores, epoch)
+        return len(rows)
+
+    async def checkpoint(self) -> int:
+        """Add pending increments to recipe_trending, drop expired rows, reload; returns rows written."""
+        self.board.advance(time.time())
+        self._sync_pending()
+        pending, epoch = self._pending, self._pending_epoch
+        self._pending = {}
+        if pending:
+            now = datetime.datetime.utcnow()
+            # sorted: concurrent checkpoints from other workers lock rows in the same order
+            values = [{"recipe_id": rid, "epoch": epoch, "score": d, "updated_at": now} for rid, d in sorted(pending.items())]
+            try:
+                async with self.sessionmaker() as session:
+                    await session.execute(upsert_scores(session.get_bind().dialect.name, self.board.epoch_factor), values)
+                    await session.execute(delete(RecipeTrending).where(RecipeTrending.epoch < epoch - 1))
+                    await session.commit()
+            except Exception:
+                # keep the increments for the next attempt
+                for rid, d in pending.items():
+                    self._pending[rid] = self._pending.get(rid, 0.0) + d
+                raise
+        await self.load()
+        self.checkpoints += 1
+        return len(pending)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.checkpoint()
+            except Exception:
+                logger.exception("Trending checkpoint failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="trending")
+
+    async def close(self) -> None:
+        """Stop the background task and write what is left (graceful shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.checkpoint()
+        except Exception:
+            logger.exception("Final trending checkpoint failed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": TRENDING_ENABLED,
+            "tracked": len(self.board),
+            "pending": len(self._pending),
+            "events": self.events,
+            "checkpoints": self.checkpoints,
+        }
+
+
+trending = TrendingEngine()
+
+
+async def trending_recipes(session: AsyncSession, limit: int = 12, with_scores: bool = True) -> List[Dict]:
+    """Recipe cards for the current top `limit`, best first; one primary-key lookup."""
+    top = trending.top(limit)
+    cards = await recipe_cards_by_ids(session, [rid for rid, _ in top])
+    out = []
+    for rid, score in top:
+        card = cards.get(rid)
+        if card is None:  # deleted recipe still on the board
+            continue
+        if with_scores:
+            card["score"] = round(score, 3)
+        out.append(card)
+    return out
@@ -15,57 +15,141 @@ function updateLikesCountOnPage(recipeId, count) {
   }
 }
 
-async function toggleLike(recipeId, btnEl) {
-  if (!btnEl || btnEl.dataset.inflight === '1') return;
-  btnEl.dataset.inflight = '1';
-  btnEl.setAttribute('aria-busy', 'true');
+// Toggles are applied to the buttons right away and synced in one batch request
+// shortly after the last click, so rapid clicking costs a single round trip.
+// A batch that fails (offline, 5xx, 429, ...) is queued again, minus the ops
+// clicked over since, and retried with backoff (at least Retry-After).
+const SYNC_DELAY_MS = 250;
+// ActionBatchIn.ops max_length in app/schemas/action.py
+const MAX_BATCH_OPS = 200;
+const RETRY_BASE_MS = 1000;
+const RETRY_MAX_MS = 60000;
+const pendingOps = new Map(); // "like:12" -> {recipe_id, action_type, desired_state}
+let syncTimer = null;
+let syncInflight = null;
+let syncFailures = 0;
 
-  try {
-    const res = await fetch(`/api/recipes/${encodeURIComponent(recipeId)}/like`, {
-      method: 'POST',
-      credentials: 'same-origin',
-      headers: { 'X-Requested-With': 'XMLHttpRequest' },
-    });
-    if (!res.ok) {
-      console.warn('Like request failed', res.status);
-      return;
-    }
-    const j = await res.json();
-    setBtnState(btnEl, j.status === 'liked');
-    if (typeof j.likes_count !== 'undefined') updateLikesCountOnPage(recipeId, j.likes_count);
-  } catch (err) {
-    console.error('toggleLike error', err);
-  } finally {
-    delete btnEl.dataset.inflight;
-    btnEl.removeAttribute('aria-busy');
+function buttonsFor(actionType, recipeId) {
+  const attr = actionType === 'like' ? 'data-like' : 'data-bookmark';
+  return Array.from(document.querySelectorAll(`[${attr}="${CSS.escape(String(recipeId))}"]`));
+}
+
+function queueAction(recipeId, actionType, btnEl) {
+  if (!btnEl) return;
+  const desired = btnEl.getAttribute('aria-pressed') !== 'true';
+  buttonsFor(actionType, recipeId).forEach(b => setBtnState(b, desired));
+  pendingOps.set(`${actionType}:${recipeId}`, {
+    recipe_id: Number(recipeId), action_type: actionType, desired_state: desired,
+  });
+  // while backing off, the scheduled retry takes the new op along
+  if (syncFailures === 0) scheduleSync(SYNC_DELAY_MS);
+}
+
+function scheduleSync(delayMs) {
+  if (syncTimer) clearTimeout(syncTimer);
+  syncTimer = setTimeout(syncActions, delayMs);
+}
+
+function retryAfterMs(header) {
+  if (!header) return 0;
+  const secs = Number(header);
+  if (!Number.isNaN(secs)) return Math.max(0, secs * 1000);
+  const at = Date.parse(header); // HTTP-date form
+  return Number.isNaN(at) ? 0 : Math.max(0, at - Date.now());
+}
+
+function takeBatch() {
+  const ops = [];
+  for (const [key, op] of pendingOps) {
+    if (ops.length >= MAX_BATCH_OPS) break;
+    ops.push(op);
+    pendingOps.delete(key);
+  }
+  return ops;
+}
+
+async function syncActions() {
+  syncTimer = null;
+  if (syncInflight) {
+    // one batch at a time; go again once the current one is done
+    await syncInflight;
   }
+  // another caller may have started the next batch meanwhile; it schedules the rest
+  if (pendingOps.size === 0 || syncInflight) return;
+  const ops = takeBatch();
+
+  syncInflight = (async () => {
+    let ok = false;
+    let waitMs = 0;
+    try {
+      const res = await fetch('/api/recipes/actions/batch', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'X-Requested-With': 'XMLHttpRequest', 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ops }),
+      });
+      if (!res.ok) {
+        console.warn('Actions sync failed', res.status);
+        waitMs = retryAfterMs(res.headers.get('Retry-After'));
+        return;
+      }
+      const j = await res.json();
+      for (const r of j.results || []) {
+        // a newer click for the same button wins over this server answer
+        if (pendingOps.has(`${r.action_type}:${r.recipe_id}`) || r.error) continue;
+        buttonsFor(r.action_type, r.recipe_id).forEach(b => setBtnState(b, !!r.state));
+        if (typeof r.likes_count === 'number') updateLikesCountOnPage(r.recipe_id, r.likes_count);
+      }
+      ok = true;
+    } catch (err) {
+      console.error('syncActions error', err);
+    } finally {
+      syncInflight = null;
+      if (ok) {
+        syncFailures = 0;
+        if (pendingOps.size > 0) scheduleSync(0);
+      } else {
+        // ops are desired states, so sending one twice is harmless
+        for (const op of ops) {
+          const key = `${op.action_type}:${op.recipe_id}`;
+          if (!pendingOps.has(key)) pendingOps.set(key, op);
+        }
+        syncFailures += 1;
+        const backoffMs = Math.min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** (syncFailures - 1));
+        scheduleSync(Math.max(backoffMs, waitMs));
+      }
+    }
+  })();
+  await syncInflight;
 }
 
-async function toggleBookmark(recipeId, btnEl) {
-  if (!btnEl || btnEl.dataset.inflight === '1') return;
-  btnEl.dataset.inflight = '1';
-  btnEl.setAttribute('aria-busy', 'true');
+function toggleLike(recipeId, btnEl) {
+  queueAction(recipeId, 'like', btnEl);
+}
 
-  try {
-    const res = await fetch(`/api/recipes/${encodeURIComponent(recipeId)}/bookmark`, {
+function toggleBookmark(recipeId, btnEl) {
+  queueAction(recipeId, 'bookmark', btnEl);
+}
+
+// back online: retry now instead of waiting out the backoff
+window.addEventListener('online', () => {
+  if (pendingOps.size === 0) return;
+  syncFailures = 0;
+  scheduleSync(0);
+});
+
+window.addEventListener('pagehide', () => {
+  while (pendingOps.size > 0) {
+    // keepalive lets the request outlive the page
+    fetch('/api/recipes/actions/batch', {
       method: 'POST',
       credentials: 'same-origin',
-      headers: { 'X-Requested-With': 'XMLHttpRequest' },
-    });
-    if (!res.ok) {
-      console.warn('Bookmark request failed', res.status);
-      return;
-    }
-    const j = await res.json();
-    if (j.status === 'bookmarked') setBtnState(btnEl, true);
-    else setBtnState(btnEl, false);
-  } catch (err) {
-    console.error('toggleBookmark error', err);
-  } finally {
-    delete btnEl.dataset.inflight;
-    btnEl.removeAttribute('aria-busy');
+      keepalive: true,
+      headers: { 'X-Requested-With': 'XMLHttpRequest', 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ops: takeBatch() }),
+    }).catch(() => {});
   }
-}
+});
 
 async function fetchActionState(recipeId) {
   try {
@@ -1,21 +1,38 @@
 """
-Centralized Jinja2Templates instance and configuration.
+The one Jinja2Templates instance for server-rendered pages.
 
-Use this module to import `templates` everywhere (avoid multiple
-Jinja2Templates creations & circular imports).
+Use `get_templates()` everywhere (frontend routes, snapshot builder, benches).
+It is created on first use rather than at import, so workers started with
+FRONTEND_ENABLED=false never load Jinja. The app lifespan calls
+`init_templates()` to create it and compile the templates before the first
+request is served. TEMPLATES_AUTO_RELOAD=true re-reads changed files
+on every render (development only).
 """
+import functools
+import os
 from pathlib import Path
-from fastapi.templating import Jinja2Templates
-from jinja2 import FileSystemLoader
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES_DIR = BASE_DIR / "templates"
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
 
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-try:
-    templates.env.auto_reload = True
-    templates.env.loader = FileSystemLoader(str(TEMPLATES_DIR))
-    templates.env.cache = {}
-except Exception:
-    pass
+@functools.lru_cache(maxsize=None)
+def get_templates():
+    from fastapi.templating import Jinja2Templates
+    from app.utils import fragment_cache, images
+
+    templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    templates.env.auto_reload = TEMPLATES_AUTO_RELOAD
+    fragment_cache.register(templates.env)
+    images.register(templates.env)
+    return templates
+
+
+def init_templates() -> int:
+    """Create the environment and compile every template (includes are only loaded at render time); returns the count."""
+    env = get_templates().env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -0,0 +1,247 @@
+"""
+Admission control for expensive endpoints.
+
+Requests are sorted into route classes by method and path. Each limited
+class has its own concurrency limit and a bounded FIFO wait queue:
+
+    search   search_simple / search_text / search_by_set and the /search page
+    export   NDJSON exports (a slot is held until the stream finishes)
+
+Anything else (recipe detail, catalog, static files) is not limited, so a
+burst of searches cannot take every pooled DB connection away from cheap
+pages. A request that finds the queue full, or waits longer than
+ADMISSION_QUEUE_TIMEOUT, is answered 503 with Retry-After right away.
+
+Like/bookmark endpoints are rate limited per client (anon cookie, else
+client address) with a token bucket instead: ACTION_RATE_PER_SECOND
+sustained, ACTION_RATE_BURST at once, 429 with Retry-After beyond that.
+
+All state is per worker process. `admission_stats()` feeds /api/metrics.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Pattern, Tuple
+from starlette.requests import HTTPConnection
+from app.utils.anon_cookie import load_anon_cookie_val
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_SEARCH_LIMIT = int(os.getenv("ADMISSION_SEARCH_LIMIT", "4"))
+ADMISSION_SEARCH_QUEUE = int(os.getenv("ADMISSION_SEARCH_QUEUE", "16"))
+ADMISSION_EXPORT_LIMIT = int(os.getenv("ADMISSION_EXPORT_LIMIT", "2"))
+ADMISSION_EXPORT_QUEUE = int(os.getenv("ADMISSION_EXPORT_QUEUE", "2"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+ACTION_RATE_PER_SECOND = float(os.getenv("ACTION_RATE_PER_SECOND", "5"))
+ACTION_RATE_BURST = int(os.getenv("ACTION_RATE_BURST", "20"))
+ACTION_RATE_MAX_CLIENTS = int(os.getenv("ACTION_RATE_MAX_CLIENTS", "10000"))
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders; up to `queue_size` waiters, each for at most `timeout` seconds."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.peak_queued = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise Rejected("queue full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.peak_queued = max(self.peak_queued, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as the wait expired: keep it
+                self.admitted += 1
+                return
+            waiter.cancel()
+            self.rejected_timeout += 1
+            raise Rejected("queue timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self) -> None:
+        # hand the slot straight to the oldest live waiter, so newcomers cannot overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets; the least recently seen keys are dropped beyond `max_keys`."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = ACTION_RATE_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """0 when a token was taken, otherwise seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        tokens, last = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+            self.allowed += 1
+        else:
+            wait = (1.0 - tokens) / self.rate if self.rate > 0 else float(ADMISSION_RETRY_AFTER)
+            self.limited += 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+_ROUTE_CLASSES: Tuple[Tuple[str, Optional[str], Pattern], ...] = (
+    ("search", "GET", re.compile(r"^/api/recipes/search_(simple|text|by_set)$")),
+    ("search", "GET", re.compile(r"^/search$")),
+    ("export", "GET", re.compile(r"^/api/export/")),
+)
+_RATE_LIMITED = re.compile(r"^/api/recipes/(\d+/(like|bookmark)|actions/batch)$")
+
+limiters: Dict[str, ConcurrencyLimiter] = {
+    "search": ConcurrencyLimiter("search", ADMISSION_SEARCH_LIMIT, ADMISSION_SEARCH_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+    "export": ConcurrencyLimiter("export", ADMISSION_EXPORT_LIMIT, ADMISSION_EXPORT_QUEUE, ADMISSION_QUEUE_TIMEOUT),
+}
+action_rate = TokenBucketLimiter(ACTION_RATE_PER_SECOND, ACTION_RATE_BURST)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    for name, m, pattern in _ROUTE_CLASSES:
+        if (m is None or m == method) and pattern.match(path):
+            return name
+    return None
+
+
+def client_key(scope) -> str:
+    cookie = HTTPConnection(scope).cookies.get("anon_id")
+    if cookie and load_anon_cookie_val(cookie):
+        return "anon:" + cookie
+    client = scope.get("client")
+    return "addr:" + (client[0] if client else "unknown")
+
+
+def admission_stats() -> Dict[str, Any]:
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "classes": {name: lim.stats() for name, lim in limiters.items()},
+        "actions": action_rate.stats(),
+    }
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware, so a slot is held until the response body (streams included) is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+
+        if method == "POST" and _RATE_LIMITED.match(path):
+            wait = action_rate.take(client_key(scope))
+            if wait:
+                await _reject(send, 429, "Too many actions, slow down", wait)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(method, path)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        limiter = limiters[name]
+        try:
+            await limiter.acquire()
+        except Rejected:
+            await _reject(send, 503, "Server busy, try again shortly", ADMISSION_RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
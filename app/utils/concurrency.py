@@ -0,0 +1,73 @@
+"""
+Run independent read queries of one request concurrently.
+
+    recipes, total = await gather_reads(session, load_page, count_rows)
+
+Each argument is an async callable taking a session. The first one runs on
+the caller's session; the others get their own short-lived sessions on the
+same engine (own pooled connections) and run at the same time, so page latency becomes the
+slowest query instead of the sum. Extra connections are capped process-wide
+by DB_FANOUT_CONCURRENCY: when the cap is reached the remaining callables run
+one after another on the caller's session instead of queueing for the pool.
+DB_FANOUT=false disables fan-out entirely.
+
+Only pass read-only work: the extra sessions are closed without a commit.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+DB_FANOUT = os.getenv("DB_FANOUT", "true").lower() in ("1", "true", "yes")
+DB_FANOUT_CONCURRENCY = int(os.getenv("DB_FANOUT_CONCURRENCY", "8"))
+
+ReadFn = Callable[[AsyncSession], Awaitable[Any]]
+
+_slots = asyncio.Semaphore(DB_FANOUT_CONCURRENCY)
+
+
+async def _on_own_session(fn: ReadFn, sessionmaker: async_sessionmaker) -> Any:
+    try:
+        async with sessionmaker() as session:
+            return await fn(session)
+    finally:
+        _slots.release()
+
+
+async def gather_reads(
+    session: AsyncSession,
+    *fns: ReadFn,
+    sessionmaker: Optional[async_sessionmaker] = None,
+    enabled: Optional[bool] = None,
+) -> List[Any]:
+    """Results in argument order; the first exception cancels the rest and is re-raised."""
+    if not fns:
+        return []
+    enabled = DB_FANOUT if enabled is None else enabled
+    if sessionmaker is None:
+        sessionmaker = async_sessionmaker(bind=session.bind, class_=type(session), expire_on_commit=False)
+
+    tasks: List[Optional[asyncio.Task]] = [None]
+    if enabled:
+        for fn in fns[1:]:
+            if _slots.locked():
+                break
+            await _slots.acquire()
+            tasks.append(asyncio.ensure_future(_on_own_session(fn, sessionmaker)))
+    serial = fns[len(tasks):]
+
+    results: List[Any] = [None] * len(fns)
+    try:
+        results[0] = await fns[0](session)
+        for k, fn in enumerate(serial, len(tasks)):
+            results[k] = await fn(session)
+        for k in range(1, len(tasks)):
+            results[k] = await tasks[k]
+    except BaseException:
+        started = tasks[1:]
+        for t in started:
+            t.cancel()
+        # retrieve every outcome so no task exception goes unobserved
+        await asyncio.gather(*started, return_exceptions=True)
+        raise
+    return results
@@ -0,0 +1,83 @@
+"""
+Search facets over prep time and servings.
+
+`FacetFilter` holds the optional bounds a search is narrowed by; `FacetCounts`
+collects bucket counts over the matched (and filtered) recipes. Both search
+paths fill the counts in the same pass that ranks: the SQL matchers
+(app/services/ingredient_sets.py) as window aggregates of the match
+statement, the index file (app/utils/index_file.py) while scoring.
+
+Prep buckets are cumulative ("under 15 min", "under 30 min", ...); servings
+buckets are disjoint ranges. Recipes without a value only count in `total`.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+PREP_BUCKETS: Tuple[int, ...] = (15, 30, 60)
+SERVINGS_BUCKETS: Tuple[Tuple[int, Optional[int]], ...] = ((1, 2), (3, 4), (5, 6), (7, None))
+
+
+def servings_label(lo: int, hi: Optional[int]) -> str:
+    return f"{lo}+" if hi is None else f"{lo}-{hi}"
+
+
+@dataclass
+class FacetFilter:
+    max_prep_minutes: Optional[int] = None
+    min_servings: Optional[int] = None
+    max_servings: Optional[int] = None
+
+    def __bool__(self) -> bool:
+        return any(v is not None for v in (self.max_prep_minutes, self.min_servings, self.max_servings))
+
+    def matches(self, prep_minutes: Optional[int], servings: Optional[int]) -> bool:
+        # a bound excludes recipes without a value for it
+        if self.max_prep_minutes is not None and (prep_minutes is None or prep_minutes > self.max_prep_minutes):
+            return False
+        if self.min_servings is not None and (servings is None or servings < self.min_servings):
+            return False
+        if self.max_servings is not None and (servings is None or servings > self.max_servings):
+            return False
+        return True
+
+
+@dataclass
+class FacetCounts:
+    total: int = 0
+    prep: List[int] = field(default_factory=lambda: [0] * len(PREP_BUCKETS))
+    servings: List[int] = field(default_factory=lambda: [0] * len(SERVINGS_BUCKETS))
+
+    def add(self, prep_minutes: Optional[int], servings: Optional[int]) -> None:
+        self.total += 1
+        if prep_minutes is not None:
+            for k, limit in enumerate(PREP_BUCKETS):
+                if prep_minutes <= limit:
+                    self.prep[k] += 1
+        if servings is not None:
+            for k, (lo, hi) in enumerate(SERVINGS_BUCKETS):
+                if servings >= lo and (hi is None or servings <= hi):
+                    self.servings[k] += 1
+                    break
+
+    def set_from_row(self, values) -> None:
+        """Take counts from the window columns of a match row, in `bucket_names()` order."""
+        values = [int(v or 0) for v in values]
+        self.total = values[0]
+        self.prep = values[1:1 + len(PREP_BUCKETS)]
+        self.servings = values[1 + len(PREP_BUCKETS):]
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "prep_minutes": [{"max": limit, "count": n} for limit, n in zip(PREP_BUCKETS, self.prep)],
+            "servings": [
+                {"label": servings_label(lo, hi), "min": lo, "max": hi, "count": n}
+                for (lo, hi), n in zip(SERVINGS_BUCKETS, self.servings)
+            ],
+        }
+
+
+def bucket_names() -> List[str]:
+    """Column names of the facet window aggregates, total first."""
+    return (["facet_total"] + [f"facet_prep_{limit}" for limit in PREP_BUCKETS]
+            + [f"facet_servings_{k}" for k in range(len(SERVINGS_BUCKETS))])
@@ -0,0 +1,106 @@
+"""
+Cache of rendered per-recipe HTML fragments (cards, carousel slides, detail bodies).
+
+Templates call the `fragment` Jinja global instead of a macro directly:
+
+    {{ fragment("includes/receipt_detail.html", "recipe_card", r) }}
+
+The key is (template, macro, recipe id, version, base URL). The version is a
+digest of the values the fragment is rendered from, so an edited recipe, or a
+card with a different search score, simply misses and the stale entry ages
+out. Entries are evicted least-recently-used once FRAGMENT_CACHE_MAX_BYTES
+(UTF-8 size of the cached HTML) is exceeded. Per worker, in memory.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+from markupsafe import Markup
+
+FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+FRAGMENT_CACHE_MAX_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+class FragmentCache:
+    def __init__(self, max_bytes: int = FRAGMENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        hit = self._entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return hit[0]
+
+    def put(self, key: Hashable, html: str) -> None:
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (html, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+fragment_cache = FragmentCache()
+
+
+def content_version(r: Any) -> str:
+    """Digest of the data a fragment is rendered from."""
+    items = r.items() if isinstance(r, dict) else vars(r).items()
+    raw = repr(sorted((k, v) for k, v in items if not k.startswith("_")))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def cached_fragment(ctx, template_name: str, macro_name: str, r: Any) -> Markup:
+    request = ctx.get("request")
+    module_ctx = {"request": request} if request is not None else {}
+
+    def render() -> str:
+        module = ctx.environment.get_template(template_name).make_module(module_ctx)
+        return str(getattr(module, macro_name)(r))
+
+    if not FRAGMENT_CACHE_ENABLED:
+        return Markup(render())
+    rid = r["id"] if isinstance(r, dict) else getattr(r, "id", None)
+    base = str(request.base_url) if request is not None else ""
+    key = (template_name, macro_name, rid, content_version(r), base)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = render()
+        fragment_cache.put(key, html)
+    return Markup(html)
+
+
+def register(env) -> None:
+    """Expose `fragment(...)` to templates rendered by `env`."""
+    # jinja2 is imported here, not at module level: /api/metrics reads the stats on JSON-only workers too
+    from jinja2 import pass_context
+
+    env.globals["fragment"] = pass_context(cached_fragment)
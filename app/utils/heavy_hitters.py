@@ -0,0 +1,73 @@
+"""
+Space-Saving heavy-hitters sketch (Metwally et al.) over a stream of hashable keys.
+
+Keeps at most `capacity` counters. A key that is already tracked is
+incremented; a new key takes over a counter with the smallest count and
+inherits it as its possible overestimate (`error`). Every key seen more than
+N / capacity times is guaranteed to be tracked, and its count is off by at
+most its error. Counters live in buckets by count, so `offer()` is O(1).
+"""
+from typing import Dict, Hashable, List, Set, Tuple
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._min = 0
+        self.offered = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _move(self, key: Hashable, old: int, new: int) -> None:
+        if old:
+            bucket = self._buckets[old]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[old]
+                if old == self._min:
+                    self._min = new
+        self._buckets.setdefault(new, set()).add(key)
+        self._counts[key] = new
+
+    def offer(self, key: Hashable) -> None:
+        self.offered += 1
+        count = self._counts.get(key)
+        if count is not None:
+            self._move(key, count, count + 1)
+            return
+        if len(self._counts) < self.capacity:
+            self._errors[key] = 0
+            self._move(key, 0, 1)
+            self._min = 1
+            return
+        floor = self._min
+        victim = next(iter(self._buckets[floor]))
+        self._buckets[floor].discard(victim)
+        del self._counts[victim]
+        del self._errors[victim]
+        # the bucket is restored below if it still holds other keys
+        self._buckets[floor].add(key)
+        self._counts[key] = floor
+        self._errors[key] = floor
+        self._move(key, floor, floor + 1)
+
+    def top(self, n: int = 10) -> List[Tuple[Hashable, int, int]]:
+        """(key, count, error) for the `n` largest counters, largest first."""
+        items = sorted(self._counts.items(), key=lambda kv: -kv[1])[:n]
+        return [(k, c, self._errors[k]) for k, c in items]
+
+    def drain(self) -> List[Tuple[Hashable, int, int]]:
+        """All counters as (key, count, error), then reset the sketch."""
+        out = [(k, c, self._errors[k]) for k, c in self._counts.items()]
+        self._counts.clear()
+        self._errors.clear()
+        self._buckets.clear()
+        self._min = 0
+        self.offered = 0
+        return out
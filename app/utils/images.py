@@ -0,0 +1,156 @@
+"""
+Resized recipe images: content-addressed rendition cache and template helper.
+
+`make_renditions()` turns a source image into WebP and JPEG files at
+IMAGE_WIDTHS (never upscaled). `ImageStore` keeps them under IMAGE_CACHE_DIR
+as <digest[:2]>/<digest>/<width>.<webp|jpg>, where digest is a hash of the
+source bytes, so a source shared by several recipes, or ingested twice, is
+rendered once. Files never change under their name and are served with an
+immutable Cache-Control by app/api/images.py at IMAGE_BASE_URL.
+
+The recipe's `image_meta["renditions"]` records what exists (written by
+app/services/images.py):
+
+    {"digest": ..., "source_url": ..., "width": ..., "height": ...,
+     "widths": [320, 640], "formats": ["webp", "jpeg"]}
+
+Templates call the `picture(r, fallback, ...)` Jinja global, which renders a
+<picture> with WebP and JPEG srcsets when renditions exist and a plain <img>
+otherwise. Pillow is the optional "images" extra; only rendering needs it.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from markupsafe import Markup, escape
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "var/images")
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/images").rstrip("/")
+IMAGE_WIDTHS: Tuple[int, ...] = tuple(int(w) for w in os.getenv("IMAGE_WIDTHS", "320,640,1280").split(",") if w.strip())
+# rendition used as `thumbnail_url` (largest available width not above it)
+IMAGE_THUMB_WIDTH = int(os.getenv("IMAGE_THUMB_WIDTH", "640"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+FORMATS = ("webp", "jpeg")
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+_digest_re = re.compile(r"^[0-9a-f]{32}$")
+_name_re = re.compile(r"^([0-9]{1,5})\.(webp|jpg)$")
+
+
+def source_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def make_renditions(data: bytes, widths: Sequence[int] = IMAGE_WIDTHS, quality: int = IMAGE_QUALITY) -> Tuple[Tuple[int, int], Dict[Tuple[int, str], bytes]]:
+    """((source width, height), {(width, format): encoded bytes}). Widths above the source are dropped, not upscaled."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as exc:  # optional "images" extra
+        raise RuntimeError("image renditions need Pillow (install the 'images' extra)") from exc
+
+    with Image.open(io.BytesIO(data)) as opened:
+        img = ImageOps.exif_transpose(opened)
+        if img.mode != "RGB":
+            # JPEG has no alpha: flatten transparent sources onto white
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        src_w, src_h = img.size
+        targets = sorted({w for w in widths if w <= src_w}) or [src_w]
+        out: Dict[Tuple[int, str], bytes] = {}
+        for w in targets:
+            h = max(1, round(src_h * w / src_w))
+            resized = img if w == src_w else img.resize((w, h), Image.Resampling.LANCZOS)
+            for fmt in FORMATS:
+                buf = io.BytesIO()
+                if fmt == "webp":
+                    resized.save(buf, "WEBP", quality=quality, method=4)
+                else:
+                    resized.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+                out[(w, fmt)] = buf.getvalue()
+    return (src_w, src_h), out
+
+
+class ImageStore:
+    def __init__(self, root: str = IMAGE_CACHE_DIR):
+        self.root = root
+
+    def path(self, digest: str, width: int, fmt: str) -> str:
+        return os.path.join(self.root, digest[:2], digest, f"{width}.{EXTENSIONS[fmt]}")
+
+    def has_all(self, digest: str, widths: Sequence[int], formats: Sequence[str] = FORMATS) -> bool:
+        return all(os.path.isfile(self.path(digest, w, f)) for w in widths for f in formats)
+
+    def write(self, digest: str, width: int, fmt: str, data: bytes) -> None:
+        path = self.path(digest, width, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def file_for(self, digest: str, name: str) -> Optional[Tuple[str, str]]:
+        """(path, media type) for a request path segment pair, or None when invalid or missing."""
+        m = _name_re.match(name)
+        if not m or not _digest_re.match(digest):
+            return None
+        path = os.path.join(self.root, digest[:2], digest, name)
+        if not os.path.isfile(path):
+            return None
+        return path, MEDIA_TYPES[m.group(2)]
+
+
+image_store = ImageStore()
+
+
+def rendition_url(digest: str, width: int, fmt: str) -> str:
+    return f"{IMAGE_BASE_URL}/{digest}/{width}.{EXTENSIONS[fmt]}"
+
+
+def renditions_of(r: Any) -> Optional[Dict]:
+    """The renditions record of a recipe dict/object, or None."""
+    meta = r.get("image_meta") if isinstance(r, dict) else getattr(r, "image_meta", None)
+    if isinstance(meta, str):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            return None
+    rend = meta.get("renditions") if isinstance(meta, dict) else None
+    return rend if rend and rend.get("digest") and rend.get("widths") else None
+
+
+def thumbnail_width(widths: List[int], target: int = IMAGE_THUMB_WIDTH) -> int:
+    fitting = [w for w in widths if w <= target]
+    return max(fitting) if fitting else min(widths)
+
+
+def srcset(rend: Dict, fmt: str) -> str:
+    return ", ".join(f"{rendition_url(rend['digest'], w, fmt)} {w}w" for w in rend["widths"])
+
+
+def picture(r: Any, fallback: str, alt: str = "", sizes: str = "100vw", **attrs) -> Markup:
+    """<picture> with WebP/JPEG srcsets for `r`'s renditions, or <img src=fallback>. `class_=` sets class."""
+    extra = "".join(f' {k.rstrip("_").replace("_", "-")}="{escape(v)}"' for k, v in attrs.items() if v is not None)
+    rend = renditions_of(r)
+    if rend is None:
+        return Markup(f'<img src="{escape(fallback)}" alt="{escape(alt)}"{extra}>')
+    src = rendition_url(rend["digest"], thumbnail_width(rend["widths"]), "jpeg")
+    return Markup(
+        f'<picture>'
+        f'<source type="image/webp" srcset="{escape(srcset(rend, "webp"))}" sizes="{escape(sizes)}">'
+        f'<img src="{escape(src)}" srcset="{escape(srcset(rend, "jpeg"))}" sizes="{escape(sizes)}" alt="{escape(alt)}"{extra}>'
+        f'</picture>'
+    )
+
+
+def register(env) -> None:
+    """Expose `picture(...)` to templates rendered by `env`."""
+    env.globals["picture"] = picture
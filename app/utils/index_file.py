@@ -0,0 +1,334 @@
+"""
+Compact, versioned, memory-mapped search index file.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header   magic "W2CIDX01", format version, section count, generation, built_at
+    table    (offset, length) per section
+    sections ing_ids          u32[n]    ingredient ids, ordered by key
+             name_offsets     u32[n+1]  into names
+             names            utf-8     canonical names, concatenated
+             key_offsets      u32[n+1]  into keys
+             keys             utf-8     normalize_name() keys (ingredients.name_norm), sorted
+             post_indptr      u32[n+1]  CSR: ingredient slot -> recipe slots
+             post_recipes     u32[nnz]
+             recipe_ids       u32[m]    sorted
+             recipe_total     u32[m]    number of ingredients per recipe
+             recipe_order     u32[m]    position of the recipe when sorted by title
+             recipe_prep      u32[m]    prep_minutes, NULL_U32 when unknown
+             recipe_servings  u32[m]    servings, NULL_U32 when unknown
+
+Readers mmap the file and read the arrays through memoryview casts, so every
+worker shares one copy through the page cache and opening is O(1). Writers
+build a new generation next to the file and os.replace() it in; readers that
+notice the new inode reopen, and mappings of the old file stay valid until
+dropped.
+"""
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.utils.facets import FacetCounts, FacetFilter
+from app.utils.normalize import normalize_name
+
+MAGIC = b"W2CIDX01"
+FORMAT_VERSION = 3
+NULL_U32 = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<8sIIQd")
+_SECTION = struct.Struct("<QQ")
+_SECTIONS = (
+    "ing_ids", "name_offsets", "names", "key_offsets", "keys",
+    "post_indptr", "post_recipes", "recipe_ids", "recipe_total", "recipe_order",
+    "recipe_prep", "recipe_servings",
+)
+_BLOBS = {"names", "keys"}
+_ALIGN = 8
+
+# same values as app.services.ingredient_sets
+MODE_ANY = "any"
+MODE_SUBSET = "subset"
+MODE_MISSING = "missing"
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+def _u32(values: Iterable[int]) -> bytes:
+    arr = array("I", values)
+    if sys.byteorder != "little":  # pragma: no cover
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_index(
+    path: str,
+    ingredients: Sequence[Tuple[int, str, str]],
+    recipes: Sequence[Tuple[int, str, Optional[int], Optional[int]]],
+    pairs: Iterable[Tuple[int, int]],
+    generation: Optional[int] = None,
+) -> int:
+    """
+    Write a new index generation to `path` atomically.
+
+    ingredients: (id, name, key) with key = normalize_name(name); recipes: (id, title, prep_minutes, servings);
+    pairs: (recipe_id, ingredient_id).
+    Returns the generation number written (previous generation + 1 by default).
+    """
+    if generation is None:
+        generation = 1
+        try:
+            generation = read_header(path)[0] + 1
+        except (OSError, IndexFormatError):
+            pass
+
+    ings = sorted(ingredients, key=lambda x: (x[2], x[0]))
+    slot = {iid: k for k, (iid, _, _) in enumerate(ings)}
+    recipe_ids = sorted(r[0] for r in recipes)
+    rslot = {rid: k for k, rid in enumerate(recipe_ids)}
+    by_title = sorted(recipes, key=lambda x: (x[1] or "", x[0]))
+    order = [0] * len(recipe_ids)
+    prep = [NULL_U32] * len(recipe_ids)
+    servings = [NULL_U32] * len(recipe_ids)
+    for pos, (rid, _, prep_minutes, serves) in enumerate(by_title):
+        order[rslot[rid]] = pos
+        if prep_minutes is not None and 0 <= prep_minutes < NULL_U32:
+            prep[rslot[rid]] = prep_minutes
+        if serves is not None and 0 <= serves < NULL_U32:
+            servings[rslot[rid]] = serves
+
+    postings: List[List[int]] = [[] for _ in ings]
+    total = [0] * len(recipe_ids)
+    for rid, iid in set(pairs):
+        if rid in rslot and iid in slot:
+            postings[slot[iid]].append(rslot[rid])
+            total[rslot[rid]] += 1
+    indptr = [0]
+    flat: List[int] = []
+    for plist in postings:
+        plist.sort()
+        flat.extend(plist)
+        indptr.append(len(flat))
+
+    def blob(strings):
+        offsets, parts, pos = [0], [], 0
+        for s in strings:
+            b = s.encode("utf-8")
+            parts.append(b)
+            pos += len(b)
+            offsets.append(pos)
+        return _u32(offsets), b"".join(parts)
+
+    name_offsets, names = blob(name for _, name, _ in ings)
+    key_offsets, keys = blob(key for _, _, key in ings)
+
+    payload = {
+        "ing_ids": _u32(iid for iid, _, _ in ings),
+        "name_offsets": name_offsets,
+        "names": names,
+        "key_offsets": key_offsets,
+        "keys": keys,
+        "post_indptr": _u32(indptr),
+        "post_recipes": _u32(flat),
+        "recipe_ids": _u32(recipe_ids),
+        "recipe_total": _u32(total),
+        "recipe_order": _u32(order),
+        "recipe_prep": _u32(prep),
+        "recipe_servings": _u32(servings),
+    }
+
+    pos = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    table, chunks = [], []
+    for name in _SECTIONS:
+        pad = -pos % _ALIGN
+        chunks.append(b"\0" * pad)
+        pos += pad
+        data = payload[name]
+        table.append(_SECTION.pack(pos, len(data)))
+        chunks.append(data)
+        pos += len(data)
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(_SECTIONS), generation, time.time())
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp, "wb") as fh:
+            fh.write(header)
+            fh.writelines(table)
+            fh.writelines(chunks)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return generation
+
+
+def read_header(path: str) -> Tuple[int, float]:
+    """(generation, built_at) of the index file at `path`."""
+    with open(path, "rb") as fh:
+        raw = fh.read(_HEADER.size)
+    return _parse_header(raw)
+
+
+def _parse_header(raw: bytes) -> Tuple[int, float]:
+    if len(raw) < _HEADER.size:
+        raise IndexFormatError("truncated index header")
+    magic, version, count, generation, built_at = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise IndexFormatError("not a search index file")
+    if version != FORMAT_VERSION or count != len(_SECTIONS):
+        raise IndexFormatError(f"unsupported index format {version}")
+    return generation, built_at
+
+
+class IndexFile:
+    """Read-only view over one index generation."""
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":  # pragma: no cover
+            raise IndexFormatError("memory-mapped index requires a little-endian host")
+        with open(path, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.generation, self.built_at = _parse_header(self._mm[:_HEADER.size])
+
+        view = memoryview(self._mm)
+        self._sections: Dict[str, memoryview] = {}
+        for k, name in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(self._mm, _HEADER.size + k * _SECTION.size)
+            if offset + length > len(self._mm):
+                raise IndexFormatError(f"section {name} out of bounds")
+            sec = view[offset:offset + length]
+            self._sections[name] = sec if name in _BLOBS else sec.cast("I")
+
+        s = self._sections
+        self.ing_ids = s["ing_ids"]
+        self._name_off = s["name_offsets"]
+        self._key_off = s["key_offsets"]
+        self._indptr = s["post_indptr"]
+        self._post = s["post_recipes"]
+        self.recipe_ids = s["recipe_ids"]
+        self._total = s["recipe_total"]
+        self._order = s["recipe_order"]
+        self._prep = s["recipe_prep"]
+        self._servings = s["recipe_servings"]
+
+    def __len__(self) -> int:
+        return len(self.ing_ids)
+
+    @property
+    def recipe_count(self) -> int:
+        return len(self.recipe_ids)
+
+    def name(self, slot: int) -> str:
+        return bytes(self._sections["names"][self._name_off[slot]:self._name_off[slot + 1]]).decode("utf-8")
+
+    def _key(self, slot: int) -> bytes:
+        return bytes(self._sections["keys"][self._key_off[slot]:self._key_off[slot + 1]])
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find_exact(self, key: str) -> List[int]:
+        """Slots whose normalized key equals `key`."""
+        raw = key.encode("utf-8")
+        k = self._lower_bound(raw)
+        return [k] if k < len(self) and self._key(k) == raw else []
+
+    def find_prefix(self, prefix: str, limit: int = 5) -> List[int]:
+        """Slots whose normalized key starts with `prefix`, in key order."""
+        raw = prefix.encode("utf-8")
+        if not raw:
+            return []
+        out: List[int] = []
+        k = self._lower_bound(raw)
+        while k < len(self) and len(out) < limit and self._key(k).startswith(raw):
+            out.append(k)
+            k += 1
+        return out
+
+    def slots_for_names(self, names: Iterable[str]) -> List[int]:
+        """Slots of ingredients whose canonical name is exactly one of `names`."""
+        out = []
+        for name in dict.fromkeys(names):
+            out.extend(s for s in self.find_exact(normalize_name(name)) if self.name(s) == name)
+        return out
+
+    def _recipe_slot(self, recipe_id: int) -> Optional[int]:
+        k = bisect.bisect_left(self.recipe_ids, recipe_id)
+        if k < len(self.recipe_ids) and self.recipe_ids[k] == recipe_id:
+            return k
+        return None
+
+    def match(
+        self,
+        slots: Iterable[int],
+        mode: str = MODE_ANY,
+        max_missing: int = 0,
+        limit: Optional[int] = 100,
+        restrict_to: Optional[Iterable[int]] = None,
+        filters: Optional[FacetFilter] = None,
+        facets: Optional[FacetCounts] = None,
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Same contract as app.services.ingredient_sets.match_ingredient_set:
+        (recipe_id, match_count, total), most matches first, then by title.
+        Facet filters and counts are applied while collecting the matches.
+        """
+        if mode not in (MODE_ANY, MODE_SUBSET, MODE_MISSING):
+            raise ValueError(f"unknown mode {mode!r}")
+        counts: Dict[int, int] = {}
+        for slot in set(slots):
+            for r in self._post[self._indptr[slot]:self._indptr[slot + 1]]:
+                counts[r] = counts.get(r, 0) + 1
+        if restrict_to is not None:
+            allowed = {self._recipe_slot(int(rid)) for rid in restrict_to}
+            counts = {r: c for r, c in counts.items() if r in allowed}
+
+        total = self._total
+        if mode == MODE_SUBSET:
+            keep = [r for r, c in counts.items() if c == total[r]]
+        elif mode == MODE_MISSING:
+            keep = [r for r, c in counts.items() if total[r] - c <= max_missing]
+        else:
+            keep = list(counts)
+        if filters or facets is not None:
+            filtered = []
+            for r in keep:
+                prep = self._prep[r]
+                prep = None if prep == NULL_U32 else prep
+                servings = self._servings[r]
+                servings = None if servings == NULL_U32 else servings
+                if filters and not filters.matches(prep, servings):
+                    continue
+                if facets is not None:
+                    facets.add(prep, servings)
+                filtered.append(r)
+            keep = filtered
+        keep.sort(key=lambda r: (-counts[r], self._order[r]))
+        if limit:
+            keep = keep[:limit]
+        return [(self.recipe_ids[r], counts[r], total[r]) for r in keep]
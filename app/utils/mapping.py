@@ -3,28 +3,25 @@ Utilities for mapping free-text user ingredient inputs to canonical
 Ingredient names from the DB.
 
 Behavior:
-- Normalize user inputs (strip, lowercase, remove extra chars).
-- Try exact case-insensitive match.
-- If no exact match, try ILIKE '%token%' fuzzy search (first token, then full string).
+- Normalize user inputs with app.utils.normalize.normalize_name.
+- Try an exact match on the stored `ingredients.name_norm` key.
+- If no exact match, try a prefix match on the key (full string, then the
+  longest tokens), which is an index range seek.
 - Return a list of unique matching ingredient names (canonical DB names),
   preserving rough order of user inputs (most relevant first).
+
+With SEARCH_INDEX_PATH set the same steps run against the memory-mapped
+index file (app/services/search_index.py) without touching the DB.
 """
 
 import re
 from typing import List, Iterable, Set
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import Ingredient
-
-
-_normalize_re = re.compile(r"[^a-zA-Z0-9\u00C0-\u024F\s-]")
-
-
-def _normalize(s: str) -> str:
-    s2 = s.strip().lower()
-    s2 = _normalize_re.sub("", s2)
-    s2 = re.sub(r"\s+", " ", s2)
-    return s2
+from app.services.search_index import get_search_index
+from app.utils.index_file import IndexFile
+from app.utils.normalize import normalize_name, prefix_match
 
 
 async def map_input_to_ingredient_names(session: AsyncSession, user_inputs: Iterable[str], max_per_input: int = 5) -> List[str]:
@@ -42,13 +39,18 @@ async def map_input_to_ingredient_names(session: AsyncSession, user_inputs: Iter
     seen: Set[str] = set()
 
     inputs = [i for i in (s or "" for s in user_inputs) if i.strip()]
-    normalized_inputs = [_normalize(i) for i in inputs if i.strip()]
+    normalized_inputs = [normalize_name(i) for i in inputs if i.strip()]
+
+    index = get_search_index()
+    if index is not None:
+        return _map_with_index(index, normalized_inputs, max_per_input)
 
+    dialect = session.get_bind().dialect.name
     for raw, norm in zip(inputs, normalized_inputs):
         if not norm:
             continue
 
-        stmt = select(Ingredient.name).where(func.lower(Ingredient.name) == norm)
+        stmt = select(Ingredient.name).where(Ingredient.name_norm == norm)
         res = await session.execute(stmt)
         rows = [r[0] for r in res.fetchall()]
         for name in rows[:max_per_input]:
@@ -58,8 +60,13 @@ async def map_input_to_ingredient_names(session: AsyncSession, user_inputs: Iter
         if rows:
             continue
 
-        ilike_stmt = select(Ingredient.name).where(Ingredient.name.ilike(f"%{norm}%")).limit(max_per_input)
-        res = await session.execute(ilike_stmt)
+        prefix_stmt = (
+            select(Ingredient.name)
+            .where(prefix_match(Ingredient.name_norm, norm, dialect))
+            .order_by(Ingredient.name_norm)
+            .limit(max_per_input)
+        )
+        res = await session.execute(prefix_stmt)
         rows = [r[0] for r in res.fetchall()]
         for name in rows:
             if name not in seen:
@@ -71,7 +78,12 @@ async def map_input_to_ingredient_names(session: AsyncSession, user_inputs: Iter
         tokens = [t for t in re.split(r"\s+", norm) if len(t) > 2]
         tokens = sorted(tokens, key=lambda x: -len(x))
         for tok in tokens:
-            tok_stmt = select(Ingredient.name).where(Ingredient.name.ilike(f"%{tok}%")).limit(max_per_input)
+            tok_stmt = (
+                select(Ingredient.name)
+                .where(prefix_match(Ingredient.name_norm, tok, dialect))
+                .order_by(Ingredient.name_norm)
+                .limit(max_per_input)
+            )
             res = await session.execute(tok_stmt)
             rows = [r[0] for r in res.fetchall()]
             for name in rows:
@@ -82,3 +94,30 @@ async def map_input_to_ingredient_names(session: AsyncSession, user_inputs: Iter
                 break
 
     return out
+
+
+def _map_with_index(index: IndexFile, normalized_inputs: List[str], max_per_input: int) -> List[str]:
+    out: List[str] = []
+    seen: Set[str] = set()
+
+    def take(slots) -> bool:
+        for slot in slots:
+            name = index.name(slot)
+            if name not in seen:
+                out.append(name)
+                seen.add(name)
+        return bool(slots)
+
+    for norm in normalized_inputs:
+        if not norm:
+            continue
+        if take(index.find_exact(norm)[:max_per_input]):
+            continue
+        if take(index.find_prefix(norm, max_per_input)):
+            continue
+        tokens = [t for t in re.split(r"\s+", norm) if len(t) > 2]
+        for tok in sorted(tokens, key=lambda x: -len(x)):
+            if take(index.find_prefix(tok, max_per_input)):
+                break
+
+    return out
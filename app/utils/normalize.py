@@ -1,20 +1,40 @@
 """
 Normalization and fuzzy helpers for ingredient matching.
+
+`normalize_name` is the one canonical key for ingredient names: it is stored
+in `ingredients.name_norm` (unique) and applied to user input before lookups,
+so every lookup is an equality or prefix seek on that column.
 """
+import re
 import unicodedata
-from typing import List
-from rapidfuzz import process, fuzz
 
-def normalize_text(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if ord(c) < 128)
-    return s
+_drop_re = re.compile(r"[^\w\s-]")
+_space_re = re.compile(r"\s+")
+
+
+def normalize_name(s: str) -> str:
+    """'  Crème  Fraîche! ' -> 'creme fraiche'. Accents are stripped, other scripts are kept."""
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).casefold()
+    s = _drop_re.sub("", s).replace("_", " ")
+    return _space_re.sub(" ", s).strip()
+
+
+def prefix_match(column, prefix: str, dialect_name: str):
+    """
+    `column` starts with `prefix`, written so the index on `column` is used:
+    LIKE 'x%' on PostgreSQL (text_pattern_ops index), a half-open range on
+    other dialects (SQLite only uses an index for LIKE with case_sensitive_like).
+    """
+    if dialect_name == "postgresql":
+        return column.startswith(prefix, autoescape=True)
+    return (column >= prefix) & (column < prefix + "\U0010ffff")
 
-def normalize_list(items: List[str]) -> List[str]:
-    return [normalize_text(i) for i in items if i and i.strip()]
 
 def fuzzy_best_match(name: str, choices: list[str], score_cutoff: int = 80):
+    # imported lazily: models import this module for normalize_name
+    from rapidfuzz import process, fuzz
+
     if not choices:
         return None, 0
     match, score, _ = process.extractOne(name, choices, scorer=fuzz.QRatio) or (None, 0, None)
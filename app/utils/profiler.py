@@ -0,0 +1,141 @@
+"""
+Dev-mode slow request profiler.
+
+Enabled with SLOW_REQUEST_PROFILER=1. Every request is sampled (stack of the
+event loop thread every PROFILE_INTERVAL_MS) and its SQL statements are
+recorded; requests slower than SLOW_REQUEST_MS get a report written to
+PROFILE_DIR with collapsed stacks (flamegraph.pl / speedscope compatible)
+followed by the ordered SQL statements and their timings.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from app.utils.query_budget import record_queries
+
+logger = logging.getLogger(__name__)
+
+PROFILER_ENABLED = os.getenv("SLOW_REQUEST_PROFILER", "false").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "./profiles"))
+
+_unsafe_re = re.compile(r"[^a-zA-Z0-9_.-]+")
+
+
+class _StackSampler:
+    """
+    One background thread shared by all in-flight requests. It only runs while
+    at least one request is being profiled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: List[Counter] = []
+        self._thread: Optional[threading.Thread] = None
+        self._target_ident: Optional[int] = None
+
+    def start(self) -> Counter:
+        samples: Counter = Counter()
+        with self._lock:
+            self._target_ident = threading.get_ident()
+            self._active.append(samples)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="w2c-profiler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, samples: Counter) -> None:
+        with self._lock:
+            try:
+                self._active.remove(samples)
+            except ValueError:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                frame = sys._current_frames().get(self._target_ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                for samples in self._active:
+                    samples[key] += 1
+
+
+_sampler = _StackSampler(PROFILE_INTERVAL_MS / 1000.0)
+
+
+def _write_report(method: str, path: str, status: int, duration_ms: float, samples: Counter, log) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{_unsafe_re.sub('_', path.strip('/')) or 'root'}.txt"
+    out = PROFILE_DIR / name
+    lines = [
+        f"# {method} {path} -> {status} in {duration_ms:.1f} ms",
+        f"# {sum(samples.values())} samples every {PROFILE_INTERVAL_MS:g} ms, "
+        f"{log.count} SQL statements ({log.total_ms:.1f} ms)",
+        "",
+        "## collapsed stacks",
+    ]
+    lines.extend(f"{stack} {count}" for stack, count in samples.most_common())
+    lines.extend(["", "## sql"])
+    lines.append(log.format())
+    out.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return out
+
+
+class SlowRequestProfilerMiddleware:
+    """
+    Pure ASGI middleware, so SQL executed by the endpoint runs in the same
+    context as the recorder.
+    """
+
+    def __init__(self, app, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path", "").startswith(("/static", "/images")):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        samples = _sampler.start()
+        started = time.perf_counter()
+        try:
+            with record_queries() as log:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _sampler.stop(samples)
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            if duration_ms >= self.threshold_ms:
+                try:
+                    out = _write_report(scope["method"], scope["path"], status["code"], duration_ms, samples, log)
+                    logger.warning(
+                        "Slow request %s %s: %.1f ms, %d SQL statements; profile written to %s",
+                        scope["method"], scope["path"], duration_ms, log.count, out,
+                    )
+                except Exception:
+                    logger.exception("Failed to write slow request profile")
@@ -0,0 +1,16 @@
+"""
+pytest plugin for query budgets (app/utils/query_budget.py).
+
+Load it with `pytest_plugins = ["app.utils.pytest_query_budget"]` to get the
+`query_budget` fixture. Kept out of query_budget.py, which the slow-request
+profiler imports at startup: pytest must not load in production workers.
+"""
+import pytest
+
+from app.utils.query_budget import query_budget
+
+
+@pytest.fixture(name="query_budget")
+def _query_budget_fixture():
+    """Fixture returning the `query_budget` context manager."""
+    return query_budget
@@ -0,0 +1,126 @@
+"""
+SQL statement recording and query budgets.
+
+`record_queries()` collects every statement executed by the app engine inside
+the block (in the current asyncio task), with timings. `query_budget()` builds
+on it and fails when a block runs more statements than allowed, e.g.:
+
+    with query_budget(2, per_item=0, items=len(names)):
+        await search_recipes(session, names)
+
+For pytest, load app/utils/pytest_query_budget.py as a plugin
+(`pytest_plugins = ["app.utils.pytest_query_budget"]`) to get the
+`query_budget` fixture.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db import _engine, _write_engine
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    duration_ms: float
+    executemany: bool = False
+
+
+@dataclass
+class QueryLog:
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(q.duration_ms for q in self.queries)
+
+    def format(self) -> str:
+        lines = []
+        for i, q in enumerate(self.queries, 1):
+            stmt = " ".join(q.statement.split())
+            lines.append(f"{i:3d}. {q.duration_ms:8.2f} ms  {stmt}")
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, limit: int, log: QueryLog):
+        self.limit = limit
+        self.log = log
+        super().__init__(f"query budget exceeded: {log.count} statements executed, limit is {limit}\n{log.format()}")
+
+
+_current_logs: ContextVar[Optional[tuple]] = ContextVar("w2c_query_logs", default=None)
+_installed: set = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_logs.get() is None:
+        return
+    conn.info.setdefault("w2c_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _current_logs.get()
+    if logs is None:
+        return
+    starts = conn.info.get("w2c_query_start")
+    started = starts.pop() if starts else time.perf_counter()
+    rec = QueryRecord(statement=statement, duration_ms=(time.perf_counter() - started) * 1000.0, executemany=executemany)
+    for log in logs:
+        log.queries.append(rec)
+
+
+def install(engine: Optional[Engine] = None) -> None:
+    """
+    Attach the recording listeners to a (sync) engine. Idempotent; listeners are
+    no-ops while nothing is recording.
+    """
+    if engine is None:
+        # the SQLite production profile sends writes through a second engine
+        for default in {_engine.sync_engine, _write_engine.sync_engine}:
+            install(default)
+        return
+    if id(engine) in _installed:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _installed.add(id(engine))
+
+
+@contextmanager
+def record_queries(engine: Optional[Engine] = None) -> Iterator[QueryLog]:
+    """
+    Record statements executed in the current context. Blocks may be nested;
+    each one sees the statements executed inside it.
+    """
+    install(engine)
+    log = QueryLog()
+    parent = _current_logs.get() or ()
+    token = _current_logs.set(parent + (log,))
+    try:
+        yield log
+    finally:
+        _current_logs.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, *, per_item: int = 0, items: int = 0, engine: Optional[Engine] = None) -> Iterator[QueryLog]:
+    """
+    Fail with QueryBudgetExceeded if the block executes more than
+    `max_queries + per_item * items` statements. Use `per_item` to express
+    how the budget may grow with input size (0 means constant, i.e. no N+1).
+    """
+    limit = int(max_queries) + int(per_item) * int(items)
+    with record_queries(engine) as log:
+        yield log
+    if log.count > limit:
+        raise QueryBudgetExceeded(limit, log)
+
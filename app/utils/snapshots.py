@@ -0,0 +1,82 @@
+"""
+Static HTML snapshots of recipe detail and catalog pages (SNAPSHOT_DIR).
+
+Pages are pre-rendered by app/frontend/snapshots.py (scripts/build_snapshots.py)
+into SNAPSHOT_DIR/recipes/<id>.html and SNAPSHOT_DIR/catalog/<page>.html. The
+routes call `serve_snapshot()` first and only fall back to the database and
+Jinja when no file exists. Per-user state (likes, bookmarks) is filled in by
+actions.js either way.
+
+Templates build absolute URLs from the request, so snapshots are rendered for
+SNAPSHOT_BASE_URL and only served to requests with that base URL.
+"""
+import json
+import os
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import FileResponse
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+SNAPSHOT_BASE_URL = os.getenv("SNAPSHOT_BASE_URL", "http://localhost:8000").rstrip("/") + "/"
+
+KINDS = ("recipes", "catalog")
+MANIFEST = "manifest.json"
+
+
+class SnapshotStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, kind: str, key) -> str:
+        return os.path.join(self.root, kind, f"{key}.html")
+
+    def exists(self, kind: str, key) -> bool:
+        return os.path.isfile(self.path(kind, key))
+
+    def write(self, kind: str, key, html: str) -> None:
+        path = self.path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(html)
+            # readers see the old page or the new one, never a partial file
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def remove(self, kind: str, key) -> None:
+        try:
+            os.unlink(self.path(kind, key))
+        except FileNotFoundError:
+            pass
+
+    def load_manifest(self) -> Dict:
+        """{"base_url": ..., "catalog_version": ..., "<kind>": {key: digest}} of the last build; empty when missing or unreadable."""
+        try:
+            with open(os.path.join(self.root, MANIFEST), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: Dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, sort_keys=True)
+        os.replace(tmp, path)
+
+
+snapshot_store: Optional[SnapshotStore] = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+
+
+def serve_snapshot(request: Request, kind: str, key) -> Optional[FileResponse]:
+    """The stored page for (kind, key) when snapshots are enabled, one exists and the base URL matches."""
+    if snapshot_store is None or str(request.base_url) != SNAPSHOT_BASE_URL:
+        return None
+    path = snapshot_store.path(kind, key)
+    if not os.path.isfile(path):
+        return None
+    return FileResponse(path, media_type="text/html")
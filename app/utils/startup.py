@@ -0,0 +1,38 @@
+"""
+Startup phase timings.
+
+The app lifespan runs its initialization steps (database, templates, search
+index, background tasks) inside `startup_timer.phase(name)`; the durations are
+logged once startup completes and reported under "startup" in /api/metrics.
+Import-time cost is measured separately by scripts/profile_startup.py.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 4)
+
+    def done(self) -> None:
+        logger.info("Startup: %s (%.2fs total)",
+                    ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()),
+                    sum(self.phases.values()))
+
+    def stats(self) -> Dict:
+        return {"phases": dict(self.phases), "total_seconds": round(sum(self.phases.values()), 4)}
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,123 @@
+"""
+Exponentially decayed scores per key with a top-k leaderboard.
+
+Uses forward decay: an event of weight w at time t adds w * 2^((t - t0) / H)
+to the key's stored score, where t0 is the start of the current epoch and H
+the half-life. The real score at time `now` is the stored score times
+2^(-(now - t0) / H), the same factor for every key, so ranking by stored
+score is ranking by decayed score and nothing needs rescaling as time
+passes. Epochs are fixed periods since the Unix epoch (a week, or 64
+half-lives if that is shorter); at each boundary stored scores are multiplied
+by 2^(-epoch / H) so they stay in float range, and keys that decayed below
+`min_score` are dropped.
+
+The leaderboard is a max-heap with lazy deletion (an entry is live while it
+matches the key's score); `top(k)` pops k live entries and pushes them back,
+and repeated reads without updates in between are answered from the cached
+list.
+"""
+import heapq
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+MAX_EPOCH_SECONDS = 7 * 24 * 3600
+
+
+class DecayedTopK:
+    def __init__(self, half_life_seconds: float, min_score: float = 0.01):
+        if half_life_seconds <= 0:
+            raise ValueError("half_life_seconds must be positive")
+        self.half_life = half_life_seconds
+        self.min_score = min_score
+        # stored scores grow to at most 2^64 within an epoch
+        self.epoch_seconds = min(MAX_EPOCH_SECONDS, 64 * half_life_seconds)
+        self.epoch = self.epoch_of(time.time())
+        self._scores: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, Hashable]] = []
+        self._version = 0
+        self._cached: Optional[Tuple[int, int, List[Tuple[Hashable, float]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def epoch_of(self, ts: float) -> int:
+        return int(ts // self.epoch_seconds)
+
+    @property
+    def epoch_factor(self) -> float:
+        """Stored scores of the previous epoch times this are scores of the current one."""
+        return 2.0 ** (-self.epoch_seconds / self.half_life)
+
+    def rescale(self, stored: float, from_epoch: int, to_epoch: Optional[int] = None) -> float:
+        """A stored score of `from_epoch` expressed in `to_epoch` (default: the current one)."""
+        to_epoch = self.epoch if to_epoch is None else to_epoch
+        return stored * 2.0 ** (-(to_epoch - from_epoch) * self.epoch_seconds / self.half_life)
+
+    def _growth(self, now: float) -> float:
+        return 2.0 ** ((now - self.epoch * self.epoch_seconds) / self.half_life)
+
+    def advance(self, now: float) -> float:
+        """Move to the epoch of `now` (rescaling stored scores); returns how many epochs passed."""
+        epoch = self.epoch_of(now)
+        passed = epoch - self.epoch
+        if passed <= 0:
+            return 0
+        factor = self.epoch_factor ** passed
+        self.epoch = epoch
+        # at the epoch start stored and real scores are equal
+        self._scores = {k: s * factor for k, s in self._scores.items() if s * factor >= self.min_score}
+        self._rebuild()
+        return passed
+
+    def _rebuild(self) -> None:
+        self._heap = [(-s, k) for k, s in self._scores.items()]
+        heapq.heapify(self._heap)
+        self._version += 1
+
+    def add(self, key: Hashable, weight: float, now: Optional[float] = None) -> float:
+        """Add an event of `weight` (negative to take one back); returns the key's stored delta."""
+        now = time.time() if now is None else now
+        self.advance(now)
+        delta = weight * self._growth(now)
+        score = self._scores.get(key, 0.0) + delta
+        if score / self._growth(now) < self.min_score:
+            self._scores.pop(key, None)
+        else:
+            self._scores[key] = score
+            heapq.heappush(self._heap, (-score, key))
+        self._version += 1
+        if len(self._heap) > 2 * len(self._scores) + 64:
+            self._rebuild()
+        return delta
+
+    def replace(self, scores: Dict[Hashable, float], epoch: int) -> None:
+        """Swap in stored scores of `epoch` (e.g. from a checkpoint)."""
+        self.epoch = epoch
+        self._scores = {k: s for k, s in scores.items() if s > 0}
+        self._rebuild()
+
+    def stored(self) -> Dict[Hashable, float]:
+        return dict(self._scores)
+
+    def score(self, key: Hashable, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return self._scores.get(key, 0.0) / self._growth(now)
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """[(key, decayed score)] for the k highest scores, highest first."""
+        now = time.time() if now is None else now
+        if self.advance(now) == 0 and self._cached and self._cached[0] == self._version and self._cached[1] >= k:
+            live = self._cached[2][:k]
+        else:
+            live, seen = [], set()
+            while self._heap and len(live) < k:
+                neg, key = heapq.heappop(self._heap)
+                if key in seen or self._scores.get(key) != -neg:
+                    continue  # stale entry
+                seen.add(key)
+                live.append((key, -neg))
+            for key, score in live:
+                heapq.heappush(self._heap, (-score, key))
+            self._cached = (self._version, k, live)
+        scale = self._growth(now)
+        return [(key, score / scale) for key, score in live]
@@ -12,6 +12,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.db import AsyncSessionLocal, init_db
 from app.models import Ingredient, Recipe, recipe_ingredient
+from app.utils.normalize import normalize_name
 import sqlalchemy as sa
 
 FIXTURES = [
@@ -159,7 +160,7 @@ async def load_fixtures():
                 name = (name or "").strip()
                 if not name:
                     continue
-                q = await session.execute(select(Ingredient).where(Ingredient.name == name))
+                q = await session.execute(select(Ingredient).where(Ingredient.name_norm == normalize_name(name)))
                 ing = q.scalars().first()
                 if not ing:
                     ing = Ingredient(name=name)
@@ -168,7 +169,7 @@ async def load_fixtures():
                         await session.flush()
                     except IntegrityError:
                         await session.rollback()
-                        q = await session.execute(select(Ingredient).where(Ingredient.name == name))
+                        q = await session.execute(select(Ingredient).where(Ingredient.name_norm == normalize_name(name)))
                         ing = q.scalars().first()
                         if not ing:
                             raise
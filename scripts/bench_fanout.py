@@ -0,0 +1,89 @@
+"""
+Compare serial vs fanned-out reads (app/utils/concurrency.py) on multi-query pages.
+--rtt-ms adds a simulated network round-trip to every statement, which is what
+fan-out hides on a real PostgreSQL; with a local SQLite file the gain is small.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/bench_fanout.py --runs 50
+  python scripts/bench_fanout.py --rtt-ms 2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import _engine
+from app.frontend.routes import ingredients_for_search_page
+from app.services.recipes import get_recipe, list_recipes, search_recipes
+from app.services.recommendations import get_recommendations
+from app.services.similar import get_similar_recipes
+from app.utils import concurrency
+from app.utils.mapping import map_input_to_ingredient_names
+
+
+class _RttSession(AsyncSession):
+    rtt = 0.0
+
+    async def execute(self, *args, **kwargs):
+        await asyncio.sleep(self.rtt)
+        return await super().execute(*args, **kwargs)
+
+
+async def search_page(session):
+    async def run_search(s):
+        mapped = await map_input_to_ingredient_names(s, ["egg", "butter", "onion"])
+        return await search_recipes(s, mapped)
+    return await concurrency.gather_reads(session, run_search, ingredients_for_search_page)
+
+
+async def detail_page(session):
+    return await concurrency.gather_reads(
+        session,
+        lambda s: get_recipe(s, 1),
+        lambda s: get_similar_recipes(s, 1),
+        lambda s: get_recommendations(s, 1),
+    )
+
+
+SCENARIOS = {
+    "catalog (page + count)": lambda s: list_recipes(s, page=1),
+    "search page (search + ingredient list)": search_page,
+    "detail page (recipe + similar + also saved)": detail_page,
+}
+
+
+async def measure(sessionmaker, scenario, runs: int):
+    samples = []
+    for _ in range(runs):
+        async with sessionmaker() as session:
+            started = time.perf_counter()
+            await scenario(session)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+async def main(runs: int, rtt_ms: float) -> None:
+    _RttSession.rtt = rtt_ms / 1000
+    sessionmaker = async_sessionmaker(bind=_engine, class_=_RttSession, expire_on_commit=False)
+    print(f"{_engine.dialect.name}, {runs} runs, simulated rtt {rtt_ms} ms per statement")
+    print(f"{'scenario':46} {'serial p50/p95':>18} {'fan-out p50/p95':>18}")
+    for name, scenario in SCENARIOS.items():
+        concurrency.DB_FANOUT = False
+        await measure(sessionmaker, scenario, 3)  # warm-up: pool, caches
+        serial = await measure(sessionmaker, scenario, runs)
+        concurrency.DB_FANOUT = True
+        await measure(sessionmaker, scenario, 3)
+        fanned = await measure(sessionmaker, scenario, runs)
+        print(f"{name:46} {serial[0]:8.2f}/{serial[1]:<8.2f} {fanned[0]:8.2f}/{fanned[1]:<8.2f} ms"
+              f"  ({(fanned[0] / serial[0] - 1) * 100:+.0f}% p50)")
+    await _engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.rtt_ms))
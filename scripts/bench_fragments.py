@@ -0,0 +1,75 @@
+"""
+Measure template render time of listing pages with and without the fragment cache.
+Renders catalog.html / index.html for synthetic recipe cards, no DB needed.
+Usage:
+  python scripts/bench_fragments.py --cards 24 --runs 200
+"""
+import argparse
+import statistics
+import time
+
+from starlette.requests import Request
+
+from app.main import app
+from app.templates import get_templates
+from app.utils import fragment_cache
+
+
+def fake_request() -> Request:
+    scope = {
+        "type": "http", "method": "GET", "path": "/catalog", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost")], "scheme": "http", "server": ("localhost", 80), "app": app,
+        "router": app.router,
+    }
+    return Request(scope)
+
+
+def cards(n: int):
+    return [
+        {
+            "id": i, "title": f"Recipe {i}", "instructions": "Chop, mix and bake until golden. " * 6,
+            "prep_minutes": 10 + i % 30, "servings": 2, "image_url": f"https://img.example/{i}.jpg",
+            "thumbnail_url": f"https://img.example/{i}_t.jpg", "image_meta": {"author": "someone"},
+            "ingredients": ["egg", "flour", "butter", "milk", "salt"], "likes_count": i % 7,
+            "excerpt": "Chop, mix and bake until golden.",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def run(template: str, ctx: dict, runs: int) -> float:
+    tpl = get_templates().get_template(template)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        tpl.render(ctx)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=24)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    request = fake_request()
+    recipes = cards(args.cards)
+    pages = {
+        "catalog.html": {"request": request, "recipes": recipes, "page": 1, "total_pages": 5},
+        "index.html": {"request": request, "recipes": recipes, "page": 1, "total_pages": 5},
+    }
+    print(f"{args.cards} cards, median of {args.runs} renders")
+    for name, ctx in pages.items():
+        fragment_cache.FRAGMENT_CACHE_ENABLED = False
+        cold = run(name, ctx, args.runs)
+        fragment_cache.FRAGMENT_CACHE_ENABLED = True
+        fragment_cache.fragment_cache.clear()
+        run(name, ctx, 1)  # fill
+        warm = run(name, ctx, args.runs)
+        print(f"{name:14} no cache {cold:7.3f} ms   cached {warm:7.3f} ms   ({(warm / cold - 1) * 100:+.0f}%)")
+    print("cache:", fragment_cache.fragment_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
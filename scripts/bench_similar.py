@@ -0,0 +1,84 @@
+"""
+Benchmark MinHash/LSH "similar recipes" against exact Jaccard on a synthetic
+catalog: build time, per-recipe query time and recall@k.
+Usage:
+  python scripts/bench_similar.py --recipes 20000 --queries 300
+"""
+import argparse
+import random
+import time
+
+from app.services.similar import LSH_BANDS, NUM_PERM, LSHIndex, MinHasher, MIN_SCORE, NEIGHBORS_K, jaccard
+
+
+def synthetic_catalog(n: int, vocab: int, seed: int = 7):
+    """Recipes drawn from overlapping 'cuisines' so that real neighbors exist."""
+    rnd = random.Random(seed)
+    cuisines = [rnd.sample(range(vocab), 40) for _ in range(max(1, n // 200))]
+    staples = list(range(10))  # salt, oil, onion...: shared by everything
+    sets = {}
+    for rid in range(1, n + 1):
+        base = rnd.choice(cuisines)
+        items = set(rnd.sample(base, rnd.randint(3, 9)))
+        items.update(rnd.sample(staples, rnd.randint(0, 2)))
+        if rnd.random() < 0.3:
+            items.add(rnd.randrange(vocab))
+        sets[rid] = frozenset(items)
+    return sets
+
+
+def exact_top_k(sets, rid, k):
+    mine = sets[rid]
+    scored = [(other, jaccard(mine, s)) for other, s in sets.items() if other != rid]
+    scored = [x for x in scored if x[1] >= MIN_SCORE]
+    scored.sort(key=lambda x: (-x[1], x[0]))
+    return scored[:k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--vocab", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=NEIGHBORS_K)
+    parser.add_argument("--perm", type=int, default=NUM_PERM)
+    parser.add_argument("--bands", type=int, default=LSH_BANDS)
+    args = parser.parse_args()
+
+    sets = synthetic_catalog(args.recipes, args.vocab)
+
+    t0 = time.perf_counter()
+    index = LSHIndex.build(sets, MinHasher(args.perm, args.bands))
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lsh = {rid: index.top_k(rid, args.k) for rid in sets}
+    t_topk = time.perf_counter() - t0
+
+    sample = random.Random(1).sample(sorted(sets), min(args.queries, len(sets)))
+    t0 = time.perf_counter()
+    exact = {rid: exact_top_k(sets, rid, args.k) for rid in sample}
+    t_exact = (time.perf_counter() - t0) / len(sample)
+
+    hits = total = 0
+    score_gap = 0.0
+    for rid in sample:
+        want = exact[rid]
+        got = {other for other, _ in lsh[rid]}
+        hits += sum(1 for other, _ in want if other in got)
+        total += len(want)
+        # ties at the k-th score make id-level recall pessimistic; compare score mass too
+        score_gap += sum(s for _, s in want) - sum(s for _, s in lsh[rid])
+
+    avg_candidates = sum(len(index.candidates(rid)) for rid in sample) / len(sample)
+    print(f"recipes={len(sets)} vocab={args.vocab} k={args.k} perm={args.perm} bands={args.bands} sample={len(sample)}")
+    print(f"LSH build (signatures + buckets): {t_build:.2f}s")
+    print(f"LSH top-k for all recipes:        {t_topk:.2f}s ({t_topk / len(sets) * 1000:.3f} ms/recipe)")
+    print(f"Exact top-k, brute force:         {t_exact * 1000:.2f} ms/recipe "
+          f"(~{t_exact * len(sets):.1f}s for the full catalog)")
+    print(f"LSH candidates per recipe:        {avg_candidates:.1f}")
+    print(f"recall@{args.k}: {hits / max(total, 1):.3f}  mean score shortfall: {score_gap / len(sample):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare SQLite read/write throughput: default ("basic") vs the production profile
+(WAL + PRAGMAs, read pool, single serialized writer; see app/db.py).
+
+Builds a throwaway database file, seeds a catalog and --likes likes, then for
+each profile runs for --seconds:
+- --readers tasks alternating between loading recipe cards and ranking the
+  most liked recipes (an aggregate over recipe_action, so readers hold
+  SQLite's shared lock for a while rather than spending their time in Python);
+- --writers tasks toggling a like and, in the same transaction, recounting the
+  recipe's likes and storing likes_count, so the write lock is held across a
+  read and a second write.
+It reports operations per second, p50/p95 latency and failed operations
+(e.g. "database is locked").
+Usage:
+  python scripts/bench_sqlite.py --seconds 10 --readers 16 --writers 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import List
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import selectinload
+
+from app.db import Base, make_engines, make_sessionmaker
+from app.models import Ingredient, Recipe, recipe_ingredient
+from app.models.anon import AnonUser, RecipeAction
+
+
+async def seed(url: str, recipes: int, likes: int) -> None:
+    engine, _ = make_engines(url, "basic")
+    rnd = random.Random(42)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Ingredient), [{"name": f"ing {k}", "name_norm": f"ing {k}"} for k in range(300)])
+        await conn.execute(insert(Recipe), [
+            {"title": f"Recipe {k}", "instructions": "Mix and cook. " * 20} for k in range(recipes)
+        ])
+        await conn.execute(insert(recipe_ingredient), [
+            {"recipe_id": rid, "ingredient_id": iid}
+            for rid in range(1, recipes + 1) for iid in rnd.sample(range(1, 301), 8)
+        ])
+        users = [uuid.uuid4() for _ in range(200)]
+        await conn.execute(insert(AnonUser), [{"id": u} for u in users])
+        liked = {(rnd.choice(users), rnd.randint(1, recipes)) for _ in range(likes)}
+        await conn.execute(insert(RecipeAction), [
+            {"anon_user_id": u, "recipe_id": rid, "action_type": "like"} for u, rid in liked
+        ])
+    await engine.dispose()
+
+
+async def reader(sessionmaker, recipes: int, deadline: float, lat: List[float], errors: Counter) -> None:
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with sessionmaker() as session:
+                if rnd.random() < 0.5:
+                    ids = [rnd.randint(1, recipes) for _ in range(20)]
+                    stmt = select(Recipe).options(selectinload(Recipe.ingredients)).where(Recipe.id.in_(ids))
+                    (await session.execute(stmt)).scalars().unique().all()
+                else:
+                    (await session.execute(
+                        select(RecipeAction.recipe_id, func.count())
+                        .where(RecipeAction.action_type == "like")
+                        .group_by(RecipeAction.recipe_id)
+                        .order_by(func.count().desc())
+                        .limit(20)
+                    )).all()
+        except DBAPIError as exc:
+            errors[str(exc.orig)[:40]] += 1
+            continue
+        lat.append((time.perf_counter() - started) * 1000)
+
+
+async def writer(sessionmaker, users, recipes: int, deadline: float, lat: List[float], errors: Counter) -> None:
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        user, rid = rnd.choice(users), rnd.randint(1, recipes)
+        started = time.perf_counter()
+        try:
+            async with sessionmaker() as session:
+                # read-then-write like the toggle endpoints
+                found = (await session.execute(select(RecipeAction.id).where(
+                    RecipeAction.anon_user_id == user, RecipeAction.recipe_id == rid, RecipeAction.action_type == "like"
+                ))).first()
+                if found:
+                    await session.execute(delete(RecipeAction).where(RecipeAction.id == found[0]))
+                else:
+                    await session.execute(insert(RecipeAction).values(anon_user_id=user, recipe_id=rid, action_type="like"))
+                # read inside the write transaction, then write again
+                likes = (await session.execute(select(func.count()).select_from(RecipeAction).where(
+                    RecipeAction.recipe_id == rid, RecipeAction.action_type == "like"
+                ))).scalar_one()
+                await session.execute(update(Recipe).where(Recipe.id == rid).values(likes_count=likes))
+                await session.commit()
+        except DBAPIError as exc:
+            errors[str(exc.orig)[:40]] += 1
+            continue
+        lat.append((time.perf_counter() - started) * 1000)
+
+
+def _summary(lat: List[float], seconds: float) -> str:
+    if not lat:
+        return "      0 ops/s"
+    lat.sort()
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    return f"{len(lat) / seconds:7.0f} ops/s  p50 {statistics.median(lat):6.1f}  p95 {p95:7.1f} ms"
+
+
+async def run_profile(url: str, profile: str, args) -> None:
+    read_engine, write_engine = make_engines(url, profile)
+    sessionmaker = make_sessionmaker(read_engine, write_engine)
+    async with sessionmaker() as session:
+        users = (await session.execute(select(AnonUser.id))).scalars().all()
+    read_lat: List[float] = []
+    write_lat: List[float] = []
+    errors: Counter = Counter()
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *(reader(sessionmaker, args.recipes, deadline, read_lat, errors) for _ in range(args.readers)),
+        *(writer(sessionmaker, users, args.recipes, deadline, write_lat, errors) for _ in range(args.writers)),
+    )
+    print(f"{profile:10} reads  {_summary(read_lat, args.seconds)}")
+    print(f"{'':10} writes {_summary(write_lat, args.seconds)}")
+    if errors:
+        print(f"{'':10} failed {dict(errors)}")
+    for engine in {read_engine, write_engine}:
+        await engine.dispose()
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        url = f"sqlite+aiosqlite:///{path}"
+        await seed(url, args.recipes, args.likes)
+        print(f"{args.recipes} recipes, {args.likes} likes, {args.readers} readers, {args.writers} writers, {args.seconds:g}s per profile")
+        # basic first: journal_mode=WAL set by the production profile persists in the file
+        for profile in ("basic", "production"):
+            await run_profile(url, profile, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--likes", type=int, default=50000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,30 @@
+"""
+Refresh the recipe_recommendation table ("people who saved this also saved").
+Incremental by default (only recipes touched since the last run); --full rebuilds everything.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/build_recommendations.py [--full]
+"""
+import argparse
+import asyncio
+import time
+
+from app.db import AsyncSessionLocal
+from app.services.recommendations import refresh_recommendations
+
+
+async def run(full: bool) -> None:
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        n = await refresh_recommendations(session, full=full)
+    print(f"Recommendations written for {n} recipes in {time.perf_counter() - started:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="recompute every recipe instead of only changed ones")
+    args = parser.parse_args()
+    asyncio.run(run(args.full))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Write a new generation of the shared search index file (SEARCH_INDEX_PATH).
+Running workers switch to it within SEARCH_INDEX_CHECK_SECONDS; run after catalog changes,
+or from cron with --if-changed (skips the build when the catalog change feed is empty).
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/build_search_index.py [--path /data/search.idx] [--if-changed]
+"""
+import argparse
+import asyncio
+
+from app.db import AsyncSessionLocal
+from app.services.search_index import SEARCH_INDEX_PATH, build_search_index, build_search_index_if_changed
+from app.utils.index_file import IndexFile
+
+
+async def run(path: str, if_changed: bool = False) -> None:
+    async with AsyncSessionLocal() as session:
+        if if_changed:
+            generation = await build_search_index_if_changed(session, path)
+            if generation is None:
+                print(f"{path}: no catalog changes, not rebuilt")
+                return
+        else:
+            generation = await build_search_index(session, path)
+    index = IndexFile(path)
+    print(f"Wrote {path}: generation {generation}, {len(index)} ingredients, {index.recipe_count} recipes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=SEARCH_INDEX_PATH, help="index file (default: SEARCH_INDEX_PATH)")
+    parser.add_argument("--if-changed", action="store_true", help="only rebuild when the catalog changed since the last build")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("set SEARCH_INDEX_PATH or pass --path")
+    asyncio.run(run(args.path, args.if_changed))
+
+
+if __name__ == "__main__":
+    main()
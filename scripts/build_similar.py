@@ -0,0 +1,34 @@
+"""
+Build the recipe_neighbor table ("similar recipes" on detail pages).
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/build_similar.py
+  docker compose exec -e PYTHONPATH=/app web python scripts/build_similar.py --recipe-id 12 --recipe-id 15
+"""
+import argparse
+import asyncio
+import time
+
+from app.db import AsyncSessionLocal
+from app.services.similar import NEIGHBORS_K, rebuild_neighbors, update_neighbors
+
+
+async def run(recipe_ids, k: int) -> None:
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        if recipe_ids:
+            n = await update_neighbors(session, recipe_ids, k=k)
+        else:
+            n = await rebuild_neighbors(session, k=k)
+    print(f"Neighbors written for {n} recipes in {time.perf_counter() - started:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipe-id", type=int, action="append", help="only update these recipes (and those affected by them)")
+    parser.add_argument("-k", type=int, default=NEIGHBORS_K)
+    args = parser.parse_args()
+    asyncio.run(run(args.recipe_id or [], args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Pre-render recipe detail and catalog pages to static HTML in SNAPSHOT_DIR.
+Only pages whose inputs changed since the previous run are rendered again.
+Usage:
+  docker compose exec -e PYTHONPATH=/app -e SNAPSHOT_DIR=/app/snapshots web python scripts/build_snapshots.py [--full]
+"""
+import argparse
+import asyncio
+
+from app.db import AsyncSessionLocal
+from app.frontend.snapshots import build_snapshots
+from app.main import app
+from app.utils.snapshots import SNAPSHOT_BASE_URL
+
+
+async def main(args) -> None:
+    async with AsyncSessionLocal() as session:
+        reports = await build_snapshots(session, app, base_url=args.base_url.rstrip("/") + "/", full=args.full)
+    for kind, report in reports.items():
+        print(f"{kind:8} {report.rendered} rendered, {report.unchanged} unchanged, {report.removed} removed ({report.seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="render every page, ignoring the previous manifest")
+    parser.add_argument("--base-url", default=SNAPSHOT_BASE_URL, help="public base URL the pages are served on")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,158 @@
+"""
+Check the recipe_action history triggers and partition maintenance against a live database.
+
+Likes and unlikes are written to recipe_action the way the toggles do and the
+script verifies what the triggers in app/models/action_log.py made of them:
+the recipe_action_daily rollup (and what popular_recipes / recipe_daily_stats
+read from it) and, on PostgreSQL, the recipe_action_event rows, the monthly
+partition they landed in, partition creation ahead of time and retention
+(an expired month is detached and dropped, the current one kept).
+Everything runs in one transaction that is rolled back at the end, so the
+database is left unchanged. Exit status is 1 when any check failed.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/check_action_log.py
+"""
+import asyncio
+import datetime
+import sys
+import uuid
+from typing import List
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import _engine
+from app.models import Recipe, RecipeActionDaily
+from app.models.anon import AnonUser, RecipeAction
+from app.services.action_stats import popular_recipes, recipe_daily_stats
+
+AHEAD = 3
+KEEP_MONTHS = 12
+
+
+class Checker:
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, name: str, ok: bool, detail: str = "") -> None:
+        self.failures += not ok
+        print(f"{'ok' if ok else 'FAIL':4} {name}" + ("" if ok or not detail else f"  ({detail})"))
+
+
+async def _daily(conn, recipe_id: int) -> dict:
+    rows = await conn.execute(
+        select(RecipeActionDaily.action_type, RecipeActionDaily.added, RecipeActionDaily.removed)
+        .where(RecipeActionDaily.recipe_id == recipe_id)
+    )
+    return {t: (added, removed) for t, added, removed in rows.all()}
+
+
+async def _events(conn, recipe_id: int) -> List[tuple]:
+    rows = await conn.execute(text(
+        "SELECT action_type, delta, tableoid::regclass::text FROM recipe_action_event"
+        " WHERE recipe_id = :r ORDER BY id"
+    ), {"r": recipe_id})
+    return [tuple(r) for r in rows.all()]
+
+
+async def _partitions(conn) -> List[str]:
+    rows = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+        " WHERE i.inhparent = 'recipe_action_event'::regclass ORDER BY c.relname"
+    ))
+    return list(rows.scalars())
+
+
+async def check_partitions(conn, c: Checker) -> str:
+    """Returns the current month's partition name."""
+    await conn.execute(text("SELECT recipe_action_event_ensure_partitions(:n)"), {"n": AHEAD})
+    months = list((await conn.execute(text(
+        "SELECT 'recipe_action_event_p' || to_char(date_trunc('month', now() AT TIME ZONE 'utc')"
+        " + make_interval(months => i), 'YYYYMM') FROM generate_series(0, :n) i"
+    ), {"n": AHEAD})).scalars())
+    have = set(await _partitions(conn))
+    missing = [m for m in months if m not in have]
+    c.check(f"partitions for this month and {AHEAD} ahead exist", not missing, f"missing {', '.join(missing)}")
+    again = (await conn.execute(text("SELECT recipe_action_event_ensure_partitions(:n)"), {"n": AHEAD})).scalar_one()
+    c.check("ensure_partitions is idempotent", again == 0, f"created {again} on the second run")
+    return months[0]
+
+
+async def check_retention(conn, c: Checker, current: str) -> None:
+    old = (await conn.execute(text(
+        "SELECT (date_trunc('month', now() AT TIME ZONE 'utc') - make_interval(months => :k + 12))::date"
+    ), {"k": KEEP_MONTHS})).scalar_one()
+    part = f"recipe_action_event_p{old:%Y%m}"
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {part} PARTITION OF recipe_action_event"
+        f" FOR VALUES FROM ('{old}') TO ('{old + datetime.timedelta(days=31):%Y-%m-01}')"
+    ))
+    await conn.execute(text(
+        "INSERT INTO recipe_action_event (anon_user_id, recipe_id, action_type, delta, created_at)"
+        " VALUES (:u, -1, 'like', 1, :at)"
+    ), {"u": uuid.uuid4(), "at": datetime.datetime.combine(old, datetime.time(12))})
+    dropped = (await conn.execute(text("SELECT recipe_action_event_drop_partitions(:k)"), {"k": KEEP_MONTHS})).scalar_one()
+    have = set(await _partitions(conn))
+    c.check(f"months older than {KEEP_MONTHS} are detached and dropped", dropped >= 1 and part not in have,
+            f"dropped {dropped}, {part} {'still attached' if part in have else 'gone'}")
+    c.check("the current month's partition is kept", current in have)
+
+
+async def check_rollup(conn, c: Checker, dialect: str, current: str) -> None:
+    users = [uuid.uuid4() for _ in range(3)]
+    await conn.execute(insert(AnonUser), [{"id": u} for u in users])
+    recipe_id = (await conn.execute(
+        insert(Recipe).values(title=f"actionlog check {users[0].hex[:8]}", instructions="x").returning(Recipe.id)
+    )).scalar_one()
+
+    await conn.execute(insert(RecipeAction).values(anon_user_id=users[0], recipe_id=recipe_id, action_type="like"))
+    daily = await _daily(conn, recipe_id)
+    c.check("like counts as added in the rollup", daily.get("like") == (1, 0), f"got {daily}")
+    await conn.execute(delete(RecipeAction).where(RecipeAction.anon_user_id == users[0], RecipeAction.recipe_id == recipe_id))
+    daily = await _daily(conn, recipe_id)
+    c.check("unlike counts as removed in the rollup", daily.get("like") == (1, 1), f"got {daily}")
+    # one multi-row statement: the statement-level trigger groups the rows
+    await conn.execute(insert(RecipeAction), [
+        {"anon_user_id": u, "recipe_id": recipe_id, "action_type": "bookmark"} for u in users
+    ])
+    daily = await _daily(conn, recipe_id)
+    c.check("multi-row insert is counted once per row", daily.get("bookmark") == (3, 0), f"got {daily}")
+
+    if dialect == "postgresql":
+        events = await _events(conn, recipe_id)
+        want = [("like", 1, current), ("like", -1, current)] + [("bookmark", 1, current)] * 3
+        c.check(f"events logged with +1/-1 into {current}", events == want, f"got {events}")
+
+    session = AsyncSession(bind=conn)
+    popular = await popular_recipes(session, "bookmark", days=1, limit=1000)
+    hit = [p["score"] for p in popular if p["id"] == recipe_id]
+    c.check("popular_recipes reads the rollup", hit == [3], f"got {hit}")
+    liked = [p for p in await popular_recipes(session, "like", days=1, limit=1000) if p["id"] == recipe_id]
+    c.check("a net-zero like is not popular", not liked)
+    stats = await recipe_daily_stats(session, recipe_id, days=1)
+    want_stats = {"like_added": 1, "like_removed": 1, "bookmark_added": 3, "bookmark_removed": 0}
+    got = {k: stats[0][k] for k in want_stats} if len(stats) == 1 else stats
+    c.check("recipe_daily_stats reports today's changes", got == want_stats, f"got {got}")
+
+
+async def run() -> int:
+    dialect = _engine.dialect.name
+    c = Checker()
+    async with _engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            current = ""
+            if dialect == "postgresql":
+                current = await check_partitions(conn, c)
+            await check_rollup(conn, c, dialect, current)
+            if dialect == "postgresql":
+                await check_retention(conn, c, current)
+        finally:
+            await trans.rollback()
+    await _engine.dispose()
+    print(f"{dialect}: {c.failures} failed" if c.failures else f"{dialect}: action log ok")
+    return 1 if c.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,174 @@
+"""
+Check the catalog change feed (app/models/catalog_change.py, app/services/catalog_changes.py) against a live database.
+
+Catalog rows are edited the way imports and fixtures do (Core statements, no
+ORM events) and the script verifies what the triggers recorded and what the
+feed makes of it: changes_since folding per entity, affected recipes of an
+ingredient rename, batching, full rebuilds for unknown or pruned versions,
+CatalogFeed delivering a backlog in batches, and pruning keeping the newest
+change. On PostgreSQL it also checks that a second catalog writer waits for
+the first one's commit (versions are handed out in commit order).
+Everything runs in transactions that are rolled back at the end, so the
+database is left unchanged. Exit status is 1 when any check failed.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/check_catalog_feed.py
+"""
+import asyncio
+import sys
+import uuid
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import _engine
+from app.models import CatalogChange, Ingredient, Recipe, recipe_ingredient
+from app.services.catalog_changes import (
+    CatalogFeed,
+    affected_recipe_ids,
+    changes_since,
+    current_version,
+    prune_changes,
+)
+
+
+class Checker:
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, name: str, ok: bool, detail: str = "") -> None:
+        self.failures += not ok
+        print(f"{'ok' if ok else 'FAIL':4} {name}" + ("" if ok or not detail else f"  ({detail})"))
+
+
+async def check_feed(conn, c: Checker, tag: str) -> None:
+    session = AsyncSession(bind=conn)
+    iids = list((await conn.execute(insert(Ingredient).returning(Ingredient.id), [
+        {"name": f"feedcheck {tag} {k}", "name_norm": f"feedcheck {tag} {k}"} for k in range(3)
+    ])).scalars())
+    rids = list((await conn.execute(insert(Recipe).returning(Recipe.id), [
+        {"title": f"feedcheck {tag} {k}", "instructions": "x"} for k in range(3)
+    ])).scalars())
+    await conn.execute(insert(recipe_ingredient), [
+        {"recipe_id": rid, "ingredient_id": iids[0]} for rid in rids[:2]
+    ])
+    # the feed is only resumable from a version it has recorded
+    v0 = await current_version(session)
+
+    await conn.execute(update(Recipe).where(Recipe.id == rids[2]).values(title=Recipe.title + " (edited)"))
+    cs = await changes_since(session, v0)
+    c.check("recipe update is recorded", cs.recipe_ids == {rids[2]} and not cs.ingredient_ids and not cs.links,
+            f"got {cs}")
+
+    v1 = cs.version
+    await conn.execute(update(Ingredient).where(Ingredient.id == iids[0]).values(name=f"feedcheck {tag} renamed"))
+    cs = await changes_since(session, v1)
+    affected = await affected_recipe_ids(session, cs)
+    c.check("ingredient rename affects the recipes using it", cs.ingredient_ids == {iids[0]} and affected == set(rids[:2]),
+            f"ingredients {cs.ingredient_ids}, affected {affected}")
+
+    v2 = cs.version
+    await conn.execute(insert(recipe_ingredient).values(recipe_id=rids[2], ingredient_id=iids[1]))
+    await conn.execute(delete(recipe_ingredient).where(recipe_ingredient.c.recipe_id == rids[0]))
+    cs = await changes_since(session, v2)
+    # on PostgreSQL the links also update recipes.ingredient_ids, which is recorded as a recipe change
+    c.check("link insert and delete are recorded", cs.links == {(rids[2], iids[1]), (rids[0], iids[0])}
+            and cs.recipe_ids <= {rids[0], rids[2]}, f"got links {cs.links}, recipes {cs.recipe_ids}")
+
+    v3 = cs.version
+    await conn.execute(delete(recipe_ingredient).where(recipe_ingredient.c.recipe_id == rids[1]))
+    await conn.execute(delete(Recipe).where(Recipe.id == rids[1]))
+    ops = (await conn.execute(
+        select(CatalogChange.entity, CatalogChange.op).where(CatalogChange.version > v3).order_by(CatalogChange.version)
+    )).all()
+    cs = await changes_since(session, v3)
+    ops = [tuple(o) for o in ops]
+    c.check("recipe delete is recorded with its links", ops[0] == ("recipe_ingredient", "delete") and ops[-1] == ("recipe", "delete")
+            and cs.touched_recipe_ids == {rids[1]}, f"got {ops}")
+
+    versions = list((await conn.execute(
+        select(CatalogChange.version).where(CatalogChange.version > v0).order_by(CatalogChange.version)
+    )).scalars())
+    c.check("versions increase without reuse", versions == sorted(set(versions)) and versions[0] > v0, f"got {versions}")
+
+    cs = await changes_since(session, v0, limit=2)
+    c.check("a batch limit returns the rest as `more`", cs.more and cs.changes == 2 and cs.version == versions[1],
+            f"got more={cs.more} changes={cs.changes} version={cs.version}")
+    latest = versions[-1]
+    c.check("no version (first sync) means a full rebuild", (await changes_since(session, None)).full)
+    c.check("a version ahead of the feed means a full rebuild", (await changes_since(session, latest + 1000)).full)
+    c.check("an up-to-date consumer gets an empty change set", (await changes_since(session, latest)).empty)
+
+    sessionmaker = async_sessionmaker(bind=conn, expire_on_commit=False)
+    feed = CatalogFeed(sessionmaker=sessionmaker, batch=2)
+    seen = {"fresh": [], "behind": []}
+
+    def recorder(name):
+        async def handler(_session, changes):
+            seen[name].append((changes.full, changes.changes))
+        return handler
+
+    feed.subscribe("fresh", recorder("fresh"))
+    feed.subscribe("behind", recorder("behind"), since=v0)
+    await feed.poll()
+    subs = feed.stats()["subscribers"]
+    c.check("CatalogFeed starts a new subscriber with a full change set", seen["fresh"] == [(True, 0)], f"got {seen['fresh']}")
+    batches = [(False, min(2, len(versions) - k)) for k in range(0, len(versions), 2)]
+    c.check("CatalogFeed delivers a backlog in batches", seen["behind"] == batches and subs == {"fresh": latest, "behind": latest},
+            f"got {seen['behind']}, versions {subs}")
+    await feed.poll()
+    c.check("CatalogFeed skips subscribers with nothing new", len(seen["fresh"]) == 1 and len(seen["behind"]) == len(batches))
+
+    await conn.execute(
+        update(CatalogChange).where(CatalogChange.version <= versions[2]).values(changed_at=CatalogChange.changed_at - text("INTERVAL '30 days'"))
+        if conn.dialect.name == "postgresql" else
+        update(CatalogChange).where(CatalogChange.version <= versions[2]).values(changed_at=text("datetime(changed_at, '-30 days')"))
+    )
+    await conn.execute(update(CatalogChange).where(CatalogChange.version == latest).values(
+        changed_at=select(CatalogChange.changed_at).where(CatalogChange.version == versions[0]).scalar_subquery()
+    ))
+    deleted = await prune_changes(session, keep_days=7)
+    kept = set((await conn.execute(select(CatalogChange.version).where(CatalogChange.version > v0))).scalars())
+    c.check("pruning keeps the newest change", deleted >= 3 and latest in kept and versions[0] not in kept,
+            f"deleted {deleted}, kept {sorted(kept)}")
+    c.check("a version older than what pruning kept means a full rebuild", (await changes_since(session, v0)).full)
+    c.check("the newest version is still resumable after pruning", (await changes_since(session, latest)).empty)
+
+
+async def check_commit_order(conn, c: Checker, tag: str) -> None:
+    """A holds the feed lock from its first catalog write until it ends; B's unrelated write has to wait."""
+    await conn.execute(update(Recipe).where(Recipe.id == select(Recipe.id).limit(1).scalar_subquery()).values(title=Recipe.title))
+    async with _engine.connect() as other:
+        trans = await other.begin()
+        try:
+            await other.execute(text("SET LOCAL lock_timeout = '500ms'"))
+            await other.execute(insert(Ingredient).values(name=f"feedcheck {tag} other", name_norm=f"feedcheck {tag} other"))
+            waited = False
+        except DBAPIError as exc:
+            waited = "lock timeout" in str(exc.orig).lower()
+            if not waited:
+                raise
+        finally:
+            await trans.rollback()
+    c.check("a second catalog writer waits for the first one's commit", waited)
+
+
+async def run() -> int:
+    dialect = _engine.dialect.name
+    tag = uuid.uuid4().hex[:8]
+    c = Checker()
+    async with _engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await check_feed(conn, c, tag)
+            if dialect == "postgresql":
+                await check_commit_order(conn, c, tag)
+        finally:
+            await trans.rollback()
+    await _engine.dispose()
+    print(f"{dialect}: {c.failures} failed" if c.failures else f"{dialect}: catalog feed ok")
+    return 1 if c.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
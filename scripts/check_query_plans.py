@@ -0,0 +1,241 @@
+"""
+EXPLAIN the hot queries and fail when one of them falls back to a full table scan.
+
+Each check names the tables that must be reached through an index. Plans come
+from EXPLAIN (FORMAT JSON) on PostgreSQL (any "Seq Scan" on a guarded table
+fails) and EXPLAIN QUERY PLAN on SQLite (any "SCAN <table>" fails). With
+--seed N, N synthetic recipes with ingredients and likes/bookmarks are inserted
+and ANALYZEd first, so the planner sees realistic table sizes; everything runs
+in one transaction that is rolled back at the end, so the database is left
+unchanged. --out writes the captured plans to a file for diffing between runs.
+Exit status is 1 when any check regressed.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/check_query_plans.py --seed 20000
+  python scripts/check_query_plans.py --seed 5000 --out plans.txt
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import uuid
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.db import _engine
+from app.models import Ingredient, Recipe, recipe_ingredient
+from app.models.anon import AnonUser, RecipeAction
+
+
+class explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain, "postgresql")
+def _explain_pg(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@compiles(explain)
+def _explain_default(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+class Sample(NamedTuple):
+    recipe_id: int
+    ingredient_ids: List[int]
+    anon_id: uuid.UUID
+    name_norm: str
+
+
+class Check(NamedTuple):
+    name: str
+    tables: Tuple[str, ...]
+    build: Callable[[Sample], object]
+    dialects: Tuple[str, ...] = ("postgresql", "sqlite")
+
+
+CHECKS: Sequence[Check] = (
+    Check(
+        "likes count for a recipe (/api/recipes/{id}/actions)",
+        ("recipe_action",),
+        lambda s: select(func.count()).select_from(RecipeAction).where(
+            RecipeAction.recipe_id == s.recipe_id, RecipeAction.action_type == "like"
+        ),
+    ),
+    Check(
+        "savers of recipes (recommendations refresh)",
+        ("recipe_action",),
+        lambda s: select(RecipeAction.anon_user_id).where(
+            RecipeAction.recipe_id.in_([s.recipe_id, s.recipe_id + 1]),
+            RecipeAction.action_type.in_(("like", "bookmark")),
+        ),
+    ),
+    Check(
+        "user's state on a recipe",
+        ("recipe_action",),
+        lambda s: select(RecipeAction.action_type).where(
+            RecipeAction.anon_user_id == s.anon_id, RecipeAction.recipe_id == s.recipe_id
+        ),
+    ),
+    Check(
+        "user's bookmarks page",
+        ("recipe_action", "recipes"),
+        lambda s: select(Recipe.id, Recipe.title, RecipeAction.created_at)
+        .join(RecipeAction, RecipeAction.recipe_id == Recipe.id)
+        .where(RecipeAction.anon_user_id == s.anon_id, RecipeAction.action_type == "bookmark")
+        .order_by(RecipeAction.created_at.desc(), RecipeAction.id.desc())
+        .limit(25),
+    ),
+    Check(
+        "recipes using ingredients (search_recipes probe)",
+        ("recipe_ingredient",),
+        lambda s: select(recipe_ingredient.c.recipe_id).where(
+            recipe_ingredient.c.ingredient_id.in_(s.ingredient_ids)
+        ),
+    ),
+    Check(
+        "ingredient names for result cards",
+        ("recipe_ingredient", "ingredients"),
+        lambda s: select(recipe_ingredient.c.recipe_id, Ingredient.name)
+        .join(Ingredient, Ingredient.id == recipe_ingredient.c.ingredient_id)
+        .where(recipe_ingredient.c.recipe_id.in_([s.recipe_id, s.recipe_id + 1])),
+    ),
+    Check(
+        "ingredient lookup by normalized name",
+        ("ingredients",),
+        lambda s: select(Ingredient.id, Ingredient.name).where(Ingredient.name_norm == s.name_norm),
+    ),
+    Check(
+        "incremental export window",
+        ("recipes",),
+        lambda s: select(Recipe.id).where(Recipe.updated_at >= func.current_timestamp()).order_by(Recipe.updated_at, Recipe.id),
+    ),
+    Check(
+        "ingredient set match (GIN on recipes.ingredient_ids)",
+        ("recipes",),
+        lambda s: text("SELECT id FROM recipes WHERE ingredient_ids && :ids").bindparams(ids=s.ingredient_ids),
+        ("postgresql",),
+    ),
+)
+
+
+async def seed(conn, recipes: int, ingredients: int, users: int) -> None:
+    rnd = random.Random(41)
+    tag = uuid.uuid4().hex[:8]
+    await conn.execute(insert(Ingredient), [
+        {"name": f"plancheck {tag} {k}", "name_norm": f"plancheck {tag} {k}"} for k in range(ingredients)
+    ])
+    ing_ids = (await conn.execute(select(Ingredient.id).where(Ingredient.name_norm.like(f"plancheck {tag} %")))).scalars().all()
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    await conn.execute(insert(AnonUser), [{"id": u} for u in user_ids])
+    batch = 1000
+    for start in range(0, recipes, batch):
+        n = min(batch, recipes - start)
+        await conn.execute(insert(Recipe), [
+            {"title": f"plancheck {tag} {start + k}", "instructions": "seeded for plan checks"} for k in range(n)
+        ])
+    recipe_ids = (await conn.execute(select(Recipe.id).where(Recipe.title.like(f"plancheck {tag} %")))).scalars().all()
+    pairs, actions = [], []
+    for rid in recipe_ids:
+        pairs.extend({"recipe_id": rid, "ingredient_id": i} for i in rnd.sample(ing_ids, min(8, len(ing_ids))))
+        for u in rnd.sample(user_ids, min(3, len(user_ids))):
+            actions.append({"anon_user_id": u, "recipe_id": rid, "action_type": rnd.choice(("like", "bookmark"))})
+    for start in range(0, len(pairs), 5 * batch):
+        await conn.execute(insert(recipe_ingredient), pairs[start:start + 5 * batch])
+    for start in range(0, len(actions), 5 * batch):
+        await conn.execute(insert(RecipeAction), actions[start:start + 5 * batch])
+    await conn.execute(text("ANALYZE"))
+
+
+async def sample(conn) -> Sample:
+    row = (await conn.execute(
+        select(RecipeAction.recipe_id, RecipeAction.anon_user_id).order_by(RecipeAction.id.desc()).limit(1)
+    )).first()
+    recipe_id = row.recipe_id if row else (await conn.execute(select(func.max(Recipe.id)))).scalar() or 1
+    anon_id = row.anon_user_id if row else uuid.uuid4()
+    ing = (await conn.execute(
+        select(recipe_ingredient.c.ingredient_id).where(recipe_ingredient.c.recipe_id == recipe_id)
+    )).scalars().all() or [1]
+    name_norm = (await conn.execute(select(Ingredient.name_norm).where(Ingredient.id == ing[0]))).scalar() or ""
+    return Sample(recipe_id, list(ing[:3]), anon_id, name_norm)
+
+
+def _pg_scans(plan) -> Tuple[List[str], List[str]]:
+    """(plan lines, relations read by Seq Scan)."""
+    lines, seq = [], []
+
+    def walk(node, depth):
+        rel = node.get("Relation Name")
+        idx = node.get("Index Name")
+        label = node["Node Type"] + (f" on {rel}" if rel else "") + (f" using {idx}" if idx else "")
+        lines.append("  " * depth + label)
+        if node["Node Type"] == "Seq Scan" and rel:
+            seq.append(rel)
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"], 0)
+    return lines, seq
+
+
+def _sqlite_scans(rows) -> Tuple[List[str], List[str]]:
+    lines, seq = [], []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        parts = detail.split()
+        if len(parts) >= 2 and parts[0] == "SCAN":
+            seq.append(parts[1])
+    return lines, seq
+
+
+async def run(seed_recipes: int, out: str) -> int:
+    dialect = _engine.dialect.name
+    failures = 0
+    report: List[str] = []
+    async with _engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            if seed_recipes:
+                await seed(conn, seed_recipes, max(50, seed_recipes // 20), max(20, seed_recipes // 10))
+            s = await sample(conn)
+            for check in CHECKS:
+                if dialect not in check.dialects:
+                    continue
+                res = await conn.execute(explain(check.build(s)))
+                if dialect == "postgresql":
+                    raw = res.scalar()
+                    lines, seq = _pg_scans(json.loads(raw) if isinstance(raw, str) else raw)
+                else:
+                    lines, seq = _sqlite_scans(res.all())
+                bad = sorted(set(seq) & set(check.tables))
+                status = "FAIL" if bad else "ok"
+                failures += bool(bad)
+                print(f"{status:4} {check.name}" + (f"  (full scan of {', '.join(bad)})" if bad else ""))
+                report.append(f"## {check.name}")
+                report.extend(lines)
+                report.append("")
+        finally:
+            await trans.rollback()
+    await _engine.dispose()
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(report))
+        print(f"Plans written to {out}")
+    print(f"{dialect}: {failures} regressed" if failures else f"{dialect}: all plans use indexes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="insert N synthetic recipes first (rolled back)")
+    parser.add_argument("--out", default="", help="write the captured plans here")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.seed, args.out)))
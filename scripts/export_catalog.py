@@ -0,0 +1,47 @@
+"""
+Export the recipe catalog as NDJSON (one recipe per line, ordered by updated_at, id).
+The catalog version the export is complete up to is printed on stderr; for
+incremental syncs pass it as --since-version next time (changed recipes and
+deletion tombstones only, or the whole catalog if the changes were pruned).
+--updated-since is best-effort and can miss changes.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/export_catalog.py [--out catalog.ndjson] [--since-version 1234] [--chunk 500]
+"""
+import argparse
+import asyncio
+import datetime
+import sys
+
+from app.db import AsyncSessionLocal
+from app.services.export import EXPORT_CHUNK, iter_recipe_chunks, ndjson_chunks, plan_recipe_export
+
+
+async def run(out: str, updated_since, chunk: int, since_version=None) -> None:
+    fh = sys.stdout.buffer if out == "-" else open(out, "wb")
+    rows = 0
+    try:
+        async with AsyncSessionLocal() as session:
+            plan = await plan_recipe_export(session, since_version)
+            async for part in ndjson_chunks(iter_recipe_chunks(session, updated_since, chunk, plan)):
+                fh.write(part)
+                rows += part.count(b"\n")
+    finally:
+        if fh is not sys.stdout.buffer:
+            fh.close()
+    kind = "full" if plan.full and updated_since is None else "incremental"
+    print(f"Exported {rows} recipes ({kind}), catalog version {plan.version}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="-", help="output file (default: stdout)")
+    since = parser.add_mutually_exclusive_group()
+    since.add_argument("--since-version", type=int, default=None, help="catalog version printed by the previous export")
+    since.add_argument("--updated-since", type=datetime.datetime.fromisoformat, default=None, help="best-effort, can miss changes")
+    parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK)
+    args = parser.parse_args()
+    asyncio.run(run(args.out, args.updated_since, args.chunk, args.since_version))
+
+
+if __name__ == "__main__":
+    main()
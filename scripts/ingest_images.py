@@ -0,0 +1,25 @@
+"""
+Fetch recipe images once and store resized WebP/JPEG renditions in IMAGE_CACHE_DIR.
+Recipes whose image_url already has renditions are skipped; needs Pillow (the "images" extra).
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/ingest_images.py [--force] [--limit N]
+"""
+import argparse
+import asyncio
+
+from app.db import AsyncSessionLocal
+from app.services.images import ingest_images
+
+
+async def main(args) -> None:
+    async with AsyncSessionLocal() as session:
+        report = await ingest_images(session, force=args.force, limit=args.limit)
+    print(f"{report.ingested} ingested, {report.reused} reused, {report.unchanged} unchanged, "
+          f"{report.failed} failed ({report.seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="fetch and re-render every recipe image")
+    parser.add_argument("--limit", type=int, default=None, help="at most this many recipes")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Burst load test for admission control (app/utils/admission.py).
+
+--search-clients loop on search_simple while --cheap-clients loop on
+/api/recipes/{id}; shed clients wait Retry-After before retrying. Reports
+the cheap endpoint's latency percentiles and the search status codes.
+In-process (default) it runs twice against the ASGI app, without and with
+the search limit, so the tail latency of cheap requests can be compared; with --base-url it runs once against a
+live server configured through the ADMISSION_* env vars.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/loadtest_admission.py --seconds 10
+  python scripts/loadtest_admission.py --base-url http://localhost:8000 --search-clients 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+from app.db import AsyncSessionLocal, _engine
+from app.models import Ingredient, Recipe
+from app.utils import admission
+
+SEARCH_INGREDIENTS = 6
+
+
+async def _targets():
+    async with AsyncSessionLocal() as session:
+        recipe_ids = (await session.execute(select(Recipe.id).order_by(Recipe.id).limit(200))).scalars().all()
+        names = (await session.execute(
+            select(Ingredient.name).order_by(func.random()).limit(SEARCH_INGREDIENTS)
+        )).scalars().all()
+    return recipe_ids, names
+
+
+async def _loop(client: httpx.AsyncClient, url: str, params, deadline: float, latencies: Optional[List[float]], codes: Counter):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            r = await client.get(url, params=params)
+            codes[r.status_code] += 1
+        except httpx.HTTPError as exc:
+            codes[type(exc).__name__] += 1
+            continue
+        if latencies is not None:
+            latencies.append((time.perf_counter() - started) * 1000)
+        if r.status_code in (429, 503):
+            # well-behaved clients back off as told instead of hammering the server
+            await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+
+
+def _pct(samples: List[float], p: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def run_once(client: httpx.AsyncClient, seconds: float, search_clients: int, cheap_clients: int, recipe_ids, names):
+    deadline = time.perf_counter() + seconds
+    cheap: List[float] = []
+    cheap_codes: Counter = Counter()
+    search_codes: Counter = Counter()
+    jobs = [
+        _loop(client, "/api/recipes/search_simple", {"ingredient": names, "limit": 500}, deadline, None, search_codes)
+        for _ in range(search_clients)
+    ]
+    jobs += [
+        _loop(client, f"/api/recipes/{recipe_ids[k % len(recipe_ids)]}", None, deadline, cheap, cheap_codes)
+        for k in range(cheap_clients)
+    ]
+    await asyncio.gather(*jobs)
+    cheap.sort()
+    return {
+        "cheap_n": len(cheap),
+        "cheap_p50": statistics.median(cheap) if cheap else 0.0,
+        "cheap_p95": _pct(cheap, 0.95) if cheap else 0.0,
+        "cheap_p99": _pct(cheap, 0.99) if cheap else 0.0,
+        "cheap_codes": dict(cheap_codes),
+        "search_codes": dict(search_codes),
+    }
+
+
+def _report(label: str, res) -> None:
+    print(f"{label:12} cheap n={res['cheap_n']:<6} p50 {res['cheap_p50']:8.1f}  p95 {res['cheap_p95']:8.1f}  "
+          f"p99 {res['cheap_p99']:8.1f} ms  cheap {res['cheap_codes']}  search {res['search_codes']}")
+
+
+async def main(args) -> None:
+    recipe_ids, names = await _targets()
+    if not recipe_ids:
+        raise SystemExit("no recipes in the database; load fixtures first")
+    print(f"{args.search_clients} search clients ({len(names)} ingredients), {args.cheap_clients} cheap clients, "
+          f"{args.seconds:g}s per run")
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+            _report("server", await run_once(client, args.seconds, args.search_clients, args.cheap_clients, recipe_ids, names))
+            print((await client.get("/api/metrics")).json()["admission"])
+        return
+
+    from app.main import app
+
+    if not admission.ADMISSION_ENABLED:
+        raise SystemExit("ADMISSION_ENABLED is off; the in-process comparison needs the middleware installed")
+    search = admission.limiters["search"]
+    configured = (search.limit, search.queue_size)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60, limits=limits) as client:
+        for label, (limit, queue) in (("unlimited", (10 ** 6, 10 ** 6)), ("admission", configured)):
+            search.limit, search.queue_size = limit, queue
+            await run_once(client, 1, 2, 2, recipe_ids, names)  # warm-up
+            _report(label, await run_once(client, args.seconds, args.search_clients, args.cheap_clients, recipe_ids, names))
+    print(admission.admission_stats()["classes"]["search"])
+    await _engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--search-clients", type=int, default=32)
+    parser.add_argument("--cheap-clients", type=int, default=4)
+    parser.add_argument("--base-url", default="")
+    asyncio.run(main(parser.parse_args()))
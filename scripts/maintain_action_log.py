@@ -0,0 +1,24 @@
+"""
+Create upcoming monthly partitions of recipe_action_event and drop expired ones (PostgreSQL).
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/maintain_action_log.py --ahead 3 --keep-months 12
+"""
+import argparse
+import asyncio
+
+from app.services.action_stats import ACTION_LOG_PARTITIONS_AHEAD, ACTION_LOG_RETENTION_MONTHS, maintain_action_log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ahead", type=int, default=ACTION_LOG_PARTITIONS_AHEAD, help="future months to keep partitions for")
+    parser.add_argument("--keep-months", type=int, default=ACTION_LOG_RETENTION_MONTHS,
+                        help="drop event partitions older than this many months (0 = keep all)")
+    args = parser.parse_args()
+
+    created, dropped = asyncio.run(maintain_action_log(months_ahead=args.ahead, retention_months=args.keep_months))
+    print(f"Action log partitions: {created} created, {dropped} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Import-time profile of the app: how long `import app.main` takes in a fresh
+interpreter, which modules it costs, and whether modules that should load
+lazily were pulled in.
+
+Each run starts a new Python process with `-X importtime`, imports app.main
+and reports the import time, then runs the app lifespan (startup and
+shutdown against DATABASE_URL) and reports its phases from startup_timer; the
+slowest modules of the last run are listed by cumulative time. The script
+exits 1 when the median import time is over --budget-ms, when the median
+lifespan startup is over --lifespan-budget-ms or fails, and when a forbidden
+module (numpy, scipy, rapidfuzz, itsdangerous, pytest; plus jinja2 with
+--no-frontend) was imported, so it can gate CI. A budget of 0 disables it;
+--no-lifespan profiles the import only (no database needed).
+Usage:
+  python scripts/profile_startup.py --runs 5 --top 25
+  python scripts/profile_startup.py --budget-ms 1500 --lifespan-budget-ms 500 --no-frontend
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+LAZY_MODULES = ("numpy", "scipy", "rapidfuzz", "itsdangerous")
+# test-only: never loaded by a worker (fixtures live in separate plugin modules)
+DEV_MODULES = ("pytest", "_pytest")
+FRONTEND_MODULES = ("jinja2",)
+
+# generous enough for a cold CI runner; lower them (or pass 0) per environment
+IMPORT_BUDGET_MS = 3000.0
+LIFESPAN_BUDGET_MS = 2000.0
+
+CHILD = (
+    "import asyncio, json, sys, time\n"
+    "t = time.perf_counter()\n"
+    "import app.main\n"
+    "ms = (time.perf_counter() - t) * 1000\n"
+    "modules = sorted(sys.modules)\n"
+    "lifespan = None\n"
+    "if sys.argv[1] == 'lifespan':\n"
+    "    from app.utils.startup import startup_timer\n"
+    "    async def _lifespan():\n"
+    "        async with app.main.app.router.lifespan_context(app.main.app):\n"
+    "            pass\n"
+    "    asyncio.run(_lifespan())\n"
+    "    lifespan = startup_timer.stats()\n"
+    "print(json.dumps({'ms': ms, 'modules': modules, 'lifespan': lifespan}))\n"
+)
+
+
+def run_once(env: Dict[str, str], lifespan: bool = True) -> Tuple[float, List[str], str, Optional[Dict]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, "lifespan" if lifespan else "import"],
+        capture_output=True, text=True, env=env, check=False,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        step = "import app.main or the app lifespan" if lifespan else "import app.main"
+        raise SystemExit(f"{step} failed (exit {proc.returncode})")
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out["ms"], out["modules"], proc.stderr, out["lifespan"]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us), int(cum_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                    help=f"fail when the median import time is higher (default {IMPORT_BUDGET_MS:.0f}, 0 = no budget)")
+    ap.add_argument("--lifespan-budget-ms", type=float, default=LIFESPAN_BUDGET_MS,
+                    help=f"fail when the median lifespan startup is longer (default {LIFESPAN_BUDGET_MS:.0f}, 0 = no budget)")
+    ap.add_argument("--no-lifespan", action="store_true", help="only profile the import (no database needed)")
+    ap.add_argument("--no-frontend", action="store_true", help="profile a JSON-only worker (FRONTEND_ENABLED=false)")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    if args.no_frontend:
+        env["FRONTEND_ENABLED"] = "false"
+
+    lifespan = not args.no_lifespan
+    # not counted: the first run may still be writing bytecode caches
+    run_once(env, lifespan)
+    timings, lifespans, modules, stderr, phases = [], [], [], "", {}
+    for _ in range(max(1, args.runs)):
+        ms, modules, stderr, stats = run_once(env, lifespan)
+        timings.append(ms)
+        if stats is not None:
+            lifespans.append(stats["total_seconds"] * 1000)
+            phases = stats["phases"]
+    median = statistics.median(timings)
+    print(f"import app.main: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms "
+          f"over {len(timings)} runs, {len(modules)} modules loaded")
+    lifespan_median = statistics.median(lifespans) if lifespans else 0.0
+    if lifespans:
+        print(f"lifespan startup: median {lifespan_median:.1f} ms, min {min(lifespans):.1f} ms, max {max(lifespans):.1f} ms; "
+              + ", ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in phases.items()))
+
+    rows = parse_importtime(stderr)
+    by_package: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        top = name.split(".")[0]
+        by_package[top] = by_package.get(top, 0) + self_us
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for top, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{top:<28}{us / 1000:>10.1f}")
+    print(f"\n{'module':<48}{'cumulative ms':>14}")
+    for name, _, cum_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{name:<48}{cum_us / 1000:>14.1f}")
+
+    failed = False
+    forbidden = LAZY_MODULES + DEV_MODULES + (FRONTEND_MODULES if args.no_frontend else ())
+    loaded = sorted(m for m in forbidden if m in modules)
+    if loaded:
+        print(f"\nFAIL: imported at startup but should load lazily or not at all: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms and median > args.budget_ms:
+        print(f"\nFAIL: median import time {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if args.lifespan_budget_ms and lifespan_median > args.lifespan_budget_ms:
+        print(f"\nFAIL: median lifespan startup {lifespan_median:.1f} ms is over the {args.lifespan_budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,38 @@
+"""
+Purge anonymous users with no likes/bookmarks that were not seen for N days.
+Usage:
+  docker compose exec -e PYTHONPATH=/app web python scripts/purge_anon_users.py --days 30
+"""
+import argparse
+import asyncio
+
+from app.services.retention import (
+    ANON_GC_BATCH_SIZE,
+    ANON_GC_MAX_BATCHES,
+    ANON_GC_PAUSE_SECONDS,
+    ANON_RETENTION_DAYS,
+    purge_inactive_anon_users,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=ANON_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ANON_GC_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=ANON_GC_PAUSE_SECONDS)
+    parser.add_argument("--max-batches", type=int, default=ANON_GC_MAX_BATCHES)
+    args = parser.parse_args()
+
+    report = asyncio.run(purge_inactive_anon_users(
+        older_than_days=args.days,
+        batch_size=args.batch_size,
+        pause_seconds=args.pause,
+        max_batches=args.max_batches,
+    ))
+    print(f"Purged anon users: {report.purged} ({report.batches} batches, {report.seconds:.2f}s)")
+    if not report.exhausted:
+        print("Stopped at --max-batches; run again to continue.")
+
+
+if __name__ == "__main__":
+    main()
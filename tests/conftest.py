@@ -0,0 +1,41 @@
+import random
+
+import pytest
+from sqlalchemy import insert
+
+from app.db import Base, make_engines, make_sessionmaker
+from app.models import Ingredient, Recipe, recipe_ingredient
+
+pytest_plugins = ["app.utils.pytest_query_budget"]
+
+INGREDIENTS = 40
+RECIPES = 200
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    """SQLite catalog of RECIPES recipes with 4-8 of INGREDIENTS ingredients each."""
+    read_engine, _ = make_engines(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", "basic")
+    rnd = random.Random(7)
+    async with read_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Ingredient), [
+            {"name": f"ingredient {k}", "name_norm": f"ingredient {k}"} for k in range(1, INGREDIENTS + 1)
+        ])
+        await conn.execute(insert(Recipe), [
+            {"title": f"Recipe {k:03d}", "instructions": "Mix and cook.", "prep_minutes": rnd.choice([10, 25, 50, 90]),
+             "servings": rnd.randint(1, 8)}
+            for k in range(1, RECIPES + 1)
+        ])
+        await conn.execute(insert(recipe_ingredient), [
+            {"recipe_id": rid, "ingredient_id": iid}
+            for rid in range(1, RECIPES + 1) for iid in rnd.sample(range(1, INGREDIENTS + 1), rnd.randint(4, 8))
+        ])
+    yield read_engine
+    await read_engine.dispose()
+
+
+@pytest.fixture
+async def session(engine):
+    async with make_sessionmaker(engine, engine)() as s:
+        yield s
@@ -0,0 +1,32 @@
+from sqlalchemy import delete, insert, select, update
+
+from app.models import Ingredient, Recipe, recipe_ingredient
+from app.services.export import iter_recipe_chunks, plan_recipe_export
+
+
+async def _export(session, plan):
+    return [row async for rows in iter_recipe_chunks(session, plan=plan) for row in rows]
+
+
+async def test_since_version_sends_changed_recipes_and_tombstones(session):
+    baseline = await plan_recipe_export(session, None)
+    assert baseline.full and len(await _export(session, baseline)) == 200
+
+    users = set((await session.execute(
+        select(recipe_ingredient.c.recipe_id).where(recipe_ingredient.c.ingredient_id == 3)
+    )).scalars())
+    await session.execute(update(Ingredient).where(Ingredient.id == 3).values(name="renamed"))
+    await session.execute(insert(recipe_ingredient).values(recipe_id=1, ingredient_id=40).prefix_with("OR IGNORE"))
+    await session.execute(delete(recipe_ingredient).where(recipe_ingredient.c.recipe_id == 2))
+    await session.execute(delete(Recipe).where(Recipe.id == 2))
+    await session.commit()
+
+    plan = await plan_recipe_export(session, baseline.version)
+    assert not plan.full and plan.version > baseline.version
+    rows = await _export(session, plan)
+    assert [r["id"] for r in rows] == sorted(users | {1, 2})
+    assert {"id": 2, "deleted": True} in rows
+    assert all("renamed" in r["ingredients"] for r in rows if r["id"] in users - {2})
+
+    assert await _export(session, await plan_recipe_export(session, plan.version)) == []
+    assert (await plan_recipe_export(session, plan.version + 100)).full
@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.recipes import search_recipes, simple_search
+from app.utils.facets import FacetCounts
+from app.utils.query_budget import QueryBudgetExceeded
+
+# ingredient id lookup, one match statement, recipe cards + their ingredients
+SEARCH_STATEMENTS = 4
+
+
+@pytest.mark.parametrize("names", [1, 5, 20])
+async def test_search_recipes_statement_count_is_constant(query_budget, engine, session, names):
+    mapped = [f"ingredient {k}" for k in range(1, names + 1)]
+    with query_budget(SEARCH_STATEMENTS, engine=engine.sync_engine) as log:
+        results = await search_recipes(session, mapped, limit=20, facets=FacetCounts())
+    assert results
+    assert log.count == SEARCH_STATEMENTS
+
+
+@pytest.mark.parametrize("limit", [1, 50])
+async def test_simple_search_statement_count_is_constant(query_budget, engine, session, limit):
+    wanted = {f"ingredient {k}" for k in range(1, 11)}
+    with query_budget(SEARCH_STATEMENTS, engine=engine.sync_engine) as log:
+        results = await simple_search(session, wanted, limit, facets=FacetCounts())
+    assert len(results) == limit
+    assert log.count == SEARCH_STATEMENTS
+
+
+async def test_query_budget_fails_over_budget(query_budget, engine, session):
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        with query_budget(SEARCH_STATEMENTS - 1, engine=engine.sync_engine):
+            await search_recipes(session, ["ingredient 1"], limit=20)
+    assert exc.value.log.count == SEARCH_STATEMENTS
+    assert "statements executed, limit is 3" in str(exc.value)